@@ -49,9 +49,11 @@ print("--- END DEBUGGING ---")
 
 from embeddings.job_function import load_job_function_embedding_cache
 from embeddings.skills import load_skill_cache
-from llm.ollama_setup import get_client
+from llm.extraction_cache import load_extraction_cache
+from llm.job_details import load_extraction_settings
+from llm.ollama_setup import get_client, get_health_monitor
 from model.save import load_model
-from predictions.inference import predict_salary
+from predictions.inference import predict_salary_range, predict_salary_quantiles
 from predictions.features import categorical_features, all_features
 
 
@@ -62,16 +64,30 @@ def load_artifacts():
     with open('params.yaml', 'r') as f:
         params = yaml.safe_load(f)
 
-    lower_model = load_model("data/models/lower_catboost_2025-11-03_21:04.cbm")
-    upper_model = load_model("data/models/upper_catboost_2025-11-03_21:36.cbm")
+    # a single MultiQuantile model replaces the lower/upper pair when configured
+    multi_quantile_model_path = params['serving']['multi_quantile_model_path']
+    if multi_quantile_model_path:
+        models = {'multi_quantile': load_model(multi_quantile_model_path)}
+    else:
+        models = {
+            'lower': load_model("data/models/lower_catboost_2025-11-03_21:04.cbm"),
+            'upper': load_model("data/models/upper_catboost_2025-11-03_21:36.cbm"),
+        }
 
     # load embedding cache
     job_function_cache = load_job_function_embedding_cache(params['embedding_paths']['job_function_cache'])
     skill_cache = load_skill_cache(params['embedding_paths']['skill_cache'])
 
-    return lower_model, upper_model, job_function_cache, skill_cache, params['models']['decoder_model_name']
+    # shared on-disk cache of LLM extractions, reposted descriptions skip the LLM call
+    extraction_cache = load_extraction_cache(params)
+    extraction_settings = load_extraction_settings(params)
+
+    # health of the Ollama server is refreshed in the background from now on
+    get_health_monitor(get_client())
+
+    return models, job_function_cache, skill_cache, extraction_cache, extraction_settings, params['models']['decoder_model_name'], params['serving']
 
-lower_model, upper_model, job_function_cache, skill_cache, decoder_model_name = load_artifacts()
+models, job_function_cache, skill_cache, extraction_cache, extraction_settings, decoder_model_name, serving_params = load_artifacts()
 
 st.set_page_config(layout="wide")
 st.title("💼 US Job Posting Salary Estimator")
@@ -101,39 +117,58 @@ if submit_button:
 
                 client = get_client()
 
-                lower_salary = predict_salary(
-                    title, 
-                    company_name, 
-                    location, 
-                    description, 
-                    lower_model, 
-                    client, 
-                    decoder_model_name, 
-                    all_features, 
-                    categorical_features,
-                    job_function_cache,
-                    skill_cache
-                )
-                
-                upper_salary = predict_salary(
-                    title, 
-                    company_name, 
-                    location, 
-                    description, 
-                    upper_model, 
-                    client, 
-                    decoder_model_name, 
-                    all_features, 
-                    categorical_features,
-                    job_function_cache,
-                    skill_cache
-                )
+                if 'multi_quantile' in models:
+                    salary_quantiles, degraded = predict_salary_quantiles(
+                        title, 
+                        company_name, 
+                        location, 
+                        description, 
+                        models['multi_quantile'], 
+                        client, 
+                        decoder_model_name, 
+                        all_features, 
+                        categorical_features,
+                        job_function_cache,
+                        skill_cache,
+                        extraction_cache,
+                        serving_params['latency_budget_seconds'],
+                        serving_params['extraction_mode'],
+                        extraction_settings
+                    )
+                    lower_salary = salary_quantiles[serving_params['lower_quantile']]
+                    upper_salary = salary_quantiles[serving_params['upper_quantile']]
+                else:
+                    salary_range, degraded = predict_salary_range(
+                        title, 
+                        company_name, 
+                        location, 
+                        description, 
+                        models, 
+                        client, 
+                        decoder_model_name, 
+                        all_features, 
+                        categorical_features,
+                        job_function_cache,
+                        skill_cache,
+                        extraction_cache,
+                        serving_params['latency_budget_seconds'],
+                        serving_params['extraction_mode'],
+                        extraction_settings
+                    )
+                    lower_salary, upper_salary = salary_range['lower'], salary_range['upper']
 
                 # --- Display Results ---
                 st.header("Predicted Salary Range")
                 lower_formatted = f"${int(np.round(lower_salary, -2)):,}"
                 upper_formatted = f"${int(np.round(upper_salary, -2)):,}"
                 st.metric(label="Estimated Range", value=f"{lower_formatted} - {upper_formatted}")
+
+                if 'multi_quantile' in models:
+                    bands = [f"P{int(round(q * 100))}: ${int(np.round(v, -2)):,}" for q, v in salary_quantiles.items()]
+                    st.caption(" | ".join(bands))
+
+                if degraded:
+                    st.warning("The LLM did not answer in time, so skills, experience and education were extracted with simple rules. This estimate may be less accurate.")
                 
             except Exception as e:
                 st.error(f"An error occurred during prediction: {e}")
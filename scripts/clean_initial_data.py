@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from dataset.storage import write_dataset
+
 
 if __name__ == '__main__':
     postings = pd.read_csv('data/datasets/postings.csv')
@@ -22,4 +24,4 @@ if __name__ == '__main__':
 
     print(postings.info())
 
-    postings.to_csv('data/datasets/postings_cleaned.csv', index=True)
+    write_dataset(postings, 'data/datasets/postings_cleaned.parquet')
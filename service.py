@@ -0,0 +1,189 @@
+import asyncio
+import os
+import sys
+import time
+import yaml
+
+from aiohttp import web
+from typing import Dict, List, Tuple
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(current_dir, 'src')
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from embeddings.job_function import load_job_function_embedding_cache
+from embeddings.skills import load_skill_cache
+from llm.async_batch_processor import AdaptiveConcurrencyLimiter
+from llm.extraction_cache import load_extraction_cache
+from llm.job_details import load_extraction_settings
+from llm.ollama_setup import get_async_client, get_endpoint_pool
+from llm.telemetry import extraction_telemetry
+from model.save import load_model
+from predictions.batch_scoring import extract_job_details_chunk, score_feature_batch
+from predictions.feature_layout import get_feature_layout
+from predictions.features import categorical_features, all_features
+from predictions.inference import build_posting_features
+from predictions.micro_batcher import MicroBatcher
+
+required_fields = ['title', 'description']
+
+
+def load_artifacts(app: web.Application, params: Dict):
+    print("Loading models and artifacts.")
+    service_params = params['service']
+
+    app['models'] = {name: load_model(path) for name, path in service_params['models'].items()}
+    app['job_function_cache'] = load_job_function_embedding_cache(params['embedding_paths']['job_function_cache'])
+    app['skill_cache'] = load_skill_cache(params['embedding_paths']['skill_cache'])
+    app['extraction_cache'] = load_extraction_cache(params)
+    app['extraction_settings'] = load_extraction_settings(params)
+    app['layout'] = get_feature_layout(all_features, categorical_features)
+    app['decoder_model_name'] = params['models']['decoder_model_name']
+    app['client'] = get_async_client()
+    app['started_at'] = time.time()
+
+
+async def on_startup(app: web.Application):
+    service_params = app['params']['service']
+
+    # one bounded pool of LLM calls shared by every request
+    app['limiter'] = AdaptiveConcurrencyLimiter(
+        min_concurrency=app['params']['llm_processing']['min_concurrency'],
+        max_concurrency=app['params']['llm_processing']['max_concurrency']
+    )
+
+    # concurrent requests are scored together in one predict call per model
+    app['batcher'] = MicroBatcher(
+        lambda items: score_batch(app, items),
+        max_batch_size=service_params['max_batch_size'],
+        max_wait_ms=service_params['max_wait_ms']
+    )
+    app['batcher'].start()
+
+
+async def on_cleanup(app: web.Application):
+    await app['batcher'].stop()
+
+
+async def score_batch(app: web.Application, items: List) -> List[Dict]:
+    layout = app['layout']
+
+    def score() -> List[Dict]:
+        buffer = layout.new_buffer(len(items))
+        for row, (base_features, embeddings) in enumerate(items):
+            layout.write_row(buffer, row, base_features, embeddings)
+        predictions = score_feature_batch(buffer, layout, app['models'])
+        return [{name: float(values[row]) for name, values in predictions.items()} for row in range(len(items))]
+
+    return await asyncio.to_thread(score)
+
+
+async def predict_postings(app: web.Application, postings: List[Dict]) -> Tuple[List[Dict], List[bool]]:
+    # postings the LLM cannot handle within the latency budget are degraded to rule-based extraction
+    job_details_list, degraded = await extract_job_details_chunk(
+        [posting['description'] for posting in postings],
+        app['client'],
+        app['decoder_model_name'],
+        app['limiter'],
+        app['extraction_cache'],
+        app['params']['serving']['latency_budget_seconds'],
+        app['skill_cache'],
+        app['params']['serving']['extraction_mode'],
+        [posting.get('location') for posting in postings],
+        app['extraction_settings']
+    )
+
+    feature_rows = [
+        build_posting_features(
+            posting['title'],
+            posting.get('company_name') or 'unknown',
+            posting.get('location'),
+            job_details,
+            app['job_function_cache'],
+            app['skill_cache']
+        )
+        for posting, job_details in zip(postings, job_details_list)
+    ]
+
+    predictions = await asyncio.gather(*(app['batcher'].submit(feature_row) for feature_row in feature_rows))
+    return predictions, degraded
+
+
+def validate_posting(posting) -> str:
+    if not isinstance(posting, dict):
+        return "Each posting must be a JSON object."
+    missing_fields = [field for field in required_fields if not posting.get(field)]
+    if missing_fields:
+        return f"Missing required fields: {missing_fields}"
+    return ''
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    # deliberately does not touch Ollama, so it stays cheap for load balancer probes
+    app = request.app
+    return web.json_response({
+        'status': 'ok',
+        'models': list(app['models'].keys()),
+        'uptime_seconds': round(time.time() - app['started_at'], 1),
+    })
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.json_response({'llm': extraction_telemetry.snapshot(), 'ollama_endpoints': get_endpoint_pool().stats()})
+
+
+async def handle_predict(request: web.Request) -> web.Response:
+    try:
+        posting = await request.json()
+    except ValueError:
+        return web.json_response({'error': "Request body must be valid JSON."}, status=400)
+
+    error = validate_posting(posting)
+    if error:
+        return web.json_response({'error': error}, status=400)
+
+    predictions, degraded = await predict_postings(request.app, [posting])
+    return web.json_response({'predictions': predictions[0], 'degraded': degraded[0]})
+
+
+async def handle_predict_batch(request: web.Request) -> web.Response:
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.json_response({'error': "Request body must be valid JSON."}, status=400)
+
+    postings = body.get('postings') if isinstance(body, dict) else None
+    if not isinstance(postings, list) or not postings:
+        return web.json_response({'error': "Body must contain a non-empty 'postings' list."}, status=400)
+
+    for i, posting in enumerate(postings):
+        error = validate_posting(posting)
+        if error:
+            return web.json_response({'error': f"Posting {i}: {error}"}, status=400)
+
+    predictions, degraded = await predict_postings(request.app, postings)
+    return web.json_response({'predictions': predictions, 'degraded': degraded})
+
+
+def create_app(params: Dict) -> web.Application:
+    app = web.Application()
+    app['params'] = params
+    load_artifacts(app, params)
+
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_post('/predict', handle_predict)
+    app.router.add_post('/predict/batch', handle_predict_batch)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    web.run_app(create_app(params), host=params['service']['host'], port=params['service']['port'])
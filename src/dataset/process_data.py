@@ -1,11 +1,17 @@
 import argparse
-import pandas as pd
+import asyncio
 import yaml
 
-from feature_extraction.job_function import extract_job_function_from_title
+from dataset.storage import read_dataset, write_dataset
+from feature_cleaning.skills import clean_skill_list
+from feature_extraction.job_function import extract_job_functions
 from feature_extraction.seniority import extract_seniority_from_title
+from llm.async_batch_processor import process_in_batches_async
 from llm.batch_processor import process_in_batches
-from llm.ollama_setup import get_client, is_ollama_server_running
+from llm.extraction_cache import load_extraction_cache
+from llm.job_details import load_extraction_settings
+from llm.near_duplicates import load_near_duplicates, propagate_to_duplicates, representatives_needing_location
+from llm.ollama_setup import get_async_client, get_client, get_endpoint_pool, is_ollama_server_running
 
 
 if __name__ == '__main__':
@@ -15,30 +21,65 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--checkpoint-file-path', type=str, required=True)
     parser.add_argument('--output-path', type=str, required=True)
+    parser.add_argument('--near-duplicates-path', type=str, default=None)
     args = parser.parse_args()
 
-    df = pd.read_csv('data/datasets/postings_cleaned.csv', index_col=0)
+    postings_df = read_dataset('data/datasets/postings_cleaned.parquet')
 
-    client = get_client()
-    is_ollama_server_running(client)
+    # only one posting per near-duplicate cluster goes through the LLM
+    use_near_duplicates = bool(args.near_duplicates_path) and params['near_duplicates']['enabled']
+    if use_near_duplicates:
+        representatives = load_near_duplicates(args.near_duplicates_path).reindex(postings_df.index)
+        df = postings_df[postings_df.index.isin(representatives.unique())].copy()
+        # a representative also extracts the city and state when one of its duplicates needs them
+        df['refine_location'] = df.index.map(representatives_needing_location(postings_df['location'], representatives)).astype(bool)
+        print(f"Extracting {len(df)} near-duplicate representatives out of {len(postings_df)} postings.")
+    else:
+        df = postings_df
 
-    processed = process_in_batches(
-        df=df,
-        output_filepath=args.checkpoint_file_path,
-        client=client,
-        decoder_model_name=params['models']['decoder_model_name'],
-        batch_size=params['llm_processing']['batch_size'],
-        max_workers=params['llm_processing']['max_workers']
-        )
+    if params['llm_processing']['processor'] == 'async':
+        processed = asyncio.run(process_in_batches_async(
+            df=df,
+            output_filepath=args.checkpoint_file_path,
+            client=get_async_client(),
+            decoder_model_name=params['models']['decoder_model_name'],
+            min_concurrency=params['llm_processing']['min_concurrency'],
+            max_concurrency=params['llm_processing']['max_concurrency'],
+            checkpoint_every=params['llm_processing']['checkpoint_every'],
+            cache=load_extraction_cache(params),
+            settings=load_extraction_settings(params)
+            ))
+    else:
+        client = get_client()
+        is_ollama_server_running(client)
+
+        processed = process_in_batches(
+            df=df,
+            output_filepath=args.checkpoint_file_path,
+            client=client,
+            decoder_model_name=params['models']['decoder_model_name'],
+            batch_size=params['llm_processing']['batch_size'],
+            max_workers=params['llm_processing']['max_workers'],
+            cache=load_extraction_cache(params),
+            settings=load_extraction_settings(params)
+            )
+
+    for endpoint_stats in get_endpoint_pool().stats():
+        print(f"Ollama host {endpoint_stats['host']}: {endpoint_stats['requests']} requests, {endpoint_stats['failures']} failures")
+
+    if use_near_duplicates:
+        processed = propagate_to_duplicates(postings_df, processed.drop(columns=['refine_location']), representatives)
     
     # cleaning and operations on basic features
     processed['company_name'] = processed['company_name'].fillna('unknown')
-    processed['job_function'] = processed.title.apply(extract_job_function_from_title)
+    processed['job_function'] = extract_job_functions(processed.title)
     processed['seniority'] = processed.title.apply(extract_seniority_from_title)
+    # normalized like the skills looked up at serving time, these key the skill embedding cache
+    processed['cleaned_skills'] = processed['skills'].map(clean_skill_list)
     
     # remove internships
     processed = processed[(processed.seniority != 'intern')]
 
     print(processed.info())
-    processed.to_csv(args.output_path, index=True)
+    write_dataset(processed, args.output_path)
     
\ No newline at end of file
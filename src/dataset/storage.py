@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from typing import Iterator, List, Optional
+
+from embeddings.job_function import job_function_emb_prefix
+from embeddings.skills import skill_pooling_prefixes
+
+embedding_prefixes = tuple(skill_pooling_prefixes.values()) + (job_function_emb_prefix,)
+embedding_dtype = np.float32
+
+
+def embedding_columns(columns: List[str]) -> List[str]:
+    return [column for column in columns if column.startswith(embedding_prefixes)]
+
+
+def downcast_embeddings(df: pd.DataFrame) -> pd.DataFrame:
+    columns = embedding_columns(list(df.columns))
+    if columns:
+        df = df.astype({column: embedding_dtype for column in columns})
+    return df
+
+
+def temporary_path(path: str) -> str:
+    # same directory as `path`, so the final move is an atomic rename
+    return path + '.tmp'
+
+
+def write_dataset(df: pd.DataFrame, path: str):
+    """
+    Writes a pipeline dataset as Parquet, with embeddings downcast to float32.
+    String columns are dictionary encoded by Parquet, and list columns (skills)
+    are stored natively instead of as stringified Python lists.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df = downcast_embeddings(df)
+    # written aside then moved, so a failed write never leaves a truncated dataset at `path`
+    df.to_parquet(temporary_path(path), index=True)
+    os.replace(temporary_path(path), path)
+    print(f"Dataset with {len(df)} rows and {df.shape[1]} columns saved to '{path}'")
+
+
+def read_dataset(path: str, columns: Optional[List[str]] = None, categorical_columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads a pipeline dataset, only loading `columns` when given. The
+    `categorical_columns` are read straight from their Parquet dictionaries
+    into pandas categoricals, without materialising every string.
+    """
+    available_columns = set(pq.read_schema(path).names)
+    read_dictionary = [column for column in categorical_columns or [] if column in available_columns and (columns is None or column in columns)]
+
+    table = pq.read_table(path, columns=columns, read_dictionary=read_dictionary or None, use_pandas_metadata=True)
+    return table.to_pandas()
+
+
+def iter_dataset_batches(path: str, batch_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Reads a pipeline dataset `batch_size` rows at a time, with its index."""
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns, use_pandas_metadata=True):
+        yield batch.to_pandas()
+
+
+class DatasetWriter:
+    """
+    Appends batches of a pipeline dataset to a Parquet file, one row group per
+    batch, so a dataset larger than memory can be written as it is produced.
+    The schema is fixed by the first batch. Columns that batch has no value
+    for are typed as strings, the only columns of the pipeline left empty.
+    A `path` ending in '.csv' gets the batches appended as CSV rows instead.
+
+    Batches go to a temporary file next to `path`, moved over `path` by
+    `close` only, so a run failing halfway leaves the previous dataset in
+    place rather than a truncated one. Used as a context manager, the
+    dataset is discarded when the block raises.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.temporary_path = temporary_path(path)
+        self.is_csv = path.endswith('.csv')
+        self.schema = None
+        self.parquet_writer = None
+        self.started = False
+        self.rows_written = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(self.temporary_path):
+            os.remove(self.temporary_path)
+
+    def __enter__(self) -> 'DatasetWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, df: pd.DataFrame):
+        df = downcast_embeddings(df)
+        if self.is_csv:
+            df.to_csv(self.temporary_path, mode='a', header=not self.started, index=True)
+        elif self.parquet_writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            self.schema = pa.schema(
+                [pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field for field in table.schema],
+                metadata=table.schema.metadata
+            )
+            self.parquet_writer = pq.ParquetWriter(self.temporary_path, self.schema)
+            self.parquet_writer.write_table(table.cast(self.schema))
+        else:
+            self.parquet_writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=True))
+
+        self.started = True
+        self.rows_written += len(df)
+
+    def close(self):
+        """Finishes the file and moves it to `path`."""
+        if not self.started:
+            raise ValueError(f"No batch was written, '{self.path}' was left untouched.")
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        os.replace(self.temporary_path, self.path)
+        print(f"Dataset with {self.rows_written} rows saved to '{self.path}'")
+
+    def abort(self):
+        """Drops the batches written so far, leaving `path` untouched."""
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if os.path.exists(self.temporary_path):
+            os.remove(self.temporary_path)
+        print(f"Writing '{self.path}' was aborted after {self.rows_written} rows, it was left untouched")
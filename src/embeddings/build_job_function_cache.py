@@ -1,12 +1,14 @@
 import argparse
-import pandas as pd
 import yaml
 
-from embeddings.job_function import create_function_embedding_cache
+from dataset.storage import read_dataset
+from embeddings.job_function import create_function_embedding_cache, load_job_function_embedding_cache
+from embeddings.utils import get_cache_embedding_dimension
+from predictions.features import build_feature_schema, save_feature_schema
 
 
 if __name__ == '__main__':
-    df = pd.read_csv('data/datasets/postings_processed.csv', usecols=['job_function'])
+    df = read_dataset('data/datasets/postings_processed.parquet', columns=['job_function'])
 
     with open('params.yaml', 'r') as f:
         params = yaml.safe_load(f)
@@ -19,5 +21,12 @@ if __name__ == '__main__':
         df_input = df,
         function_column = 'job_function',
         encoder_model_name = params['models']['encoder_model_name'],
-        output_cache_path = args.job_function_cache_output
+        output_cache_path = args.job_function_cache_output,
+        dtype = params['embedding_store']['dtype']
     )
+
+    # record the feature layout so serving never has to load the encoder to learn it
+    embedding_dimension = get_cache_embedding_dimension(load_job_function_embedding_cache(args.job_function_cache_output))
+    save_feature_schema(build_feature_schema(
+        params['models']['encoder_model_name'], embedding_dimension, params['build_features']['skill_pooling_modes']
+    ))
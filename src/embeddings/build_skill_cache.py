@@ -1,12 +1,12 @@
 import argparse
-import pandas as pd
 import yaml
 
+from dataset.storage import read_dataset
 from embeddings.skills import create_skill_embedding_cache
 
 
 if __name__ == '__main__':
-    df = pd.read_csv('data/datasets/postings_processed.csv', usecols=['cleaned_skills'])
+    df = read_dataset('data/datasets/postings_processed.parquet', columns=['cleaned_skills'])
 
     with open('params.yaml', 'r') as f:
         params = yaml.safe_load(f)
@@ -19,5 +19,6 @@ if __name__ == '__main__':
         df_input = df,
         skill_column = 'cleaned_skills',
         encoder_model_name = params['models']['encoder_model_name'],
-        output_cache_path = args.skill_cache_output
+        output_cache_path = args.skill_cache_output,
+        dtype = params['embedding_store']['dtype']
     )
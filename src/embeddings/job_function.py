@@ -4,16 +4,21 @@ import numpy as np
 import pandas as pd
 import yaml
 
-from typing import Dict
-from sentence_transformers import SentenceTransformer
+from typing import Dict, Union
 from tqdm import tqdm
 
+from embeddings.store import EmbeddingStore, is_embedding_store, load_embedding_store, save_embedding_store
+from embeddings.utils import get_cache_embedding_dimension, load_encoder
+
 job_function_emb_prefix = 'job_func_emb_'
 
 
 def load_job_function_embedding_cache(
         cache_path: str = 'data/embedding_cache/job_function_embedding_cache.pkl'
-        ) -> Dict:
+        ) -> Union[Dict, EmbeddingStore]:
+    if is_embedding_store(cache_path):
+        return load_embedding_store(cache_path)
+
     if not os.path.exists(cache_path):
         raise FileNotFoundError(f"Embedding cache file not found at '{cache_path}'. Please run the training function first.")
 
@@ -25,10 +30,10 @@ def load_job_function_embedding_cache(
 
 def compute_job_function_embedding(
     job_function: str,
-    embedding_cache: Dict,
+    embedding_cache: Union[Dict, EmbeddingStore],
 ) -> pd.DataFrame:
     # Get the embedding dimension from the first item in the cache
-    embedding_dim = len(next(iter(embedding_cache.values())))
+    embedding_dim = get_cache_embedding_dimension(embedding_cache)
 
     # Look up the function in the cache, return zero vector if not found
     embedding_vector = embedding_cache.get(job_function, np.zeros(embedding_dim))
@@ -39,11 +44,13 @@ def create_function_embedding_cache(
         df_input: pd.DataFrame,
         function_column: str = 'job_function',
         encoder_model_name: str = 'all-MiniLM-L6-v2',
-        output_cache_path: str = 'data/embedding_cache/job_function_embedding_cache.pkl'
+        output_cache_path: str = 'data/embedding_cache/job_function_embedding_cache.pkl',
+        dtype: str = 'float32'
     ) -> pd.DataFrame:
     """
     Creates embeddings for the job_function feature, saves the learned
-    embedding mapping to a file.
+    embedding mapping to a file. A directory output path produces a
+    memory-mappable embedding store, a `.pkl` path the legacy pickled dict.
     """
     df = df_input.copy()
 
@@ -52,9 +59,13 @@ def create_function_embedding_cache(
     print(f"Found {len(unique_functions)} unique job functions to embed.")
 
     # Embed the categories
-    model = SentenceTransformer(encoder_model_name)
+    model = load_encoder(encoder_model_name)
     function_embeddings_array = model.encode(unique_functions, show_progress_bar=True)
 
+    if not output_cache_path.endswith('.pkl'):
+        save_embedding_store(list(unique_functions), function_embeddings_array, output_cache_path, dtype)
+        return
+
     # Create the mapping cache
     embedding_cache = {func: emb for func, emb in zip(unique_functions, function_embeddings_array)}
     print("Job function embeddings created.")
@@ -68,15 +79,16 @@ def create_function_embedding_cache(
 def compute_job_function_embedding_df(
     df_input: pd.DataFrame,
     function_column: str,
-    model: SentenceTransformer,
+    embedding_dim: int,
     embedding_cache
 ) -> pd.DataFrame:
-    df = df_input.copy()
+    # the embeddings are joined onto a new frame, so the input is not copied first
+    df = df_input
 
     tqdm.pandas()
     
     print("Applying embeddings to the DataFrame...")
-    embedding_series = df[function_column].progress_apply(lambda func: embedding_cache.get(func, np.zeros(model.get_sentence_embedding_dimension())))
+    embedding_series = df[function_column].progress_apply(lambda func: embedding_cache.get(func, np.zeros(embedding_dim)))
 
     embedding_df = pd.DataFrame(embedding_series.to_list(), index=df.index)
     embedding_df.columns = [f'{job_function_emb_prefix}{i}' for i in range(embedding_df.shape[1])]
@@ -4,44 +4,98 @@ import numpy as np
 import pandas as pd
 import yaml
 
-from typing import Dict, List
-from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+from embeddings.store import EmbeddingStore, is_embedding_store, load_embedding_store, save_embedding_store
+from embeddings.utils import get_cache_embedding_dimension, load_encoder
 from feature_cleaning.utils import parse_stringified_list
 
 mean_skill_emb_prefix = 'mean_skill_emb_'
 max_skill_emb_prefix = 'max_skill_emb_'
+tfidf_skill_emb_prefix = 'tfidf_skill_emb_'
 
+# column prefix of the pooled skill embeddings, per pooling mode
+skill_pooling_prefixes = {
+    'mean': mean_skill_emb_prefix,
+    'max': max_skill_emb_prefix,
+    'tfidf_mean': tfidf_skill_emb_prefix,
+}
+
+skill_idf_file_name = 'idf.npy'
+
+
+def validate_skill_pooling_modes(modes: Sequence[str], idf: Optional[np.ndarray] = None, check_idf: bool = True):
+    if not modes:
+        raise ValueError(f"At least one skill pooling mode is needed, expected some of {list(skill_pooling_prefixes)}.")
+    for mode in modes:
+        if mode not in skill_pooling_prefixes:
+            raise ValueError(f"Unknown skill pooling mode '{mode}', expected one of {list(skill_pooling_prefixes)}.")
+    if len(set(modes)) != len(modes):
+        raise ValueError(f"Skill pooling modes {list(modes)} have duplicates.")
+    if check_idf and 'tfidf_mean' in modes and idf is None:
+        raise ValueError("The 'tfidf_mean' pooling needs the skill IDF weights of the embedding store.")
+
+
+def load_skill_cache(cache_path: str) -> Union[Dict, EmbeddingStore]:
+    """
+    Loads the skill embeddings. The IDF weights saved with an embedding store
+    are loaded along, as the store's `idf`.
+    """
+    if is_embedding_store(cache_path):
+        embedding_cache = load_embedding_store(cache_path)
+        embedding_cache.idf = load_skill_idf(cache_path)
+        return embedding_cache
 
-def load_skill_cache(cache_path: str) -> Dict:
     if not os.path.exists(cache_path):
         raise FileNotFoundError(f"Embedding cache file not found at '{cache_path}'. Please run the training function first.")
 
     with open(cache_path, 'rb') as f:
         embedding_cache = pickle.load(f)
-    
-    return embedding_cache
+
+    # a store can keep what is built from it, such as the skill matcher
+    return EmbeddingStore.from_dict(embedding_cache)
 
 
 def compute_aggregated_skill_embeddings(
         cleaned_skill_list: List,
-        embedding_cache: Dict
-    ):
+        embedding_cache: Union[Dict, EmbeddingStore],
+        modes: Sequence[str] = ('mean', 'max'),
+        idf: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
     """
-    Looks up embeddings once and computes both mean and max.
-    Returns a tuple: (mean_vector, max_vector).
+    Pools the skill embeddings of a single posting, looking them up once.
+    Returns a vector per mode, the same as `pool_skill_embeddings` gives for
+    the posting. 'tfidf_mean' needs an embedding store, which `idf` is aligned with.
     """
-    embedding_dim = len(next(iter(embedding_cache.values())))
+    validate_skill_pooling_modes(modes, idf)
+    embedding_dim = get_cache_embedding_dimension(embedding_cache)
+    pooled = {mode: np.zeros(embedding_dim, dtype=np.float32) for mode in modes}
 
     if not isinstance(cleaned_skill_list, list):
-        return (np.zeros(embedding_dim), np.zeros(embedding_dim))
+        return pooled
+
+    if isinstance(embedding_cache, EmbeddingStore):
+        # single gather of the known rows, then reduce
+        rows = embedding_cache.indices(cleaned_skill_list)
+        embeddings = np.asarray(embedding_cache.matrix[rows], dtype=np.float32)
+    else:
+        if 'tfidf_mean' in modes:
+            raise ValueError("The 'tfidf_mean' pooling needs the skill embeddings as an embedding store.")
+        embeddings = [embedding_cache[skill] for skill in cleaned_skill_list if skill in embedding_cache]
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), embedding_dim)
 
-    embeddings = [embedding_cache[skill] for skill in cleaned_skill_list if skill in embedding_cache]
-    if not embeddings:
-        return (np.zeros(embedding_dim), np.zeros(embedding_dim))
+    if len(embeddings) == 0:
+        return pooled
 
-    return (np.mean(embeddings, axis=0), np.max(embeddings, axis=0))
+    if 'mean' in modes:
+        pooled['mean'] = embeddings.mean(axis=0)
+    if 'max' in modes:
+        pooled['max'] = embeddings.max(axis=0)
+    if 'tfidf_mean' in modes:
+        weights = idf[rows].astype(np.float32)
+        pooled['tfidf_mean'] = weights @ embeddings / weights.sum()
+
+    return pooled
 
 
 def create_skill_embedding_cache( 
@@ -49,7 +103,12 @@ def create_skill_embedding_cache(
     encoder_model_name: str,
     output_cache_path: str,
     skill_column: str = 'cleaned_skills',
+    dtype: str = 'float32',
   ) -> pd.DataFrame:
+    """
+    Embeds every unique skill and saves the mapping. A directory output path
+    produces a memory-mappable embedding store, a `.pkl` path the legacy pickled dict.
+    """
     df = df_input.copy()
     df[skill_column] = df[skill_column].apply(parse_stringified_list)
 
@@ -57,9 +116,15 @@ def create_skill_embedding_cache(
     all_skills = [skill for skill in unique_skills if isinstance(skill, str)]
 
     print(f"Found {len(all_skills)} unique skills to embed.")
-    model = SentenceTransformer(encoder_model_name)
+    model = load_encoder(encoder_model_name)
 
     unique_skill_embeddings = model.encode(all_skills, show_progress_bar=True)
+
+    if not output_cache_path.endswith('.pkl'):
+        save_embedding_store(all_skills, unique_skill_embeddings, output_cache_path, dtype)
+        save_skill_idf(compute_skill_idf(df[skill_column], all_skills), output_cache_path)
+        return
+
     embedding_cache = {skill: emb for skill, emb in zip(all_skills, unique_skill_embeddings)}
     print("Embeddings cached.")
 
@@ -68,36 +133,132 @@ def create_skill_embedding_cache(
     print(f"Embedding cache saved to '{output_cache_path}'")
 
 
-def compute_skills_embeddings_df(
-    df_input: pd.DataFrame,
-    skill_column: str,
-    model: SentenceTransformer,
-    embedding_cache
-  ) -> pd.DataFrame:
-    df = df_input.copy()
-    
-    tqdm.pandas()
+def compute_skill_idf(skill_lists: pd.Series, vocabulary: List[str]) -> np.ndarray:
+    """
+    Smoothed inverse document frequency of every vocabulary skill over the
+    postings, log((1 + n) / (1 + df)) + 1, aligned with the vocabulary order.
+    """
+    document_skills = skill_lists.map(lambda skills: list(set(skills)) if isinstance(skills, (list, np.ndarray)) else []).explode().dropna()
+    document_frequency = pd.Index(vocabulary).get_indexer(document_skills.to_numpy(dtype=object))
+    counts = np.bincount(document_frequency[document_frequency >= 0], minlength=len(vocabulary))
+    return (np.log((1 + len(skill_lists)) / (1 + counts)) + 1).astype(np.float32)
 
-    embedding_dim = model.get_sentence_embedding_dimension()
 
-    def get_aggregated_vectors(skill_list: List):
-        if not isinstance(skill_list, list):
-            return (np.zeros(embedding_dim), np.zeros(embedding_dim))
+def save_skill_idf(idf: np.ndarray, store_dir: str):
+    np.save(os.path.join(store_dir, skill_idf_file_name), idf)
 
-        embeddings = [embedding_cache[skill] for skill in skill_list if skill in embedding_cache]
-        if not embeddings:
-            return (np.zeros(embedding_dim), np.zeros(embedding_dim))
 
-        return (np.mean(embeddings, axis=0), np.max(embeddings, axis=0))
+def load_skill_idf(store_dir: str) -> Optional[np.ndarray]:
+    """IDF weights saved next to a skill embedding store, None when the store has none."""
+    path = os.path.join(store_dir, skill_idf_file_name)
+    return np.load(path) if os.path.exists(path) else None
 
-    print("Aggregating mean and max embeddings for each job posting...")
 
-    results_series = df[skill_column].progress_apply(get_aggregated_vectors)
+def get_skill_idf(embedding_cache: Union[Dict, EmbeddingStore]) -> Optional[np.ndarray]:
+    """IDF weights loaded with `embedding_cache` by `load_skill_cache`, None when it has none."""
+    return embedding_cache.idf if isinstance(embedding_cache, EmbeddingStore) else None
 
-    mean_aggregated_vectors = [result[0] for result in results_series]
-    max_aggregated_vectors = [result[1] for result in results_series]
 
-    mean_df = pd.DataFrame(mean_aggregated_vectors, index=df.index).add_prefix(mean_skill_emb_prefix)
-    max_df = pd.DataFrame(max_aggregated_vectors, index=df.index).add_prefix(max_skill_emb_prefix)
+def get_embedding_matrix(embedding_cache: Union[Dict, EmbeddingStore]) -> Tuple[np.ndarray, pd.Index]:
+    """
+    The cache as an embedding matrix and the index of its vocabulary, so keys
+    are looked up in bulk. A store already holds both, a dict is stacked on every call.
+    """
+    if isinstance(embedding_cache, EmbeddingStore):
+        return embedding_cache.matrix, embedding_cache.vocabulary_index
+    keys = list(embedding_cache)
+    matrix = np.stack([embedding_cache[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+    return matrix, pd.Index(keys)
+
+
+def pool_skill_embeddings(
+        skill_lists: Sequence,
+        embedding_cache: Union[Dict, EmbeddingStore],
+        modes: Sequence[str] = ('mean', 'max'),
+        idf: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+    """
+    Pools the embeddings of every posting's skills, for all postings at once.
+
+    The skill lists are flattened into one array of vocabulary rows, where
+    every posting is a segment. Postings are sorted by decreasing number of
+    skills, so the postings that have a k-th skill are always a prefix: the
+    k-th skill embeddings of all of them are gathered at once and reduced
+    in place into that prefix of the pooled matrices. The loop runs over skill
+    positions, not postings, and every step is a contiguous array operation.
+    Skills missing from the cache are skipped, and postings without any known
+    skill get zero vectors. 'tfidf_mean' weights each skill occurrence by its
+    `idf`, so repeated skills count by their term frequency. Returns a (n_postings, dim) float32 matrix per mode.
+    """
+    validate_skill_pooling_modes(modes, idf)
+    matrix, vocabulary = get_embedding_matrix(embedding_cache)
+    embedding_dim = get_cache_embedding_dimension(embedding_cache)
+    n_postings = len(skill_lists)
+    pooled = {mode: np.zeros((n_postings, embedding_dim), dtype=np.float32) for mode in modes}
+
+    skills = pd.Series(list(skill_lists), dtype=object)
+    skills = skills.where(skills.map(lambda value: isinstance(value, (list, np.ndarray))), None).explode()
+    rows = vocabulary.get_indexer(skills.to_numpy(dtype=object))
+    known = rows >= 0
+    if not known.any():
+        return pooled
+
+    # postings of the known skills, in order, so every posting is a contiguous segment
+    postings = skills.index.to_numpy()[known]
+    rows = rows[known]
+    counts = np.bincount(postings, minlength=n_postings)
+    segment_starts = np.cumsum(counts) - counts
+
+    order = np.argsort(-counts, kind='stable')[:np.count_nonzero(counts)]
+    lengths = counts[order]
+    starts = segment_starts[order]
+    # number of postings with more than k skills, for every position k
+    active_postings = np.searchsorted(-lengths, -np.arange(lengths[0]), side='left')
+
+    embeddings = np.asarray(matrix[rows[starts]], dtype=np.float32)
+    sums = embeddings.copy() if 'mean' in modes else None
+    maxima = embeddings.copy() if 'max' in modes else None
+    if 'tfidf_mean' in modes:
+        weights = idf[rows]
+        weight_sums = weights[starts].astype(np.float32)
+        weighted_sums = embeddings * weight_sums[:, None]
+
+    for position in range(1, lengths[0]):
+        active = active_postings[position]
+        skill_positions = starts[:active] + position
+        embeddings = np.asarray(matrix[rows[skill_positions]], dtype=np.float32)
+        if sums is not None:
+            sums[:active] += embeddings
+        if maxima is not None:
+            np.maximum(maxima[:active], embeddings, out=maxima[:active])
+        if 'tfidf_mean' in modes:
+            skill_weights = weights[skill_positions]
+            weight_sums[:active] += skill_weights
+            weighted_sums[:active] += embeddings * skill_weights[:, None]
+
+    if 'mean' in modes:
+        pooled['mean'][order] = sums / lengths[:, None]
+    if 'max' in modes:
+        pooled['max'][order] = maxima
+    if 'tfidf_mean' in modes:
+        pooled['tfidf_mean'][order] = weighted_sums / weight_sums[:, None]
+
+    return pooled
+
+
+def compute_skills_embeddings_df(
+    df_input: pd.DataFrame,
+    skill_column: str,
+    embedding_dim: int,
+    embedding_cache,
+    pooling_modes: Sequence[str] = ('mean', 'max'),
+    idf: Optional[np.ndarray] = None
+  ) -> pd.DataFrame:
+    print(f"Pooling skill embeddings ({', '.join(pooling_modes)}) for each job posting...")
+    pooled = pool_skill_embeddings(df_input[skill_column].to_numpy(dtype=object), embedding_cache, pooling_modes, idf)
 
-    return df.join(mean_df).join(max_df)
+    pooled_df = pd.concat(
+        [pd.DataFrame(pooled[mode], index=df_input.index).add_prefix(skill_pooling_prefixes[mode]) for mode in pooling_modes],
+        axis=1
+    )
+    return df_input.join(pooled_df)
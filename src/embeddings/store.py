@@ -0,0 +1,103 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional
+
+embeddings_file_name = 'embeddings.npy'
+vocabulary_file_name = 'vocabulary.json'
+
+
+class EmbeddingStore(Mapping):
+    """
+    Read-only embedding lookup backed by one contiguous matrix and a vocabulary index.
+
+    The matrix is stored as an `.npy` file and memory-mapped on load, so opening
+    the store is near instant and every process serving the same file shares
+    its pages through the OS page cache. The store behaves like the
+    `{str: np.ndarray}` dict caches it replaces, and adds vectorised lookups.
+    """
+
+    def __init__(self, matrix: np.ndarray, vocabulary: Dict[str, int], idf: Optional[np.ndarray] = None):
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        # the keys in row order, so a whole array of keys is looked up at once
+        keys = np.empty(len(vocabulary), dtype=object)
+        keys[list(vocabulary.values())] = list(vocabulary)
+        self.vocabulary_index = pd.Index(keys)
+        # IDF weight of every row, for the stores that have them
+        self.idf = idf
+        # structures built from the store once and kept with it, e.g. the compiled skill matcher
+        self.derived: Dict[str, object] = {}
+
+    @classmethod
+    def from_dict(cls, embeddings: Dict[str, np.ndarray]) -> 'EmbeddingStore':
+        """In-memory store of a legacy `{str: np.ndarray}` cache."""
+        keys = list(embeddings)
+        matrix = np.stack([np.asarray(embeddings[key], dtype=np.float32) for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+        return cls(matrix, {key: i for i, key in enumerate(keys)})
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return np.asarray(self.matrix[self.vocabulary[key]], dtype=np.float32)
+
+    def __contains__(self, key) -> bool:
+        return key in self.vocabulary
+
+    def __iter__(self):
+        return iter(self.vocabulary)
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    def indices(self, keys: Iterable[str]) -> np.ndarray:
+        """Row indices of the known keys, unknown keys are skipped."""
+        vocabulary = self.vocabulary
+        return np.fromiter((vocabulary[key] for key in keys if key in vocabulary), dtype=np.int64)
+
+    def gather(self, keys: Iterable[str]) -> np.ndarray:
+        """Returns a (n_known_keys, dim) float32 matrix of the known keys' embeddings."""
+        return np.asarray(self.matrix[self.indices(keys)], dtype=np.float32)
+
+
+def save_embedding_store(
+        keys: List[str],
+        embeddings: np.ndarray,
+        output_dir: str,
+        dtype: str = 'float32'
+    ):
+    if dtype not in ('float32', 'float16'):
+        raise ValueError(f"Unsupported embedding store dtype '{dtype}'. Use 'float32' or 'float16'.")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    matrix = np.ascontiguousarray(embeddings, dtype=dtype)
+    np.save(os.path.join(output_dir, embeddings_file_name), matrix)
+
+    vocabulary = {key: i for i, key in enumerate(keys)}
+    with open(os.path.join(output_dir, vocabulary_file_name), 'w') as f:
+        json.dump(vocabulary, f)
+
+    print(f"Embedding store with {len(vocabulary)} vectors ({dtype}) saved to '{output_dir}'")
+
+
+def load_embedding_store(store_dir: str, mmap: bool = True) -> EmbeddingStore:
+    embeddings_path = os.path.join(store_dir, embeddings_file_name)
+    vocabulary_path = os.path.join(store_dir, vocabulary_file_name)
+    if not os.path.exists(embeddings_path) or not os.path.exists(vocabulary_path):
+        raise FileNotFoundError(f"Embedding store not found at '{store_dir}'. Please run the training function first.")
+
+    matrix = np.load(embeddings_path, mmap_mode='r' if mmap else None)
+    with open(vocabulary_path, 'r') as f:
+        vocabulary = json.load(f)
+
+    return EmbeddingStore(matrix, vocabulary)
+
+
+def is_embedding_store(path: str) -> bool:
+    return os.path.isdir(path)
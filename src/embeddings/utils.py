@@ -1,6 +1,20 @@
-from sentence_transformers import SentenceTransformer
+from typing import Dict, Union
+
+from embeddings.store import EmbeddingStore
+
+
+def load_encoder(model_name: str):
+    # sentence_transformers pulls in torch, only import it when we actually encode
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
 
 
 def get_embedding_dimension(model_name) -> int:
-    model = SentenceTransformer(model_name)
+    model = load_encoder(model_name)
     return model.get_sentence_embedding_dimension()
+
+
+def get_cache_embedding_dimension(embedding_cache: Union[Dict, EmbeddingStore]) -> int:
+    if isinstance(embedding_cache, EmbeddingStore):
+        return embedding_cache.dim
+    return len(next(iter(embedding_cache.values())))
@@ -1,4 +1,136 @@
 import re
+import pandas as pd
+
+from typing import Dict, Optional
+
+from feature_extraction.keyword_matcher import KeywordRuleMatcher
+
+
+# Mappings for major metropolitan areas, the first matching keyword wins
+metro_map = {
+    'new york': 'metro_nyc', 'nyc': 'metro_nyc', 'jersey city': 'metro_nyc', 'stamford': 'metro_nyc', 'brooklyn': 'metro_nyc', 'queens': 'metro_nyc', 'newark': 'metro_nyc', 'albany, ny': 'metro_albany',
+    'sf': 'metro_sf_bay', 'san francisco': 'metro_sf_bay', 'bay area': 'metro_sf_bay', 'cupertino': 'metro_sf_bay', 'palo alto': 'metro_sf_bay', 'sunnyvale': 'metro_sf_bay', 'mountain view': 'metro_sf_bay', 'santa clara': 'metro_sf_bay', 'redwood city': 'metro_sf_bay', 'livermore': 'metro_sf_bay',
+    'los angeles': 'metro_la', 'burbank': 'metro_la', 'anaheim': 'metro_la', 'malibu': 'metro_la', 'culver city': 'metro_la', 'glendale': 'metro_la', 'pasadena': 'metro_la', 'downey': 'metro_la', 'orange county': 'metro_la',
+    'boston': 'metro_boston', 'cambridge': 'metro_boston',
+    'seattle': 'metro_seattle', 'issaquah': 'metro_seattle',
+    'chicago': 'metro_chicago',
+    'austin': 'metro_austin',
+    'dallas': 'metro_dfw', 'fort worth': 'metro_dfw', 'plano': 'metro_dfw', 'dfw': 'metro_dfw',
+    'washington, dc': 'metro_dc', 'ashburn': 'metro_dc', 'falls church': 'metro_dc',
+    'san diego': 'metro_san_diego', 'la jolla': 'metro_san_diego', 'coronado': 'metro_san_diego',
+    'denver': 'metro_denver', 'aurora': 'metro_denver',
+    'atlanta': 'metro_atlanta', 'alpharetta': 'metro_atlanta',
+    'miami': 'metro_miami', 'boca raton': 'metro_miami',
+    'phoenix': 'metro_phoenix', 'gilbert': 'metro_phoenix',
+    'raleigh': 'metro_raleigh_durham', 'durham': 'metro_raleigh_durham', 'chapel hill': 'metro_raleigh_durham',
+    'houston': 'metro_houston',
+    'philadelphia': 'metro_philly', 'king of prussia': 'metro_philly',
+}
+
+states = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
+    'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS',
+    'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA',
+    'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT',
+    'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM',
+    'new york': 'NY', 'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK',
+    'oregon': 'OR', 'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC',
+    'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT',
+    'virginia': 'VA', 'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+    'district of columbia': 'DC'
+}
+
+
+# normalized locations that do not say where the job is, worth refining from the description
+inconclusive_locations = ['other_us', 'unknown']
+
+
+class LocationNormalizer:
+    """
+    Maps raw location strings to standardized regions. The metro keywords are
+    compiled into a single-pass matcher and the state patterns are compiled
+    once, so the normalizer should be built once and reused.
+    """
+
+    def __init__(self, metro_map: Dict[str, str] = metro_map, states: Dict[str, str] = states):
+        self.metro_matcher = KeywordRuleMatcher([(metro_name, [keyword]) for keyword, metro_name in metro_map.items()])
+        self.states = states
+
+        # Create regex patterns: \b means word boundary
+        self.state_abbr_pattern = re.compile(r'\b(' + '|'.join(states.values()) + r')\b', re.IGNORECASE)
+        self.state_name_pattern = re.compile(r'\b(' + '|'.join(states.keys()) + r')\b', re.IGNORECASE)
+
+    def normalize(self, location: str) -> str:
+        """
+        Cleans a raw location string and maps it to a standardized region.
+        Prioritizes major metropolitan areas and falls back to the state level.
+        """
+        if not isinstance(location, str):
+            return "unknown"
+
+        # --- IDEMPOTENCY CHECK ---
+        # If the location is already in a clean format, return it immediately.
+        if location.startswith(('metro_', 'state_')) or location in ['remote', 'other_us', 'unknown']:
+            return location
+
+        loc_lower = location.lower()
+
+        # --- 1. Handle Remote first ---
+        if 'remote' in loc_lower:
+            return "remote"
+
+        # --- 2. Major metropolitan areas ---
+        rule_index = self.metro_matcher.match(loc_lower)
+        if rule_index != self.metro_matcher.no_match:
+            return self.metro_matcher.labels[rule_index]
+
+        # --- 3. Fallback to State level using regex ---
+        # First, look for abbreviations (more reliable, e.g., 'CA' vs 'Washington')
+        match_abbr = self.state_abbr_pattern.search(location)
+        if match_abbr:
+            return f"state_{match_abbr.group(1).upper()}"
+
+        # If no abbreviation, look for full state name
+        match_name = self.state_name_pattern.search(loc_lower)
+        if match_name:
+            state_abbr = self.states[match_name.group(1)]
+            return f"state_{state_abbr}"
+
+        # --- 4. If all else fails, categorize ---
+        # if 'united states' in loc_lower or 'usa' in loc_lower:
+        #     return 'other_us'
+
+        # the dataset contains only listings for the US
+        return "other_us"
+
+    def refine(self, cleaned_location: str, refined_location: Optional[str]) -> str:
+        """
+        Replaces an inconclusive cleaned location by the normalized location
+        the LLM found in the description, when that one is conclusive.
+        """
+        if cleaned_location not in inconclusive_locations or not isinstance(refined_location, str):
+            return cleaned_location
+
+        normalized = self.normalize(refined_location)
+        return cleaned_location if normalized in inconclusive_locations else normalized
+
+    def refine_series(self, cleaned_locations: pd.Series, refined_locations: pd.Series) -> pd.Series:
+        normalized = self.normalize_series(refined_locations)
+        to_refine = cleaned_locations.isin(inconclusive_locations) & refined_locations.notna() & ~normalized.isin(inconclusive_locations)
+        return cleaned_locations.where(~to_refine, normalized)
+
+    def normalize_series(self, locations: pd.Series) -> pd.Series:
+        """
+        Normalizes every distinct raw location once and maps the results back,
+        which is much cheaper than a row-wise apply on repetitive columns.
+        """
+        unique_locations = locations.dropna().unique()
+        normalized = {location: self.normalize(location) for location in unique_locations}
+        return locations.map(normalized).fillna("unknown")
+
+
+location_normalizer = LocationNormalizer()
 
 
 def clean_and_standardize_location(location: str) -> str:
@@ -6,80 +138,4 @@ def clean_and_standardize_location(location: str) -> str:
     Cleans a raw location string and maps it to a standardized region.
     Prioritizes major metropolitan areas and falls back to the state level.
     """
-    if not isinstance(location, str):
-        return "unknown"
-
-    # --- IDEMPOTENCY CHECK ---
-    # If the location is already in a clean format, return it immediately.
-    if re.match(r'^(metro_|state_)', location) or location in ['remote', 'other_us', 'unknown']:
-        return location
-
-    loc_lower = location.lower()
-
-    # --- 1. Handle Remote first ---
-    if 'remote' in loc_lower:
-        return "remote"
-
-    # --- 2. Define mappings for major metropolitan areas ---
-    metro_map = {
-        'new york': 'metro_nyc', 'nyc': 'metro_nyc', 'jersey city': 'metro_nyc', 'stamford': 'metro_nyc', 'brooklyn': 'metro_nyc', 'queens': 'metro_nyc', 'newark': 'metro_nyc', 'albany, ny': 'metro_albany',
-        'sf': 'metro_sf_bay', 'san francisco': 'metro_sf_bay', 'bay area': 'metro_sf_bay', 'cupertino': 'metro_sf_bay', 'palo alto': 'metro_sf_bay', 'sunnyvale': 'metro_sf_bay', 'mountain view': 'metro_sf_bay', 'santa clara': 'metro_sf_bay', 'redwood city': 'metro_sf_bay', 'livermore': 'metro_sf_bay',
-        'los angeles': 'metro_la', 'burbank': 'metro_la', 'anaheim': 'metro_la', 'malibu': 'metro_la', 'culver city': 'metro_la', 'glendale': 'metro_la', 'pasadena': 'metro_la', 'downey': 'metro_la', 'orange county': 'metro_la',
-        'boston': 'metro_boston', 'cambridge': 'metro_boston',
-        'seattle': 'metro_seattle', 'issaquah': 'metro_seattle',
-        'chicago': 'metro_chicago',
-        'austin': 'metro_austin',
-        'dallas': 'metro_dfw', 'fort worth': 'metro_dfw', 'plano': 'metro_dfw', 'dfw': 'metro_dfw',
-        'washington, dc': 'metro_dc', 'ashburn': 'metro_dc', 'falls church': 'metro_dc',
-        'san diego': 'metro_san_diego', 'la jolla': 'metro_san_diego', 'coronado': 'metro_san_diego',
-        'denver': 'metro_denver', 'aurora': 'metro_denver',
-        'atlanta': 'metro_atlanta', 'alpharetta': 'metro_atlanta',
-        'miami': 'metro_miami', 'boca raton': 'metro_miami',
-        'phoenix': 'metro_phoenix', 'gilbert': 'metro_phoenix',
-        'raleigh': 'metro_raleigh_durham', 'durham': 'metro_raleigh_durham', 'chapel hill': 'metro_raleigh_durham',
-        'houston': 'metro_houston',
-        'philadelphia': 'metro_philly', 'king of prussia': 'metro_philly',
-    }
-
-    for keyword, metro_name in metro_map.items():
-        if keyword in loc_lower:
-            return metro_name
-
-    # --- 3. Fallback to State level using regex ---
-    states = {
-        'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
-        'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
-        'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS',
-        'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA',
-        'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT',
-        'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM',
-        'new york': 'NY', 'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK',
-        'oregon': 'OR', 'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC',
-        'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT',
-        'virginia': 'VA', 'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
-        'district of columbia': 'DC'
-    }
-    state_abbrs = list(states.values())
-    state_names = list(states.keys())
-
-    # Create regex patterns: \b means word boundary
-    state_abbr_pattern = re.compile(r'\b(' + '|'.join(state_abbrs) + r')\b', re.IGNORECASE)
-    state_name_pattern = re.compile(r'\b(' + '|'.join(state_names) + r')\b', re.IGNORECASE)
-
-    # First, look for abbreviations (more reliable, e.g., 'CA' vs 'Washington')
-    match_abbr = state_abbr_pattern.search(location)
-    if match_abbr:
-        return f"state_{match_abbr.group(1).upper()}"
-
-    # If no abbreviation, look for full state name
-    match_name = state_name_pattern.search(loc_lower)
-    if match_name:
-        state_abbr = states[match_name.group(1)]
-        return f"state_{state_abbr}"
-
-    # --- 4. If all else fails, categorize ---
-    # if 'united states' in loc_lower or 'usa' in loc_lower:
-    #     return 'other_us'
-
-    # the dataset contains only listings for the US
-    return "other_us"
+    return location_normalizer.normalize(location)
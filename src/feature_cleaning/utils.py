@@ -1,11 +1,15 @@
 import ast
+import numpy as np
 import pandas as pd
 
 def parse_stringified_list(val):
     """
     Safely parses a string that looks like a list back into a Python list.
-    Handles potential errors like empty or malformed cells.
+    Handles potential errors like empty or malformed cells. Native list
+    cells, which Parquet returns as numpy arrays, are returned as lists.
     """
+    if isinstance(val, (list, np.ndarray)):
+        return list(val)
     if pd.isna(val):
         return []
     try:
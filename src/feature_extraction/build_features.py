@@ -1,43 +1,81 @@
 import argparse
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import yaml
 
+from typing import Dict, Optional, Sequence
+
+from dataset.storage import DatasetWriter, iter_dataset_batches
 from embeddings.job_function import compute_job_function_embedding_df, load_job_function_embedding_cache
-from embeddings.skills import compute_skills_embeddings_df, load_skill_cache
+from embeddings.skills import compute_skills_embeddings_df, get_skill_idf, load_skill_cache
+from embeddings.utils import get_cache_embedding_dimension
 from feature_cleaning.education_level import clean_and_categorize_education
-from feature_cleaning.location import clean_and_standardize_location
+from feature_cleaning.location import location_normalizer
+from feature_extraction.interactions import build_interaction_columns
+from predictions.features import load_feature_schema
 
 
-if __name__ == '__main__':
-    processed = pd.read_csv('data/datasets/postings_processed.csv', index_col=0)
+def build_feature_batch(
+        processed: pd.DataFrame,
+        job_function_embedding_cache: Dict,
+        skill_embedding_cache: Dict,
+        embedding_dim: int,
+        skill_pooling_modes: Sequence[str] = ('mean', 'max'),
+        skill_idf: Optional[np.ndarray] = None
+        ) -> pd.DataFrame:
+    """
+    Cleaned, interaction and embedding features of a batch of processed
+    postings. Every feature only depends on its own row, so batches can be
+    built independently.
+    """
+    # clean basic features
+    processed['cleaned_location'] = location_normalizer.normalize_series(processed.location)
+    if 'refined_location' in processed.columns:
+        processed['cleaned_location'] = location_normalizer.refine_series(processed['cleaned_location'], processed['refined_location'])
+    processed['cleaned_education_level'] = processed['education_level'].apply(clean_and_categorize_education)
+
+    # build interaction features
+    interactions = build_interaction_columns(processed)
+    processed[interactions.columns] = interactions
+
+    # build embeddings from cache
+    processed = compute_job_function_embedding_df(processed, 'job_function', embedding_dim, job_function_embedding_cache)
+    processed = compute_skills_embeddings_df(processed, 'cleaned_skills', embedding_dim, skill_embedding_cache, skill_pooling_modes, skill_idf)
+
+    return processed
+
 
+if __name__ == '__main__':
     with open('params.yaml', 'r') as f:
         params = yaml.safe_load(f)
 
     parser = argparse.ArgumentParser()
+    parser.add_argument('--input-path', type=str, default='data/datasets/postings_processed.parquet')
     parser.add_argument('--output-path', type=str, required=True)
+    parser.add_argument('--batch-size', type=int, default=params['build_features']['batch_size'],
+                        help='Postings read, featurized and written at a time, peak memory grows with it.')
     args = parser.parse_args()
 
-    # clean basic features
-    processed['cleaned_location'] = processed.location.apply(clean_and_standardize_location)
-    processed['cleaned_education_level'] = processed['education_level'].apply(clean_and_categorize_education)
-
-    # build interaction features
-    processed['seniority_job_function'] = processed['seniority'] + '_' + processed['job_function']
-    processed['location_job_function'] = processed['cleaned_location'] + '_' + processed['job_function']
-    processed['company_experience'] = processed.apply(lambda row: row['company_name'] + '_' + str(row['experience_years_required']), axis=1)
-    processed['job_function_experience'] = processed.apply(lambda row: row['job_function'] + '_' + str(row['experience_years_required']), axis=1)
-    processed['seniority_function_location'] = processed['seniority'] + '_' + processed['job_function'] + '_' + processed['cleaned_location']
-    processed['seniority_function_experience'] = processed.apply(lambda row: row['seniority'] + '_' + row['job_function'] + '_' + str(row['experience_years_required']), axis=1)
-
-    # build embeddings from cache
-    model = SentenceTransformer(params['models']['encoder_model_name'])
-    
     job_function_embedding_cache = load_job_function_embedding_cache(params['embedding_paths']['job_function_cache'])
     skill_embedding_cache = load_skill_cache(params['embedding_paths']['skill_cache'])
-    processed = compute_job_function_embedding_df(processed, 'job_function', model, job_function_embedding_cache)
-    processed = compute_skills_embeddings_df(processed, 'skills', model, skill_embedding_cache)
+    embedding_dim = get_cache_embedding_dimension(skill_embedding_cache)
+
+    skill_pooling_modes = params['build_features']['skill_pooling_modes']
+    # the model is trained and served on the features of the schema, so the dataset must hold exactly those
+    schema_modes = load_feature_schema()['skill_pooling_modes']
+    if list(skill_pooling_modes) != schema_modes:
+        raise ValueError(f"Skill pooling modes {list(skill_pooling_modes)} differ from the feature schema's {schema_modes}, rebuild the job function embedding cache.")
+
+    skill_idf = None
+    if 'tfidf_mean' in skill_pooling_modes:
+        skill_idf = get_skill_idf(skill_embedding_cache)
+        if skill_idf is None:
+            raise ValueError(f"'tfidf_mean' skill pooling needs the IDF weights saved with the skill embedding store, rebuild '{params['embedding_paths']['skill_cache']}'.")
 
-    print(processed.info())
-    processed.to_csv(args.output_path, index=True)
+    # the dataset is streamed through in batches, so it never has to fit in memory
+    with DatasetWriter(args.output_path) as writer:
+        for processed in iter_dataset_batches(args.input_path, args.batch_size):
+            writer.write(build_feature_batch(
+                processed, job_function_embedding_cache, skill_embedding_cache, embedding_dim, skill_pooling_modes, skill_idf
+            ))
+            print(f"{writer.rows_written} postings featurized")
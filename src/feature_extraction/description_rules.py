@@ -0,0 +1,156 @@
+import re
+
+from typing import Dict, List
+
+from feature_extraction.skill_matcher import SkillVocabularyMatcher
+
+number_words = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'fifteen': 15, 'twenty': 20
+}
+_number = r"(\d{1,2}|" + '|'.join(number_words) + r")"
+
+# spaces within a sentence: no pattern reads across a sentence or line break
+_space = r"[^\S\n]+"
+_years = r"\s*\+?[^\S\n]*(?:years?|yrs?)\b"
+# "18 years of age", "21 years old"
+_not_age = r"(?!['’]?" + _space + r"(?:of" + _space + r")?(?:age|old)\b)"
+
+experience_patterns = [
+    # "5+ years of experience", "3-5 years of relevant professional experience", "two years' experience"
+    re.compile(
+        _number + r"[^\S\n]*\+?[^\S\n]*(?:(?:-|–|to)[^\S\n]*" + _number + r")?" + _years + r"['’]?"
+        + r"(?:" + _space + r"(?:of|in)(?:" + _space + r"[\w'’/&-]+){0,4}?)?" + _space + r"(?:experience|exp)\b",
+        re.IGNORECASE
+    ),
+    # "experience: 5+ years", "experience required: at least 3 years", "experience of 2 years"
+    re.compile(
+        r"\bexperience(?:" + _space + r"(?:required|preferred|needed|requirements?))?[^\S\n]*(?::|-|–|of)?[^\S\n]*"
+        + r"(?:(?:at" + _space + r"least|a" + _space + r"minimum" + _space + r"of|minimum(?:" + _space + r"of)?|min\.?|over|more" + _space + r"than)" + _space + r")?"
+        + _number + _years + _not_age,
+        re.IGNORECASE
+    ),
+]
+# a sentence about the company ("we have 25 years of experience", "our team brings 30 years of
+# experience"), unless it also states what is required of the candidate
+company_statement_pattern = re.compile(r"\b(?:we|our|we['’]ve|we['’]re)\b", re.IGNORECASE)
+requirement_cue_pattern = re.compile(
+    r"\b(?:you|your|candidates?|applicants?|looking|seeking|requires?|required|need|needs|must|should|minimum|at least)\b",
+    re.IGNORECASE
+)
+sentence_boundary_pattern = re.compile(r"[.;!?\n]")
+max_experience_years = 40
+
+# ordered from the highest level down, the first match wins
+education_patterns = [
+    ("PhD", re.compile(r"\b(?:ph\.?\s?d\b|doctorate|doctoral degree)", re.IGNORECASE)),
+    ("Master's", re.compile(r"\b(?:master(?:'s|’s|s)?\s+(?:degree|of|in)\b|mba\b|m\.s\.|msc\b|ms degree\b)", re.IGNORECASE)),
+    ("Bachelor's", re.compile(r"\b(?:bachelor(?:'s|’s|s)?\b|b\.s\.|b\.a\.|bsc\b|bs degree\b|ba degree\b|undergraduate degree\b|4-year degree\b|four-year degree\b)", re.IGNORECASE)),
+    ("Associate's", re.compile(r"\bassociate(?:'s|’s|s)?\s+degree\b", re.IGNORECASE)),
+    ("High School", re.compile(r"\b(?:high school|ged)\b", re.IGNORECASE)),
+]
+high_school_requirement_pattern = re.compile(r"\b(?:diploma|ged)\b", re.IGNORECASE)
+
+
+def _parse_number(value: str) -> int:
+    return int(value) if value.isdigit() else number_words[value.lower()]
+
+
+def _is_company_statement(description: str, position: int) -> bool:
+    """Whether the sentence up to `position` speaks about the company rather than the candidate."""
+    boundaries = list(sentence_boundary_pattern.finditer(description, 0, position))
+    sentence = description[boundaries[-1].end() if boundaries else 0:position]
+    return bool(company_statement_pattern.search(sentence)) and not requirement_cue_pattern.search(sentence)
+
+
+def find_experience_years(description: str) -> List[int]:
+    """Lower bounds of every required years of experience stated in the description."""
+    if not isinstance(description, str):
+        return []
+
+    years = [
+        _parse_number(match.group(1))
+        for pattern in experience_patterns
+        for match in pattern.finditer(description)
+        if not _is_company_statement(description, match.start())
+    ]
+    return [value for value in years if value <= max_experience_years]
+
+
+def find_education_levels(description: str) -> List[str]:
+    """Education levels mentioned in the description, from the highest down."""
+    if not isinstance(description, str):
+        return []
+
+    return [level for level, pattern in education_patterns if pattern.search(description)]
+
+
+def extract_experience_years(description: str) -> int:
+    """
+    Required years of experience stated in the description, following the LLM
+    conventions: lower bound of a range, and -1 when nothing is mentioned.
+    With several mentions the largest requirement is kept.
+    """
+    years = find_experience_years(description)
+    return max(years) if years else -1
+
+
+def extract_education_level(description: str) -> str:
+    """Highest education level mentioned, with the labels the LLM is asked to use."""
+    levels = find_education_levels(description)
+    return levels[0] if levels else "Unspecified"
+
+
+def extract_confident_job_details(description: str) -> Dict:
+    """
+    The experience and education fields that the rules parse unambiguously:
+    every experience mention states the same number of years, and a single
+    education level is mentioned ('high school' only when it comes with a
+    diploma or GED, as it also appears in other contexts). Fields that are
+    missing or ambiguous are left out, to be extracted by the LLM.
+    """
+    confident_details = {}
+
+    years = set(find_experience_years(description))
+    if len(years) == 1:
+        confident_details['experience_years_required'] = years.pop()
+
+    levels = find_education_levels(description)
+    if len(levels) == 1 and (levels[0] != "High School" or high_school_requirement_pattern.search(description)):
+        confident_details['education_level'] = levels[0]
+
+    return confident_details
+
+
+def extract_job_details_with_rules(description: str, skill_matcher: SkillVocabularyMatcher) -> Dict:
+    """
+    Deterministic counterpart of the LLM extraction, used when the LLM is
+    unavailable or too slow. Skills are the known skills found in the text,
+    so they are not split into technical, soft and domain skills.
+    """
+    skills = skill_matcher.match(description)
+    return {
+        'technical_skills': skills,
+        'soft_skills': [],
+        'domain_skills': [],
+        'skills': list(skills),
+        'experience_years_required': extract_experience_years(description),
+        'education_level': extract_education_level(description)
+    }
+
+
+def merge_known_skills(job_details: Dict, known_skills: List[str]) -> Dict:
+    """
+    Adds the known skills found in the description by the dictionary pre-pass
+    to LLM-extracted details. They are appended to the technical skills, as the
+    dictionary pass does not classify them.
+    """
+    extracted_skills = {str(skill).strip().lower() for skill in job_details['technical_skills'] + job_details['soft_skills'] + job_details['domain_skills']}
+    new_skills = [skill for skill in known_skills if skill not in extracted_skills]
+    if not new_skills:
+        return job_details
+
+    return job_details | {
+        'technical_skills': job_details['technical_skills'] + new_skills,
+        'skills': list(set(job_details['skills'] + new_skills)),
+    }
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Tuple
+
+# Interaction features, as (feature name, columns whose values are joined with '_').
+# Both the training and the serving implementations below are driven by this
+# spec, so the features a model is trained on and served with cannot drift.
+interaction_features: List[Tuple[str, Tuple[str, ...]]] = [
+    ('seniority_job_function', ('seniority', 'job_function')),
+    ('location_job_function', ('cleaned_location', 'job_function')),
+    ('seniority_function_location', ('seniority', 'job_function', 'cleaned_location')),
+    ('company_experience', ('company_name', 'experience_years_required')),
+    ('job_function_experience', ('job_function', 'experience_years_required')),
+    ('seniority_function_experience', ('seniority', 'job_function', 'experience_years_required')),
+]
+
+interaction_source_columns = list(dict.fromkeys(column for _, columns in interaction_features for column in columns))
+
+missing_interaction_token = 'unknown'
+
+
+def interaction_token(value) -> str:
+    """
+    String of a value inside an interaction feature. Integral numbers are
+    written without decimals, so 5 and 5.0 (as read back from a CSV with
+    missing values) give the same category. Every missing value (None, NaN of
+    any float type, pd.NA, NaT) gives the missing token.
+    """
+    if pd.isna(value):
+        return missing_interaction_token
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def build_interaction_features(values: Dict) -> Dict[str, str]:
+    """Interaction features of a single posting, from its source column values. Used at serving time."""
+    tokens = {column: interaction_token(values[column]) for column in interaction_source_columns}
+    return {name: '_'.join(tokens[column] for column in columns) for name, columns in interaction_features}
+
+
+def build_interaction_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Interaction features of every row of `df`. Used to build the training set.
+
+    Each source column is factorized once, and each interaction is built from
+    the distinct combinations of codes of its columns: strings are formatted
+    with `interaction_token` per distinct combination and gathered back by
+    index, with no Python loop over the rows.
+    """
+    if df.empty:
+        return pd.DataFrame({name: pd.Series(dtype=object) for name, _ in interaction_features}, index=df.index)
+
+    codes, tokens = {}, {}
+    for column in interaction_source_columns:
+        column_codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        codes[column] = column_codes
+        tokens[column] = [interaction_token(value) for value in uniques]
+
+    interactions = {}
+    for name, columns in interaction_features:
+        # the codes of the columns are packed into a single key per row
+        shape = tuple(len(tokens[column]) for column in columns)
+        keys = np.ravel_multi_index([codes[column] for column in columns], shape)
+        inverse, combinations = pd.factorize(keys)
+        combination_codes = np.unravel_index(combinations, shape)
+        combination_values = np.array(
+            ['_'.join(tokens[column][code] for column, code in zip(columns, combination)) for combination in zip(*combination_codes)],
+            dtype=object
+        )
+        interactions[name] = combination_values[inverse]
+
+    return pd.DataFrame(interactions, index=df.index)
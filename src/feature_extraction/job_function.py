@@ -1,355 +1,223 @@
-def extract_job_function_from_title(title: str) -> str:
-    """
-    Extracts the professional function from a job title by checking for
-    specific terms first and falling back to shorter, more ambiguous terms last.
-    """
-    if not isinstance(title, str):
-        return "unknown"
+import pandas as pd
 
-    title_lower = title.lower()
+from typing import List, Tuple
 
+from feature_extraction.keyword_matcher import KeywordRuleMatcher
+
+
+# Ordered (job_function, keywords) rules: the first rule with a keyword
+# contained in the lower-cased title wins. Specific terms come first and
+# shorter, more ambiguous terms last.
+job_function_rules: List[Tuple[str, List[str]]] = [
     # --- 1. Check for specific C-suite and executive titles first ---
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief compliance officer",
-            "chief legal officer",
-            "chief privacy officer",
-            "chief risk officer",
-            "chief sustainability officer",
-        ]
-    ):
-        return "legal_risk_compliance"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief brand officer",
-            "chief communications officer",
-            "chief content officer",
-            "chief creative officer",
-            "chief design officer",
-            "chief marketing officer",
-            "chief reputation officer",
-        ]
-    ):
-        return "marketing_creative"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief administrative officer",
-            "chief operating officer",
-            "chief process officer",
-            "chief restructuring officer",
-            "chief services officer",
-            "chief visibility officer",
-        ]
-    ):
-        return "operations"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief customer officer",
-            "chief experience officer",
-            "chief innovation officer",
-            "chief product officer",
-        ]
-    ):
-        return "product_experience"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief business development officer",
-            "chief commercial officer",
-            "chief growth officer",
-            "chief revenue officer",
-        ]
-    ):
-        return "sales_business_development"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief analytics officer",
-            "chief data officer",
-            "chief genealogical officer",
-            "chief research officer",
-            "chief scientific officer",
-        ]
-    ):
-        return "science_data"
-    if any(keyword in title_lower for keyword in ["chief security officer"]):
-        return "security"
-    if any(keyword in title_lower for keyword in ["chief supply chain officer"]):
-        return "supply_chain"
-    if any(keyword in title_lower for keyword in ["chief quality officer"]):
-        return "quality_assurance"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief confluence officer",
-            "chief digital officer",
-            "chief information officer",
-            "chief information security officer",
-            "chief solutions officer",
-            "chief technical officer",
-            "chief technology officer",
-            "chief technology security officer",
-            "chief web officer",
-        ]
-    ):
-        return "engineering"
-    if any(
-        keyword in title_lower
-        for keyword in ["chief financial officer", "chief investment officer"]
-    ):
-        return "finance_accounting"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "executive",
-            "partner",
-            "principal",
-            "chief business officer",
-            "chief executive officer",
-            "chief strategy officer",
-            "chief visionary officer",
-            "chief innovation officer",
-            "chief product officer",
-        ]
-    ):
-        return "general_management"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "chief diversity officer",
-            "chief human resources officer",
-            "chief learning officer",
-            "chief people officer",
-        ]
-    ):
-        return "human_resources_hr"
+    ("legal_risk_compliance", [
+        "chief compliance officer", "chief legal officer", "chief privacy officer", "chief risk officer",
+        "chief sustainability officer",
+    ]),
+    ("marketing_creative", [
+        "chief brand officer", "chief communications officer", "chief content officer",
+        "chief creative officer", "chief design officer", "chief marketing officer",
+        "chief reputation officer",
+    ]),
+    ("operations", [
+        "chief administrative officer", "chief operating officer", "chief process officer",
+        "chief restructuring officer", "chief services officer", "chief visibility officer",
+    ]),
+    ("product_experience", [
+        "chief customer officer", "chief experience officer", "chief innovation officer",
+        "chief product officer",
+    ]),
+    ("sales_business_development", [
+        "chief business development officer", "chief commercial officer", "chief growth officer",
+        "chief revenue officer",
+    ]),
+    ("science_data", [
+        "chief analytics officer", "chief data officer", "chief genealogical officer",
+        "chief research officer", "chief scientific officer",
+    ]),
+    ("security", ["chief security officer"]),
+    ("supply_chain", ["chief supply chain officer"]),
+    ("quality_assurance", ["chief quality officer"]),
+    ("engineering", [
+        "chief confluence officer", "chief digital officer", "chief information officer",
+        "chief information security officer", "chief solutions officer", "chief technical officer",
+        "chief technology officer", "chief technology security officer", "chief web officer",
+    ]),
+    ("finance_accounting", ["chief financial officer", "chief investment officer"]),
+    ("general_management", [
+        "executive", "partner", "principal", "chief business officer", "chief executive officer",
+        "chief strategy officer", "chief visionary officer", "chief innovation officer",
+        "chief product officer",
+    ]),
+    ("human_resources_hr", [
+        "chief diversity officer", "chief human resources officer", "chief learning officer",
+        "chief people officer",
+    ]),
 
     # --- 2. Fallback to general, more specific keywords ---
-    if any(keyword in title_lower for keyword in ["data scientist", "data science", "predictive modeler"]):
-        return "data_scientist"
+    ("data_scientist", ["data scientist", "data science", "predictive modeler"]),
 
     # Check for higher-prestige legal roles first
-    if any(keyword in title_lower for keyword in ['attorney', 'lawyer', 'counsel', 'litigation', 'negotiator']):
-        return "legal_attorney_counsel"
-    # Fallback to legal support and general legal terms
-    if any(keyword in title_lower for keyword in ['legal', 'paralegal', 'reviewer', 'court reporter']):
-        return "legal_support"
+    ("legal_attorney_counsel", ["attorney", "lawyer", "counsel", "litigation", "negotiator"]),
 
-    if any(
-        keyword in title_lower
-        for keyword in ["scientist", "research", "chemist", "biologist", "ecologist", "geophysicist", "mathematician", "lab", "laboratory", "math", "fish"]
-    ):
-        return "science_research"
-    if any(
-        keyword in title_lower
-        for keyword in ["quality assurance", "quality control", "tester", "auditor"]
-    ):
-        return "quality_assurance"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "administrator", "architect", "code", "coding", "cyber security", "data modeler",
-            "developer", "engineer", "information technology", "programmer", "scrum master",
-            "sdet", "sre", "webmaster", "wordpress", "hadoop", "jira", "netbackup", "sap",
-            "sharepoint", "ucce", "workday", "data validator", "frontend", "front end", "database", "nuclear"
-        ]
-    ):
-        return "engineering_it"
+    # Fallback to legal support and general legal terms
+    ("legal_support", ["legal", "paralegal", "reviewer", "court reporter"]),
+    ("science_research", [
+        "scientist", "research", "chemist", "biologist", "ecologist", "geophysicist", "mathematician",
+        "lab", "laboratory", "math", "fish",
+    ]),
+    ("quality_assurance", ["quality assurance", "quality control", "tester", "auditor"]),
+    ("engineering_it", [
+        "administrator", "architect", "code", "coding", "cyber security", "data modeler", "developer",
+        "engineer", "information technology", "programmer", "scrum master", "sdet", "sre", "webmaster",
+        "wordpress", "hadoop", "jira", "netbackup", "sap", "sharepoint", "ucce", "workday",
+        "data validator", "frontend", "front end", "database", "nuclear",
+    ]),
 
     # --- New & Expanded Healthcare Sections ---
-    if any(keyword in title_lower for keyword in ['surgeon', 'cardiologist', 'dermatologist', 'neurologist', 'oncology', 'radiologist', 'anesthesiologist', 'pathologist', 'medical director', 'ob/gyn', 'obgyn', 'surgery', 'pediatric', 'cardiovascular', 'neuroscience', 'neurosurgery', 'endoscopy', 'endodontist', 'radiology', 'vascular', 'urology', 'physiatrist']):
-        return "healthcare_specialist_physician"
-    if any(keyword in title_lower for keyword in ['physician', 'doctor', 'veterinarian', 'psychiatrist', 'dentist', 'orthodontist', 'resident']):
-        return "healthcare_general_physician"
-    if any(keyword in title_lower for keyword in ['pharmacist', 'optometrist', 'psychologist', 'therapist', 'dietitian', 'chiropractor', 'clinician', 'nurse practitioner', 'physician assistant', 'audiologist', 'pathologist', 'psychometrician', 'therapy', 'wellness', 'audiology']):
-        return "healthcare_advanced_practice"
-    if any(keyword in title_lower for keyword in ['nurse', 'nursing', 'technologist', 'sonographer', 'paramedic', 'emt', 'technician', 'dental hygienist', 'hygienist', 'radiologic', 'surgical tech', 'nutritionist', 'echocardiographer', 'mammography', 'polysomnographer', 'palliative']):
-        return "healthcare_nursing_allied"
-    if any(keyword in title_lower for keyword in ['phlebotomist', 'caregiver', 'nanny', 'provider', 'aide', 'medical assistant', 'patient care', 'home health', 'personal care', 'phlebotomy', 'care']):
-        return "healthcare_support"
-    if any(keyword in title_lower for keyword in ['healthcare', 'medical', 'clinical', 'patient', 'pharmacy', 'surgical', 'dental', 'ambulatory', 'telemedicine', 'clinic']):
-        return "healthcare_other"
-
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "finance", "financial", "investment", "accounting", "accountant", "investor", "tax",
-            "auditor", "banker", "teller", "reinsurance", "controller", "payroll", "bookkeeper",
-            "billing", "adjuster", "appraiser", "actuary", "advisor", "loan", "mortgage", "collections",
-            "trader", "derivatives", "fixed income", "treasury", "actuarial", "valuations", "chargeback",
-            "broker", "economist"
-        ]
-    ):
-        return "finance_accounting"
-    if any(keyword in title_lower for keyword in ["insurance", "claims"]):
-        return "insurance"
-    if any(
-        keyword in title_lower
-        for keyword in ["compliance", "regulatory", "credentialing", "kyc"]
-    ):
-        return "compliance_regulatory"
-    if any(keyword in title_lower for keyword in ["environmental health", "safety", "hazardous materials"]):
-        return "safety_environmental"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "human resources", "talent", "recruiter", "employee", "people operations",
-            "onboarding", "training", "benefits", "generalist"
-        ]
-    ):
-        return "hr"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "marketing", "creative", "content", "writer", "designer", "communications", "social media",
-            "editor", "producer", "art director", "brand ambassador", "stylist", "strategist", "seo",
-            "paid search", "proofreader", "news", "reporter"
-        ]
-    ):
-        return "marketing_creative"
-    if any(
-        keyword in title_lower
-        for keyword in ["sales", "account", "business development", "setter", "acct. exec", "agent", "business"]
-    ):
-        return "sales"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "supply chain", "logistics", "warehouse", "sourcing", "shipper", "receiving",
-            "buyer", "procurement", "inventory", "dispatcher", "selector", "filler", "purchasing",
-            "merchandiser", "delivery", "planner", "forwarder", "freight", "vendor", "shipping"
-        ]
-    ):
-        return "supply_chain"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "technician", "estimator", "welder", "driver", "handler", "maintenance", "mechanic",
-            "inspector", "assembler", "electrician", "operator", "coiling", "custodian",
-            "janitor", "machinist", "laborer", "plumber", "carpenter", "installer", "locksmith",
-            "painter", "fabricator", "detailer", "cleaner", "splicer", "groundskeeper", "caretaker",
-            "landscaper", "manufacturing", "millwright", "worker", "toolmaker", "tool & die", "hvac",
-            "rigger", "roofer", "jeweler", "truck", "meat", "forklift", "gardener"
-        ]
-    ):
-        return "skilled_trades"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "housekeeper", "attendant", "hospitality", "busser", "server", "house person", "aide",
-            "cook", "chef", "dishwasher", "barista", "bartender", "host", "valet", "groomer",
-            "trainer", "food service", "crewmember", "lifeguard", "baker", "esthetician", "fryer",
-            "bakery", "deli", "beauty", "concierge", "culinary", "housekeeping", "waxing"
-        ]
-    ):
-        return "service_hospitality"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "administrative", "assistant", "customer service", "support", "representative",
-            "coordinator", "clerk", "examiner", "office manager", "receptionist", "data entry",
-            "front desk", "scheduler", "clerical", "client service", "customer success",
-            "help desk", "contact center", "documentation", "records", "advocate", "liaison",
-            "secretary", "mail", "mailroom", "desk"
-        ]
-    ):
-        return "admin_support"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "security", "protection", "investigator", "police", "correctional",
-            "officer", "assessor", "fedramp"
-        ]
-    ):
-        return "security"
-    if any(keyword in title_lower for keyword in ["real estate", "leasing", "property"]):
-        return "real_estate"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "store", "retail", "merchant", "cashier", "team member", "stock",
-            "keyholder", "checker"
-        ]
-    ):
-        return "retail"
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "faculty", "instructor", "teacher", "proctor", "educator", "tutor",
-            "coach", "dean", "paraprofessional", "mentor"
-        ]
-    ):
-        return "education"
-    if any(
-        keyword in title_lower
-        for keyword in ["social work", "case manager", "counselor", "behavior", "youth", "chaplain"]
-    ):
-        return "social_services"
+    ("healthcare_specialist_physician", [
+        "surgeon", "cardiologist", "dermatologist", "neurologist", "oncology", "radiologist",
+        "anesthesiologist", "pathologist", "medical director", "ob/gyn", "obgyn", "surgery", "pediatric",
+        "cardiovascular", "neuroscience", "neurosurgery", "endoscopy", "endodontist", "radiology",
+        "vascular", "urology", "physiatrist",
+    ]),
+    ("healthcare_general_physician", [
+        "physician", "doctor", "veterinarian", "psychiatrist", "dentist", "orthodontist", "resident",
+    ]),
+    ("healthcare_advanced_practice", [
+        "pharmacist", "optometrist", "psychologist", "therapist", "dietitian", "chiropractor", "clinician",
+        "nurse practitioner", "physician assistant", "audiologist", "pathologist", "psychometrician",
+        "therapy", "wellness", "audiology",
+    ]),
+    ("healthcare_nursing_allied", [
+        "nurse", "nursing", "technologist", "sonographer", "paramedic", "emt", "technician",
+        "dental hygienist", "hygienist", "radiologic", "surgical tech", "nutritionist", "echocardiographer",
+        "mammography", "polysomnographer", "palliative",
+    ]),
+    ("healthcare_support", [
+        "phlebotomist", "caregiver", "nanny", "provider", "aide", "medical assistant", "patient care",
+        "home health", "personal care", "phlebotomy", "care",
+    ]),
+    ("healthcare_other", [
+        "healthcare", "medical", "clinical", "patient", "pharmacy", "surgical", "dental", "ambulatory",
+        "telemedicine", "clinic",
+    ]),
+    ("finance_accounting", [
+        "finance", "financial", "investment", "accounting", "accountant", "investor", "tax", "auditor",
+        "banker", "teller", "reinsurance", "controller", "payroll", "bookkeeper", "billing", "adjuster",
+        "appraiser", "actuary", "advisor", "loan", "mortgage", "collections", "trader", "derivatives",
+        "fixed income", "treasury", "actuarial", "valuations", "chargeback", "broker", "economist",
+    ]),
+    ("insurance", ["insurance", "claims"]),
+    ("compliance_regulatory", ["compliance", "regulatory", "credentialing", "kyc"]),
+    ("safety_environmental", ["environmental health", "safety", "hazardous materials"]),
+    ("hr", [
+        "human resources", "talent", "recruiter", "employee", "people operations", "onboarding", "training",
+        "benefits", "generalist",
+    ]),
+    ("marketing_creative", [
+        "marketing", "creative", "content", "writer", "designer", "communications", "social media",
+        "editor", "producer", "art director", "brand ambassador", "stylist", "strategist", "seo",
+        "paid search", "proofreader", "news", "reporter",
+    ]),
+    ("sales", ["sales", "account", "business development", "setter", "acct. exec", "agent", "business"]),
+    ("supply_chain", [
+        "supply chain", "logistics", "warehouse", "sourcing", "shipper", "receiving", "buyer",
+        "procurement", "inventory", "dispatcher", "selector", "filler", "purchasing", "merchandiser",
+        "delivery", "planner", "forwarder", "freight", "vendor", "shipping",
+    ]),
+    ("skilled_trades", [
+        "technician", "estimator", "welder", "driver", "handler", "maintenance", "mechanic", "inspector",
+        "assembler", "electrician", "operator", "coiling", "custodian", "janitor", "machinist", "laborer",
+        "plumber", "carpenter", "installer", "locksmith", "painter", "fabricator", "detailer", "cleaner",
+        "splicer", "groundskeeper", "caretaker", "landscaper", "manufacturing", "millwright", "worker",
+        "toolmaker", "tool & die", "hvac", "rigger", "roofer", "jeweler", "truck", "meat", "forklift",
+        "gardener",
+    ]),
+    ("service_hospitality", [
+        "housekeeper", "attendant", "hospitality", "busser", "server", "house person", "aide", "cook",
+        "chef", "dishwasher", "barista", "bartender", "host", "valet", "groomer", "trainer", "food service",
+        "crewmember", "lifeguard", "baker", "esthetician", "fryer", "bakery", "deli", "beauty", "concierge",
+        "culinary", "housekeeping", "waxing",
+    ]),
+    ("admin_support", [
+        "administrative", "assistant", "customer service", "support", "representative", "coordinator",
+        "clerk", "examiner", "office manager", "receptionist", "data entry", "front desk", "scheduler",
+        "clerical", "client service", "customer success", "help desk", "contact center", "documentation",
+        "records", "advocate", "liaison", "secretary", "mail", "mailroom", "desk",
+    ]),
+    ("security", [
+        "security", "protection", "investigator", "police", "correctional", "officer", "assessor",
+        "fedramp",
+    ]),
+    ("real_estate", ["real estate", "leasing", "property"]),
+    ("retail", ["store", "retail", "merchant", "cashier", "team member", "stock", "keyholder", "checker"]),
+    ("education", [
+        "faculty", "instructor", "teacher", "proctor", "educator", "tutor", "coach", "dean",
+        "paraprofessional", "mentor",
+    ]),
+    ("social_services", ["social work", "case manager", "counselor", "behavior", "youth", "chaplain"]),
 
     # --- New Categories Based on Extracted Keywords ---
-    if any(keyword in title_lower for keyword in ['pilot', 'aviation', 'flight']):
-        return "aviation"
-    if any(keyword in title_lower for keyword in ['linguist', 'translator', 'interpreter']):
-        return "linguistics_translation"
-    if any(keyword in title_lower for keyword in ['photographer', 'animator', 'artist', 'illustrator', 'retoucher']):
-        return "creative_arts"
-    if any(keyword in title_lower for keyword in ['curator', 'archivist', 'librarian']):
-        return "archive_curation"
-    if any(keyword in title_lower for keyword in ['surveyor', 'landman']):
-        return "surveying_land"
-
-    if any(
-        keyword in title_lower
-        for keyword in [
-            "manager", "management", "director", "supervisor", "lead", "vp",
-            "vice president", "executive", "chief", "superintendent", "foreman",
-            "head", "partner", "principal"
-        ]
-    ):
-        return "management_leadership"
+    ("aviation", ["pilot", "aviation", "flight"]),
+    ("linguistics_translation", ["linguist", "translator", "interpreter"]),
+    ("creative_arts", ["photographer", "animator", "artist", "illustrator", "retoucher"]),
+    ("archive_curation", ["curator", "archivist", "librarian"]),
+    ("surveying_land", ["surveyor", "landman"]),
+    ("management_leadership", [
+        "manager", "management", "director", "supervisor", "lead", "vp", "vice president", "executive",
+        "chief", "superintendent", "foreman", "head", "partner", "principal",
+    ]),
 
     # --- 3. Fallback for single, less specific keywords ---
-    if "analyst" in title_lower or "analytics" in title_lower:
-        return "analyst"
-    if "product" in title_lower:
-        return "product"
-    if "consultant" in title_lower:
-        return "consulting"
-    if "operations" in title_lower:
-        return "operations"
-    if "project" in title_lower:
-        return "project_management"
-    if "strategy" in title_lower:
-        return "strategy"
+    ("analyst", ["analyst", "analytics"]),
+    ("product", ["product"]),
+    ("consulting", ["consultant"]),
+    ("operations", ["operations"]),
+    ("project_management", ["project"]),
+    ("strategy", ["strategy"]),
 
     # --- 4. Final fallback for very short, ambiguous keywords ---
-    if any(keyword in title_lower for keyword in ["qa", "qc"]):
-        return "quality_assurance"
-    if any(keyword in title_lower for keyword in ["it", "dev", "dba", "gis", "cad"]):
-        return "engineering_it"
-    if "hr" in title_lower:
-        return "hr"
-    if "ds" in title_lower:
-        return "data_scientist"
-    if any(keyword in title_lower for keyword in ["rn", "lpn", "cna", "mri", "health", "pt", "ot", "lvn", "cma", "pta", "cota", "lmsw", "licsw", "lmft", "lmhc"]):
-        return "healthcare"
-    if any(keyword in title_lower for keyword in ["cfo", "cpa"]):
-        return "finance_accounting"
-    if "ehs" in title_lower:
-        return "safety_environmental"
-    if "bio" in title_lower:
-        return "biology"
-    if any(keyword in title_lower for keyword in ["ceo", "cso", "cvo", "cbo"]):
-        return "general_management"
+    ("quality_assurance", ["qa", "qc"]),
+    ("engineering_it", ["it", "dev", "dba", "gis", "cad"]),
+    ("hr", ["hr"]),
+    ("data_scientist", ["ds"]),
+    ("healthcare", [
+        "rn", "lpn", "cna", "mri", "health", "pt", "ot", "lvn", "cma", "pta", "cota", "lmsw", "licsw",
+        "lmft", "lmhc",
+    ]),
+    ("finance_accounting", ["cfo", "cpa"]),
+    ("safety_environmental", ["ehs"]),
+    ("biology", ["bio"]),
+    ("general_management", ["ceo", "cso", "cvo", "cbo"]),
+    ("specialist", ["specialist", "specialists"]),
+    ("associate", ["associate"]),
+]
+
 
-    if any(keyword in title_lower for keyword in ["specialist", "specialists"]):
-        return "specialist"
+job_function_matcher = KeywordRuleMatcher(job_function_rules)
 
-    if "associate" in title_lower:
-        return "associate"
 
-    return "other"
\ No newline at end of file
+def extract_job_function_from_title(title: str) -> str:
+    """
+    Extracts the professional function from a job title by checking for
+    specific terms first and falling back to shorter, more ambiguous terms last.
+    """
+    if not isinstance(title, str):
+        return "unknown"
+
+    rule_index = job_function_matcher.match(title.lower())
+    if rule_index == job_function_matcher.no_match:
+        return "other"
+
+    return job_function_matcher.labels[rule_index]
+
+
+def extract_job_functions(titles: pd.Series) -> pd.Series:
+    """
+    Vectorised `extract_job_function_from_title`: each distinct title is
+    matched once and the results are mapped back onto the series.
+    """
+    unique_titles = titles.dropna().unique()
+    job_functions = {title: extract_job_function_from_title(title) for title in unique_titles}
+    return titles.map(job_functions).fillna("unknown")
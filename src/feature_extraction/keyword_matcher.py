@@ -0,0 +1,59 @@
+from typing import Dict, List, Tuple
+
+
+class KeywordRuleMatcher:
+    """
+    Aho-Corasick automaton over the keywords of an ordered rule table.
+
+    Every state stores the best (lowest) rule index among the keywords ending
+    there, including those reached through failure links, and the transitions
+    are expanded into a full DFA. Matching a text is then a single pass over its
+    characters, and yields the same result as checking the rules in order.
+    """
+
+    def __init__(self, rules: List[Tuple[str, List[str]]]):
+        self.labels = [label for label, _ in rules]
+        no_match = len(rules)
+
+        goto: List[Dict[str, int]] = [{}]
+        best_rule: List[int] = [no_match]
+
+        for rule_index, (_, keywords) in enumerate(rules):
+            for keyword in keywords:
+                state = 0
+                for char in keyword:
+                    if char not in goto[state]:
+                        goto.append({})
+                        best_rule.append(no_match)
+                        goto[state][char] = len(goto) - 1
+                    state = goto[state][char]
+                best_rule[state] = min(best_rule[state], rule_index)
+
+        # breadth-first construction of failure links and DFA transitions
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            best_rule[state] = min(best_rule[state], best_rule[fail[state]])
+            transitions[state] = dict(transitions[fail[state]])
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0) if state else 0
+                transitions[state][char] = next_state
+                queue.append(next_state)
+
+        self.transitions = transitions
+        self.best_rule = best_rule
+        self.no_match = no_match
+
+    def match(self, text: str) -> int:
+        """Index of the first rule matching the text, or len(rules) when none does."""
+        transitions, best_rule = self.transitions, self.best_rule
+        best = self.no_match
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if best_rule[state] < best:
+                best = best_rule[state]
+                if best == 0:
+                    break
+        return best
@@ -0,0 +1,154 @@
+import re
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from embeddings.store import EmbeddingStore
+
+skill_token_pattern = re.compile(r"[a-z0-9+#]+(?:[./&-][a-z0-9+#]+)*")
+
+# Alternative spellings mapped to the skill they stand for. An alias is only
+# used when its target is in the vocabulary and the alias itself is not.
+skill_aliases: Dict[str, str] = {
+    'amazon web services': 'aws',
+    'google cloud platform': 'gcp',
+    'google cloud': 'gcp',
+    'microsoft azure': 'azure',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'k8s': 'kubernetes',
+    'postgres': 'postgresql',
+    'golang': 'go',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'nodejs': 'node.js',
+    'vuejs': 'vue.js',
+    'cpp': 'c++',
+    'c sharp': 'c#',
+    'sklearn': 'scikit-learn',
+    'ms excel': 'excel',
+    'microsoft excel': 'excel',
+    'powerbi': 'power bi',
+    'ml': 'machine learning',
+    'nlp': 'natural language processing',
+    'ci cd': 'ci/cd',
+}
+
+# Vocabulary entries that are common words in running text, never matched on their own
+ambiguous_skill_phrases = {
+    'a', 'an', 'and', 'as', 'at', 'be', 'by', 'for', 'go', 'in', 'is', 'it', 'of', 'on', 'or',
+    'the', 'to', 'we', 'will', 'with', 'you', 'your', 'our', 'work', 'team', 'skills',
+}
+
+
+def tokenize_skill_text(text: str) -> List[str]:
+    return skill_token_pattern.findall(text.lower())
+
+
+class SkillVocabularyMatcher:
+    """
+    Aho-Corasick automaton over the tokenized skills of a known vocabulary
+    (the skill embedding cache keys) and their aliases.
+
+    Skills and text are tokenized the same way, so matches always fall on
+    word boundaries, and a description is scanned in a single pass over its
+    tokens. Overlapping matches resolve to the leftmost, then longest skill,
+    and every match is returned as a key of the vocabulary, so it always hits
+    the embedding cache.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], aliases: Optional[Dict[str, str]] = None):
+        vocabulary = list(vocabulary)
+        aliases = skill_aliases if aliases is None else aliases
+
+        phrases: Dict[Tuple[str, ...], str] = {}
+        for skill in vocabulary:
+            tokens = tuple(tokenize_skill_text(skill))
+            if tokens and ' '.join(tokens) not in ambiguous_skill_phrases:
+                phrases.setdefault(tokens, skill)
+
+        known_skills = set(vocabulary)
+        for alias, skill in aliases.items():
+            tokens = tuple(tokenize_skill_text(alias))
+            if skill in known_skills and tokens:
+                phrases.setdefault(tokens, skill)
+
+        goto: List[Dict[str, int]] = [{}]
+        # (phrase length in tokens, skill) for the phrase ending at each state
+        output: List[Optional[Tuple[int, str]]] = [None]
+        for tokens, skill in phrases.items():
+            state = 0
+            for token in tokens:
+                if token not in goto[state]:
+                    goto.append({})
+                    output.append(None)
+                    goto[state][token] = len(goto) - 1
+                state = goto[state][token]
+            output[state] = (len(tokens), skill)
+
+        # breadth-first construction of failure links, and of output links to
+        # the nearest state on the failure chain that ends a phrase
+        fail = [0] * len(goto)
+        output_link = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for token, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and token not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(token, 0) if state else 0
+                output_link[next_state] = fail[next_state] if output[fail[next_state]] else output_link[fail[next_state]]
+                queue.append(next_state)
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+        self.output_link = output_link
+        self.vocabulary_size = len(phrases)
+
+    def match(self, text: str) -> List[str]:
+        """Known skills found in the text, in order of first appearance."""
+        if not isinstance(text, str):
+            return []
+
+        goto, fail, output, output_link = self.goto, self.fail, self.output, self.output_link
+        tokens = tokenize_skill_text(text)
+
+        # longest match starting at each token
+        longest: Dict[int, Tuple[int, str]] = {}
+        state = 0
+        for end, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+
+            match_state = state if output[state] else output_link[state]
+            while match_state:
+                length, skill = output[match_state]
+                start = end - length + 1
+                if start not in longest or longest[start][0] < length:
+                    longest[start] = (length, skill)
+                match_state = output_link[match_state]
+
+        matches = {}
+        next_free = 0
+        for start in sorted(longest):
+            if start >= next_free:
+                length, skill = longest[start]
+                matches.setdefault(skill, None)
+                next_free = start + length
+        return list(matches)
+
+
+def get_skill_matcher(skill_cache) -> SkillVocabularyMatcher:
+    """
+    Matcher over the keys of `skill_cache`. It is compiled once per embedding
+    store and kept on it, any other mapping gets a newly compiled matcher.
+    """
+    if not isinstance(skill_cache, EmbeddingStore):
+        return SkillVocabularyMatcher(skill_cache.keys())
+
+    matcher = skill_cache.derived.get('skill_matcher')
+    if matcher is None:
+        matcher = SkillVocabularyMatcher(skill_cache.keys())
+        skill_cache.derived['skill_matcher'] = matcher
+    return matcher
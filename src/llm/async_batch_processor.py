@@ -0,0 +1,203 @@
+import asyncio
+import time
+import pandas as pd
+
+from tqdm import tqdm
+from openai import AsyncOpenAI
+from typing import Dict, List, Optional
+
+from llm.checkpoint import ShardedCheckpoint
+from llm.extraction_cache import ExtractionCache
+from llm.job_details import ExtractionSettings, aget_job_details, empty_job_details, is_valid_description
+from llm.ollama_setup import is_async_ollama_server_running
+from llm.telemetry import extraction_telemetry
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Async semaphore whose limit follows an AIMD policy on observed latency.
+
+    The limit grows additively while the smoothed latency stays close to the
+    best smoothed latency seen so far, and is cut multiplicatively on errors or
+    when it exceeds `latency_tolerance` times that baseline, i.e. when the
+    server starts queueing. Cuts happen at most once per latency interval so a
+    burst of slow responses does not collapse the limit.
+    """
+
+    def __init__(
+            self,
+            min_concurrency: int = 2,
+            max_concurrency: int = 32,
+            initial_concurrency: Optional[int] = None,
+            latency_tolerance: float = 2.0,
+            decrease_factor: float = 0.7,
+            smoothing: float = 0.2
+            ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(initial_concurrency or min_concurrency)
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.smoothing = smoothing
+        self.smoothed_latency = None
+        self.baseline_latency = None
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self.last_decrease < (self.smoothed_latency or 0.0):
+            return
+        self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+        self.last_decrease = now
+
+    async def release(self, latency: float, error: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+
+            if error:
+                self._decrease()
+            else:
+                if self.smoothed_latency is None:
+                    self.smoothed_latency = latency
+                else:
+                    self.smoothed_latency += self.smoothing * (latency - self.smoothed_latency)
+
+                if self.baseline_latency is None or self.smoothed_latency < self.baseline_latency:
+                    self.baseline_latency = self.smoothed_latency
+
+                if self.smoothed_latency > self.baseline_latency * self.latency_tolerance:
+                    self._decrease()
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+            self._condition.notify_all()
+
+
+async def process_in_batches_async(
+    df: pd.DataFrame,
+    output_filepath: str,
+    client: AsyncOpenAI,
+    decoder_model_name: str,
+    min_concurrency: int = 2,
+    max_concurrency: int = 32,
+    checkpoint_every: int = 200,
+    cache: Optional[ExtractionCache] = None,
+    settings: Optional[ExtractionSettings] = None
+):
+    """
+    Extracts job details for every row with a continuously refilled work queue
+    instead of fixed batches, so a slow request never holds back the others.
+    Concurrency adapts to Ollama's latency and error rate, and results are
+    checkpointed every `checkpoint_every` completed rows.
+    """
+    if not await is_async_ollama_server_running(client):
+        return None
+
+    print(f"Starting job. Results will be saved to '{output_filepath}'.")
+    print(f"Total rows: {len(df)}, Concurrency: {min_concurrency}-{max_concurrency}")
+
+    checkpoint = ShardedCheckpoint(output_filepath)
+
+    # --- 1. RESUME LOGIC ---
+    processed_indices = checkpoint.processed_indices()
+    if processed_indices:
+        print(f"Checkpoint found at '{output_filepath}'. Found {len(processed_indices)} previously processed rows.")
+
+    df_to_process = df[~df.index.isin(processed_indices)]
+
+    if df_to_process.empty:
+        print("All rows have already been processed. Nothing to do.")
+        return df.join(checkpoint.load())
+
+    print(f"Starting processing for {len(df_to_process)} remaining rows...")
+
+    # --- 2. CONTINUOUS PROCESSING ---
+    queue: asyncio.Queue = asyncio.Queue()
+    locations = df_to_process['location'] if 'location' in df_to_process.columns else pd.Series(None, index=df_to_process.index)
+    # set for near-duplicate representatives, whose duplicates may need the location refined
+    refine_locations = df_to_process['refine_location'] if 'refine_location' in df_to_process.columns else pd.Series(None, index=df_to_process.index)
+    for index, description, location, refine_location in zip(df_to_process.index, df_to_process['description'], locations, refine_locations):
+        queue.put_nowait((index, description, location, refine_location))
+
+    limiter = AdaptiveConcurrencyLimiter(min_concurrency=min_concurrency, max_concurrency=max_concurrency)
+    pending_results: List[Dict] = []
+    stats = {'rows': 0, 'tokens': 0, 'tokens_saved': 0, 'errors': 0}
+    start_time = time.perf_counter()
+    progress = tqdm(total=len(df_to_process), desc="Overall Progress")
+
+    def save_checkpoint():
+        nonlocal pending_results
+        if not pending_results:
+            return
+        checkpoint.append(pd.DataFrame(pending_results).set_index('original_index'))
+        pending_results = []
+
+    async def worker():
+        while True:
+            try:
+                index, description, location, refine_location = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            if not is_valid_description(description):
+                # nothing to send, and not an LLM error the limiter should react to
+                result_data, tokens = empty_job_details(), 0
+            else:
+                await limiter.acquire()
+                call_start = time.perf_counter()
+                try:
+                    _, result_data, tokens = await aget_job_details(
+                        description, index, client, decoder_model_name, cache, location=location, raise_errors=True,
+                        settings=settings, refine_location=refine_location
+                    )
+                    await limiter.release(time.perf_counter() - call_start)
+                except Exception:
+                    await limiter.release(time.perf_counter() - call_start, error=True)
+                    result_data, tokens = empty_job_details(), 0
+                    stats['errors'] += 1
+
+            result_data['original_index'] = index
+            pending_results.append(result_data)
+            stats['rows'] += 1
+            stats['tokens'] += tokens
+            stats['tokens_saved'] += result_data.get('description_tokens_saved', 0)
+
+            elapsed = time.perf_counter() - start_time
+            progress.update(1)
+            progress.set_postfix({
+                'rows/s': f"{stats['rows'] / elapsed:.2f}",
+                'tokens/s': f"{stats['tokens'] / elapsed:.1f}",
+                'saved/row': f"{stats['tokens_saved'] / stats['rows']:.0f}",
+                'concurrency': limiter.concurrency,
+                'errors': stats['errors'],
+            })
+
+            # --- 3. SAVE CHECKPOINT ---
+            if len(pending_results) >= checkpoint_every:
+                save_checkpoint()
+
+    await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+    save_checkpoint()
+    progress.close()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Processing complete. {stats['rows']} rows in {elapsed:.1f}s "
+          f"({stats['rows'] / elapsed:.2f} rows/s, {stats['tokens'] / elapsed:.1f} tokens/s, {stats['errors']} errors).")
+    print(f"LLM telemetry: {extraction_telemetry.summary()}")
+    print(f"Description preprocessing saved {stats['tokens_saved']} prompt tokens "
+          f"({stats['tokens_saved'] / max(1, stats['rows']):.0f} per row).")
+
+    checkpoint.compact()
+    final_df = df.join(checkpoint.load())
+    return final_df
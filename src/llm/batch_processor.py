@@ -1,10 +1,13 @@
 import pandas as pd
-import os
 
 from tqdm import tqdm
 from openai import OpenAI
-from llm.job_details import get_job_details
+from typing import Optional
+from llm.checkpoint import ShardedCheckpoint
+from llm.extraction_cache import ExtractionCache
+from llm.job_details import ExtractionSettings, get_job_details
 from llm.ollama_setup import is_ollama_server_running
+from llm.telemetry import extraction_telemetry
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
@@ -14,7 +17,9 @@ def process_in_batches(
     client: OpenAI,
     decoder_model_name: str,
     batch_size: int = 200,
-    max_workers: int = 16
+    max_workers: int = 16,
+    cache: Optional[ExtractionCache] = None,
+    settings: Optional[ExtractionSettings] = None
 ):
     if not is_ollama_server_running(client):
         return None
@@ -22,24 +27,20 @@ def process_in_batches(
     print(f"Starting job. Results will be saved to '{output_filepath}'.")
     print(f"Total rows: {len(df)}, Batch size: {batch_size}")
 
-    processed_df = pd.DataFrame()
+    checkpoint = ShardedCheckpoint(output_filepath)
 
     # --- 1. RESUME LOGIC ---
-    if os.path.exists(output_filepath):
-        print(f"Checkpoint file found at '{output_filepath}'. Loading previous results.")
-        processed_df = pd.read_parquet(output_filepath)
-        # Get the indices of rows that are already processed
-        processed_indices = set(processed_df.index)
-        print(f"Found {len(processed_indices)} previously processed rows.")
-    else:
-        processed_indices = set()
+    # Get the indices of rows that are already processed, without loading their results
+    processed_indices = checkpoint.processed_indices()
+    if processed_indices:
+        print(f"Checkpoint found at '{output_filepath}'. Found {len(processed_indices)} previously processed rows.")
 
     # Filter the main DataFrame to get only the rows that need processing
     df_to_process = df[~df.index.isin(processed_indices)]
 
     if df_to_process.empty:
         print("All rows have already been processed. Nothing to do.")
-        return df.join(processed_df)
+        return df.join(checkpoint.load())
 
     print(f"Starting processing for {len(df_to_process)} remaining rows...")
 
@@ -51,7 +52,10 @@ def process_in_batches(
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit tasks with original index and description
             futures = [
-                executor.submit(get_job_details, row['description'], index, client, decoder_model_name)
+                executor.submit(
+                    get_job_details, row['description'], index, client, decoder_model_name, cache,
+                    location=row.get('location'), settings=settings, refine_location=row.get('refine_location')
+                )
                 for index, row in batch.iterrows()
             ]
 
@@ -65,11 +69,13 @@ def process_in_batches(
         batch_results_df = pd.DataFrame(batch_results)
         batch_results_df = batch_results_df.set_index('original_index')
 
-        processed_df = pd.concat([processed_df, batch_results_df])
-
-        processed_df.to_parquet(output_filepath)
+        checkpoint.append(batch_results_df)
 
     print("Processing complete.")
+    print(f"LLM telemetry: {extraction_telemetry.summary()}")
+    if cache is not None:
+        print(f"Extraction cache stats: {cache.stats()}")
 
-    final_df = df.join(processed_df)
+    checkpoint.compact()
+    final_df = df.join(checkpoint.load())
     return final_df
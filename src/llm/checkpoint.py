@@ -0,0 +1,94 @@
+import json
+import os
+import pandas as pd
+
+from typing import Dict, List, Set
+
+manifest_file_name = 'manifest.json'
+
+
+class ShardedCheckpoint:
+    """
+    Append-only checkpoint made of parquet part files plus a JSON manifest.
+
+    Every flush writes one new shard and atomically rewrites the small
+    manifest, so its cost only depends on the size of the flush and not on the
+    rows already processed. Resuming reads the index of each shard only, and
+    `compact` merges all shards into one once a run is complete.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, manifest_file_name)
+
+    @property
+    def shards(self) -> List[Dict]:
+        return self.manifest['shards']
+
+    @property
+    def num_rows(self) -> int:
+        return sum(shard['rows'] for shard in self.shards)
+
+    def _read_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {'version': 1, 'next_part': 0, 'shards': []}
+
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _shard_path(self, shard: Dict) -> str:
+        return os.path.join(self.directory, shard['file'])
+
+    def append(self, results_df: pd.DataFrame):
+        if results_df.empty:
+            return
+
+        file_name = f"part-{self.manifest['next_part']:05d}.parquet"
+        results_df.to_parquet(os.path.join(self.directory, file_name))
+
+        # the shard only becomes visible once the manifest references it
+        self.manifest['next_part'] += 1
+        self.manifest['shards'].append({'file': file_name, 'rows': len(results_df)})
+        self._write_manifest()
+
+    def processed_indices(self) -> Set:
+        processed_indices = set()
+        for shard in self.shards:
+            processed_indices.update(pd.read_parquet(self._shard_path(shard), columns=[]).index)
+        return processed_indices
+
+    def load(self) -> pd.DataFrame:
+        if not self.shards:
+            return pd.DataFrame()
+        return pd.concat([pd.read_parquet(self._shard_path(shard)) for shard in self.shards])
+
+    def compact(self):
+        """Merges all shards into a single part file."""
+        if len(self.shards) <= 1:
+            return
+
+        old_shards = list(self.shards)
+        merged_df = self.load()
+
+        file_name = f"part-{self.manifest['next_part']:05d}.parquet"
+        merged_df.to_parquet(os.path.join(self.directory, file_name))
+
+        self.manifest['next_part'] += 1
+        self.manifest['shards'] = [{'file': file_name, 'rows': len(merged_df)}]
+        self._write_manifest()
+
+        for shard in old_shards:
+            os.remove(self._shard_path(shard))
+
+        print(f"Compacted {len(old_shards)} checkpoint shards into '{file_name}'.")
@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import yaml
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dataset.storage import read_dataset
+
+# Rough size of a token for the decoder models we run through Ollama
+chars_per_token = 4
+
+line_break_tag_pattern = re.compile(r"<\s*(?:br|/p|/li|/div|/h\d|/tr|/ul|/ol)\s*/?\s*>", re.IGNORECASE)
+tag_pattern = re.compile(r"<[^>]+>")
+markdown_pattern = re.compile(r"\*\*|__|#{2,}|`{1,3}")
+space_pattern = re.compile(r"[ \t\r\f\v ​]+")
+sentence_split_pattern = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+fingerprint_pattern = re.compile(r"[^a-z]+")
+
+# Segments mentioning these are never dropped as boilerplate, and are kept
+# first when a description exceeds the token budget
+requirement_pattern = re.compile(
+    r"\b(?:require|qualif|experience|skill|degree|education|responsib|proficien|knowledge|years?\b|must\b)",
+    re.IGNORECASE
+)
+
+# Lines longer than this are split into sentences to find boilerplate inside them
+max_segment_chars = 300
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / chars_per_token)
+
+
+def strip_markup(text: str) -> str:
+    """Removes HTML tags, entities and markdown emphasis, and collapses whitespace, keeping line breaks."""
+    text = html.unescape(text)
+    text = line_break_tag_pattern.sub('\n', text)
+    text = tag_pattern.sub(' ', text)
+    text = markdown_pattern.sub('', text)
+    lines = (space_pattern.sub(' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def split_segments(text: str) -> List[List[str]]:
+    """Lines of a cleaned description, each as a list of segments (long lines are split into sentences)."""
+    return [
+        sentence_split_pattern.split(line) if len(line) > max_segment_chars else [line]
+        for line in text.split('\n')
+    ]
+
+
+def segment_fingerprint(segment: str) -> str:
+    """Hash of the letters of a segment, so case, digits and punctuation variations match."""
+    normalized = fingerprint_pattern.sub(' ', segment.lower()).strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def learn_boilerplate_segments(
+        descriptions: Iterable[str],
+        min_document_frequency: int = 20,
+        min_segment_chars: int = 60
+        ) -> List[str]:
+    """
+    Fingerprints of the segments (EEO statements, benefits, company blurbs...)
+    repeated across at least `min_document_frequency` postings. Short segments
+    are ignored so that frequent headers such as 'Requirements:' are kept, and
+    so are segments that look like requirements: the postings of a company
+    often share their qualifications block, which the LLM must still see.
+    """
+    document_frequency = Counter()
+    for description in descriptions:
+        if not isinstance(description, str):
+            continue
+        fingerprints = {
+            segment_fingerprint(segment)
+            for line in split_segments(strip_markup(description))
+            for segment in line
+            if len(segment) >= min_segment_chars and not requirement_pattern.search(segment)
+        }
+        document_frequency.update(fingerprints)
+
+    return sorted(fingerprint for fingerprint, count in document_frequency.items() if count >= min_document_frequency)
+
+
+def save_boilerplate_segments(fingerprints: List[str], path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(fingerprints, f)
+    print(f"{len(fingerprints)} boilerplate segments saved to '{path}'")
+
+
+def load_boilerplate_segments(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        print(f"No boilerplate segments found at '{path}', only markup will be stripped.")
+        return set()
+
+    with open(path, 'r') as f:
+        return set(json.load(f))
+
+
+class DescriptionPreprocessor:
+    """
+    Shrinks a description before it is sent to the LLM: strips markup and
+    whitespace, drops the boilerplate segments learned from the corpus and the
+    segments repeated within the description, and fits the rest into
+    `max_prompt_tokens`. When truncating, segments that look like requirements
+    are kept first and the original order is restored.
+    """
+
+    def __init__(self, boilerplate_fingerprints: Set[str], max_prompt_tokens: Optional[int] = None):
+        self.boilerplate_fingerprints = boilerplate_fingerprints
+        self.max_prompt_tokens = max_prompt_tokens
+
+    def _truncate(self, lines: List[List[str]]) -> List[List[str]]:
+        segments = [(i, j, segment) for i, line in enumerate(lines) for j, segment in enumerate(line)]
+        ranked = sorted(segments, key=lambda item: requirement_pattern.search(item[2]) is None)
+
+        kept = set()
+        budget = self.max_prompt_tokens
+        for i, j, segment in ranked:
+            tokens = estimate_tokens(segment) + 1
+            if tokens <= budget:
+                kept.add((i, j))
+                budget -= tokens
+            elif budget > 32 and requirement_pattern.search(segment):
+                # cut an oversized requirement segment at the last sentence or word that fits
+                cut = segment[:budget * chars_per_token]
+                end = max(cut.rfind('. '), cut.rfind(' '))
+                lines[i][j] = cut[:end + 1].strip() if end > 0 else cut
+                kept.add((i, j))
+                budget -= estimate_tokens(lines[i][j]) + 1
+
+        return [[segment for j, segment in enumerate(line) if (i, j) in kept] for i, line in enumerate(lines)]
+
+    def preprocess(self, description: str) -> Tuple[str, int]:
+        """Returns the preprocessed description and the number of tokens saved."""
+        if not isinstance(description, str):
+            return description, 0
+
+        # boilerplate and segments repeated within the description are dropped
+        seen = set()
+        lines = []
+        for line in split_segments(strip_markup(description)):
+            kept_segments = []
+            for segment in line:
+                fingerprint = segment_fingerprint(segment)
+                # requirements are kept even when a boilerplate file learned without that rule lists them
+                is_boilerplate = fingerprint in self.boilerplate_fingerprints and not requirement_pattern.search(segment)
+                if fingerprint not in seen and not is_boilerplate:
+                    seen.add(fingerprint)
+                    kept_segments.append(segment)
+            lines.append(kept_segments)
+
+        total_tokens = sum(estimate_tokens(segment) + 1 for line in lines for segment in line)
+        if self.max_prompt_tokens is not None and total_tokens > self.max_prompt_tokens:
+            lines = self._truncate(lines)
+
+        text = '\n'.join(' '.join(line) for line in lines if line)
+        return text, max(0, estimate_tokens(description) - estimate_tokens(text))
+
+
+def load_description_preprocessor(params: Dict) -> Optional[DescriptionPreprocessor]:
+    """
+    Builds the preprocessor from the `description_preprocessing` section of
+    params.yaml, or returns None when preprocessing is disabled.
+    """
+    preprocessing_params = params.get('description_preprocessing') or {}
+    if not preprocessing_params.get('enabled', False):
+        return None
+
+    return DescriptionPreprocessor(
+        load_boilerplate_segments(preprocessing_params['boilerplate_path']),
+        max_prompt_tokens=preprocessing_params.get('max_prompt_tokens')
+    )
+
+
+def preprocess_description(description: str, preprocessor: Optional[DescriptionPreprocessor] = None) -> Tuple[str, int]:
+    """Description to send to the LLM and the number of tokens saved, unchanged without a preprocessor."""
+    if preprocessor is None:
+        return description, 0
+    return preprocessor.preprocess(description)
+
+
+if __name__ == '__main__':
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser(description="Learn the boilerplate segments repeated across job descriptions.")
+    parser.add_argument('--input-path', type=str, default='data/datasets/postings_cleaned.parquet')
+    parser.add_argument('--output-path', type=str, required=True)
+    args = parser.parse_args()
+
+    preprocessing_params = params['description_preprocessing']
+    df = read_dataset(args.input_path, columns=['description'])
+
+    fingerprints = learn_boilerplate_segments(
+        df['description'],
+        min_document_frequency=preprocessing_params['min_document_frequency'],
+        min_segment_chars=preprocessing_params['min_segment_chars']
+    )
+    save_boilerplate_segments(fingerprints, args.output_path)
+
+    preprocessor = DescriptionPreprocessor(set(fingerprints), preprocessing_params['max_prompt_tokens'])
+    tokens_saved = [preprocessor.preprocess(description)[1] for description in df['description']]
+    original_tokens = sum(estimate_tokens(description) for description in df['description'] if isinstance(description, str))
+    print(f"Preprocessing saves {sum(tokens_saved) / max(1, len(tokens_saved)):.0f} tokens per posting on average "
+          f"({sum(tokens_saved) / max(1, original_tokens):.1%} of the descriptions).")
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Dict, Optional
+
+
+class ExtractionCache:
+    """
+    Persistent, content-addressed cache of LLM extraction results backed by SQLite.
+
+    Entries are keyed by a hash of the description, the decoder model name and
+    the schema version of the response model, so changing either invalidates
+    old results. The cache is bounded to `max_entries` and evicts the least
+    recently used rows, checked every `eviction_interval` inserts so the
+    table is not counted on each write: it may overshoot the bound by that
+    many entries per writer in between. Every thread gets its own connection and the database
+    runs in WAL mode, so it can be shared by worker threads and by several processes.
+    """
+
+    def __init__(self, path: str, max_entries: int = 500_000, timeout: float = 30.0, eviction_interval: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.eviction_interval = max(1, eviction_interval)
+        self.hits = 0
+        self.misses = 0
+        self.inserts_since_eviction = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_access ON extractions (last_access)")
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def make_key(description: str, decoder_model_name: str, schema_version: str) -> str:
+        payload = '\x1f'.join([schema_version, decoder_model_name, description])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if row is None:
+            return None
+
+        try:
+            connection.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+        except sqlite3.OperationalError:
+            # recency is best effort, a locked database must not fail the lookup
+            pass
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO extractions (key, value, last_access) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time())
+        )
+        connection.commit()
+
+        with self._stats_lock:
+            self.inserts_since_eviction += 1
+            evict = self.inserts_since_eviction >= self.eviction_interval
+            if evict:
+                self.inserts_since_eviction = 0
+        if evict:
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        count = connection.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+
+        connection.execute(
+            "DELETE FROM extractions WHERE key IN (SELECT key FROM extractions ORDER BY last_access ASC LIMIT ?)",
+            (overflow,)
+        )
+        connection.commit()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'entries': len(self),
+        }
+
+
+def load_extraction_cache(params: Dict) -> Optional[ExtractionCache]:
+    """
+    Builds the extraction cache from the `llm_cache` section of params.yaml,
+    or returns None when caching is disabled.
+    """
+    cache_params = params.get('llm_cache') or {}
+    if not cache_params.get('enabled', False):
+        return None
+
+    return ExtractionCache(
+        cache_params['path'],
+        max_entries=cache_params['max_entries'],
+        eviction_interval=cache_params.get('eviction_interval', 1000)
+    )
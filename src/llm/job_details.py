@@ -1,12 +1,31 @@
-from openai import OpenAI
-from pydantic import BaseModel, Field
-from typing import List, Tuple, Dict
-import instructor
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel, Field, ValidationError, create_model
+from functools import lru_cache
+from tenacity import AsyncRetrying, Retrying, stop_after_attempt
+from instructor.retry import InstructorRetryException
+from typing import FrozenSet, List, Tuple, Type, Dict, Optional
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
 
-class JobDetails(BaseModel):
+from feature_cleaning.location import clean_and_standardize_location, inconclusive_locations
+from feature_extraction.description_rules import extract_confident_job_details, merge_known_skills
+from llm.description_preprocessing import DescriptionPreprocessor, load_description_preprocessor, preprocess_description
+from llm.extraction_cache import ExtractionCache
+from llm.location_refining import JobLocation, format_refined_location
+from llm.ollama_setup import get_instructor_client
+from llm.telemetry import extraction_telemetry
+
+# 'format' passes the response schema to Ollama's grammar-constrained output,
+# 'instructor' parses free JSON with instructor and re-asks on validation errors
+structured_output_modes = ['format', 'instructor']
+
+class JobSkills(BaseModel):
     """
-    A Pydantic model to hold the structured details extracted from a job description.
-    The overall instruction for the LLM is to act as an HR analyst and fill these fields.
+    The skills extracted from a job description. Used on its own as the
+    response model when the other details were already parsed by rules.
     """
     technical_skills: List[str] = Field(
         ...,
@@ -37,6 +56,12 @@ class JobDetails(BaseModel):
         """
     )
 
+
+class JobDetails(JobSkills):
+    """
+    A Pydantic model to hold the structured details extracted from a job description.
+    The overall instruction for the LLM is to act as an HR analyst and fill these fields.
+    """
     experience_years_required: int = Field(
         ...,
         description="""
@@ -61,49 +86,434 @@ class JobDetails(BaseModel):
     )
 
 
-def get_job_details(description: str, index: int, client: OpenAI, decoder_model_name: str) -> Tuple[int, Dict]:
-    if not isinstance(description, str) or len(description.strip()) < 20:
-        print(f"Invalid description.")
-        return index, {
-            'technical_skills': [],
-            'soft_skills': [],
-            'domain_skills': [],
-            'skills': [],
-            'experience_years_required': None,
-            'education_level': None
+@lru_cache(maxsize=None)
+def get_response_model(pre_extracted_fields: FrozenSet[str] = frozenset(), include_location: bool = False) -> Type[BaseModel]:
+    """
+    JobDetails without the fields already extracted by rules, so the LLM only
+    generates the remaining ones. The skills are always left to the LLM.
+    With `include_location`, the city and state of JobLocation are requested
+    as well, so refining a location does not take a separate LLM call.
+    """
+    if not pre_extracted_fields and not include_location:
+        return JobDetails
+
+    remaining_fields = {
+        name: (field.annotation, field)
+        for name, field in JobDetails.model_fields.items()
+        if name not in JobSkills.model_fields and name not in pre_extracted_fields
+    }
+    if include_location:
+        remaining_fields.update({name: (field.annotation, field) for name, field in JobLocation.model_fields.items()})
+
+    if not remaining_fields:
+        return JobSkills
+    return create_model('PartialJobDetails', __base__=JobSkills, __doc__=JobDetails.__doc__, **remaining_fields)
+
+
+def needs_location_refinement(location: Optional[str]) -> bool:
+    """
+    Whether the rule-based location is inconclusive, so the LLM should also
+    extract it. A missing location is inconclusive too.
+    """
+    return clean_and_standardize_location(location) in inconclusive_locations
+
+
+@lru_cache(maxsize=None)
+def job_details_schema_version(response_model: Type[BaseModel] = JobDetails) -> str:
+    """
+    Short hash of the response model JSON schema, used to invalidate cached
+    extractions whenever the fields or their instructions change.
+    """
+    schema = json.dumps(response_model.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode('utf-8')).hexdigest()[:16]
+
+
+def empty_job_details() -> Dict:
+    return {
+        'technical_skills': [],
+        'soft_skills': [],
+        'domain_skills': [],
+        'skills': [],
+        'experience_years_required': None,
+        'education_level': None
+    }
+
+
+class ExtractionSettings:
+    """
+    How the job details are requested from the LLM, as configured in
+    params.yaml. Built by the callers from their loaded params with
+    `load_extraction_settings`, the way the extraction cache is, so the
+    behaviour does not depend on the working directory of the process.
+    """
+
+    def __init__(
+            self,
+            preprocessor: Optional[DescriptionPreprocessor] = None,
+            structured_output: str = 'instructor',
+            max_attempts: int = 3
+            ):
+        if structured_output not in structured_output_modes:
+            raise ValueError(f"Unknown structured output mode '{structured_output}', expected one of {structured_output_modes}.")
+        self.preprocessor = preprocessor
+        self.structured_output = structured_output
+        self.max_attempts = max_attempts
+
+
+default_extraction_settings = ExtractionSettings()
+
+
+def load_extraction_settings(params: Dict) -> ExtractionSettings:
+    """Extraction settings from the `description_preprocessing` and `llm_processing` sections of params.yaml."""
+    llm_params = params.get('llm_processing') or {}
+    return ExtractionSettings(
+        preprocessor=load_description_preprocessor(params),
+        structured_output=llm_params.get('structured_output', 'instructor'),
+        max_attempts=llm_params.get('max_attempts', 3)
+    )
+
+
+def build_job_details_prompt(description: str, known_skills: Optional[List[str]] = None) -> str:
+    prompt = (
+        "You are an expert HR analyst. Your task is to extract the required job details "
+        f"from the following job description:\n\n{description}"
+    )
+    if known_skills:
+        prompt += (
+            "\n\nThese skills were already found in the description, do not list them again, "
+            f"only extract the other skills: {', '.join(known_skills)}"
+        )
+    return prompt
+
+
+@lru_cache(maxsize=None)
+def ollama_response_format(response_model: Type[BaseModel]) -> Dict:
+    """
+    JSON schema of the response model as an OpenAI `response_format`. Ollama
+    turns it into its `format` parameter, which constrains sampling with a
+    grammar, so the output always parses against the schema.
+    """
+    return {
+        'type': 'json_schema',
+        'json_schema': {'name': response_model.__name__, 'schema': response_model.model_json_schema(), 'strict': True}
+    }
+
+
+class ExtractionCall:
+    """
+    Attempts, validation errors and token usage of one extraction call in the
+    structured output mode of the `settings`. Builds the requests and handles
+    the replies for both `generate_job_details` and `agenerate_job_details`,
+    which only make the (sync or async) calls, and records the call in
+    `extraction_telemetry` once finished.
+    """
+
+    def __init__(self, settings: ExtractionSettings, decoder_model_name: str, response_model: Type[BaseModel], prompt: str):
+        self.mode = settings.structured_output
+        self.max_attempts = settings.max_attempts
+        self.decoder_model_name = decoder_model_name
+        self.response_model = response_model
+        self.messages = [{"role": "user", "content": prompt}]
+        self.stats = {'attempts': 0, 'validation_errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self.failed_attempts: List[BaseException] = []
+        self.start_time = time.perf_counter()
+
+    def add_usage(self, usage):
+        if usage is not None:
+            self.stats['prompt_tokens'] += usage.prompt_tokens or 0
+            self.stats['completion_tokens'] += usage.completion_tokens or 0
+
+    def format_request(self) -> Dict:
+        """Arguments of the next attempt in 'format' mode."""
+        self.stats['attempts'] += 1
+        return {
+            'model': self.decoder_model_name,
+            'messages': self.messages,
+            'response_format': ollama_response_format(self.response_model),
         }
 
-    try:
-        instructor_client = instructor.from_openai(client, mode=instructor.Mode.JSON)
+    def parse_format_reply(self, completion) -> Optional[JobSkills]:
+        """Parsed details of a 'format' mode reply, None when it is invalid and attempts are left."""
+        self.add_usage(completion.usage)
+        try:
+            return self.response_model.model_validate_json(completion.choices[0].message.content)
+        except ValidationError:
+            self.stats['validation_errors'] += 1
+            if self.stats['attempts'] >= self.max_attempts:
+                raise
+            return None
 
-        prompt_with_instruction = (
-            "You are an expert HR analyst. Your task is to extract the required job details "
-            f"from the following job description:\n\n{description}"
+    def instructor_request(self, retrying_class: Type[Retrying]) -> Dict:
+        """Arguments of the 'instructor' mode call, whose retries are counted as they happen."""
+        retrying = retrying_class(
+            stop=stop_after_attempt(self.max_attempts),
+            reraise=True,
+            after=lambda state: self.failed_attempts.append(state.outcome.exception())
         )
+        return {
+            'model': self.decoder_model_name,
+            'response_model': self.response_model,
+            'messages': self.messages,
+            'max_retries': retrying,
+        }
+
+    def instructor_reply(self, completion):
+        # instructor replaces the usage of the final completion by the total over attempts
+        self.stats['attempts'] += 1
+        self.add_usage(completion.usage)
+
+    def instructor_error(self, error: InstructorRetryException):
+        self.add_usage(error.total_usage)
+
+    def total_tokens(self) -> int:
+        return self.stats['prompt_tokens'] + self.stats['completion_tokens']
+
+    def record(self, failed: bool):
+        self.stats['attempts'] += len(self.failed_attempts)
+        self.stats['validation_errors'] += sum(isinstance(error, InstructorRetryException) for error in self.failed_attempts)
+        extraction_telemetry.record_call(**self.stats, wall_time_seconds=time.perf_counter() - self.start_time, failed=failed)
 
-        job_details = instructor_client.chat.completions.create(
-            model=decoder_model_name,
-            response_model=JobDetails,
-            messages=[
-                {"role": "user", "content": prompt_with_instruction}
-            ],
-            max_retries=3,
+
+def generate_job_details(
+        client: OpenAI,
+        decoder_model_name: str,
+        response_model: Type[BaseModel],
+        prompt: str,
+        settings: Optional[ExtractionSettings] = None
+        ) -> Tuple[JobSkills, int]:
+    """
+    Runs the extraction call in the structured output mode of the `settings`,
+    and returns the parsed details with the tokens used over all attempts.
+    Every call is recorded in `extraction_telemetry`.
+    """
+    call = ExtractionCall(settings or default_extraction_settings, decoder_model_name, response_model, prompt)
+    failed = True
+    try:
+        if call.mode == 'format':
+            job_details = None
+            while job_details is None:
+                job_details = call.parse_format_reply(client.chat.completions.create(**call.format_request()))
+        else:
+            try:
+                job_details, completion = get_instructor_client(client).chat.completions.create_with_completion(**call.instructor_request(Retrying))
+            except InstructorRetryException as e:
+                call.instructor_error(e)
+                raise
+            call.instructor_reply(completion)
+
+        failed = False
+        return job_details, call.total_tokens()
+    finally:
+        call.record(failed)
+
+
+async def agenerate_job_details(
+        client: AsyncOpenAI,
+        decoder_model_name: str,
+        response_model: Type[BaseModel],
+        prompt: str,
+        settings: Optional[ExtractionSettings] = None
+        ) -> Tuple[JobSkills, int]:
+    """Async counterpart of `generate_job_details`."""
+    call = ExtractionCall(settings or default_extraction_settings, decoder_model_name, response_model, prompt)
+    failed = True
+    try:
+        if call.mode == 'format':
+            job_details = None
+            while job_details is None:
+                job_details = call.parse_format_reply(await client.chat.completions.create(**call.format_request()))
+        else:
+            try:
+                job_details, completion = await get_instructor_client(client).chat.completions.create_with_completion(**call.instructor_request(AsyncRetrying))
+            except InstructorRetryException as e:
+                call.instructor_error(e)
+                raise
+            call.instructor_reply(completion)
+
+        failed = False
+        return job_details, call.total_tokens()
+    finally:
+        call.record(failed)
+
+
+def cache_description(prompt_description: str, known_skills: List[str]) -> str:
+    """Text an extraction is cached under: the LLM answer also depends on the skills left out of the request."""
+    if not known_skills:
+        return prompt_description
+    return '\x1e'.join([prompt_description] + sorted(known_skills))
+
+
+def get_cached_details(cache: ExtractionCache, key: str) -> Optional[Dict]:
+    """Cached extraction under `key`, None on a miss. The cache is best effort, a failed read counts as a miss."""
+    try:
+        return cache.get(key)
+    except sqlite3.Error as e:
+        print(f"Extraction cache read failed ({e}), calling the LLM.")
+        return None
+
+
+def set_cached_details(cache: ExtractionCache, key: str, details: Dict):
+    """Caches an extraction. A failed write is only logged, so an extraction already paid for is still returned."""
+    try:
+        cache.set(key, details)
+    except sqlite3.Error as e:
+        print(f"Extraction cache write failed ({e}), the extraction is not cached.")
+
+
+def job_details_to_dict(job_details: JobSkills) -> Dict:
+    output_dict = job_details.model_dump()
+    combined_skills = (job_details.technical_skills or []) + (job_details.soft_skills or []) + (job_details.domain_skills or [])
+    output_dict['skills'] = list(set(combined_skills))
+
+    if 'city' in output_dict:
+        output_dict['refined_location'] = format_refined_location(output_dict.pop('city'), output_dict.pop('state'))
+    return output_dict
+
+
+def is_valid_description(description) -> bool:
+    return isinstance(description, str) and len(description.strip()) >= 20
+
+
+def check_description(description, raise_errors: bool) -> bool:
+    """Whether the description can be sent to the LLM. An invalid one raises with `raise_errors`, and is logged otherwise."""
+    if is_valid_description(description):
+        return True
+    if raise_errors:
+        raise ValueError("Invalid description.")
+    print(f"Invalid description.")
+    return False
+
+
+class ExtractionRequest:
+    """
+    What an extraction sends to the LLM and adds to its answer, shared by
+    `get_job_details` and `aget_job_details`: the rule-based pre-extraction,
+    the response model, the preprocessed prompt and the cache key.
+    """
+
+    def __init__(
+            self,
+            description: str,
+            decoder_model_name: str,
+            pre_extraction: bool = True,
+            location: Optional[str] = None,
+            known_skills: Optional[List[str]] = None,
+            settings: Optional[ExtractionSettings] = None,
+            refine_location: Optional[bool] = None
+            ):
+        self.settings = settings or default_extraction_settings
+        self.known_skills = known_skills or []
+
+        self.pre_extracted = extract_confident_job_details(description) if pre_extraction else {}
+        if refine_location is None:
+            refine_location = needs_location_refinement(location)
+        self.response_model = get_response_model(frozenset(self.pre_extracted), refine_location)
+
+        prompt_description, tokens_saved = preprocess_description(description, self.settings.preprocessor)
+        self.pre_extracted['description_tokens_saved'] = tokens_saved
+        self.prompt = build_job_details_prompt(prompt_description, self.known_skills)
+        self.cache_key = ExtractionCache.make_key(
+            cache_description(prompt_description, self.known_skills), decoder_model_name, job_details_schema_version(self.response_model)
         )
 
-        output_dict = job_details.model_dump()
-        combined_skills = (job_details.technical_skills or []) + (job_details.soft_skills or []) + (job_details.domain_skills or [])
-        output_dict['skills'] = list(set(combined_skills))
+    def result(self, extracted: Dict) -> Dict:
+        """Job details of the posting, from the fields the LLM extracted or the cache held."""
+        return merge_known_skills(extracted, self.known_skills) | self.pre_extracted
+
+
+def get_job_details(
+        description: str,
+        index: int,
+        client: OpenAI,
+        decoder_model_name: str,
+        cache: Optional[ExtractionCache] = None,
+        pre_extraction: bool = True,
+        location: Optional[str] = None,
+        raise_errors: bool = False,
+        known_skills: Optional[List[str]] = None,
+        settings: Optional[ExtractionSettings] = None,
+        refine_location: Optional[bool] = None
+        ) -> Tuple[int, Dict]:
+    """
+    Extracts the job details of a description with the LLM.
+
+    With `pre_extraction`, the experience and education stated in stock
+    phrasing are parsed by rules first and the LLM only generates the other
+    fields. The `known_skills` found by the dictionary pre-pass are left out
+    of the request and added to the technical skills of the result. The
+    description is preprocessed as configured in the extraction `settings`,
+    and the tokens saved are reported under 'description_tokens_saved'.
+
+    When the raw `location` of the posting is inconclusive, the city and state
+    are extracted in the same call and returned as 'refined_location'.
+    `refine_location` overrides that decision, e.g. for a near-duplicate
+    representative whose duplicates need it.
+
+    A failed extraction returns the empty details, or raises with `raise_errors`
+    so the caller can tell it apart from a posting without any details.
+    """
+    if not check_description(description, raise_errors):
+        return index, empty_job_details()
 
-        return index, output_dict
+    request = ExtractionRequest(description, decoder_model_name, pre_extraction, location, known_skills, settings, refine_location)
+    if cache is not None:
+        cached_details = get_cached_details(cache, request.cache_key)
+        if cached_details is not None:
+            return index, request.result(cached_details)
 
+    try:
+        job_details, _ = generate_job_details(client, decoder_model_name, request.response_model, request.prompt, request.settings)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error processing row {index}: {e}")
 
-        return index, {
-            'technical_skills': [],
-            'soft_skills': [],
-            'domain_skills': [],
-            'skills': [],
-            'experience_years_required': None,
-            'education_level': None
-        }
+        return index, empty_job_details()
+
+    output_dict = job_details_to_dict(job_details)
+    if cache is not None:
+        set_cached_details(cache, request.cache_key, output_dict)
+
+    return index, request.result(output_dict)
+
+
+async def aget_job_details(
+        description: str,
+        index: int,
+        client: AsyncOpenAI,
+        decoder_model_name: str,
+        cache: Optional[ExtractionCache] = None,
+        pre_extraction: bool = True,
+        location: Optional[str] = None,
+        raise_errors: bool = False,
+        known_skills: Optional[List[str]] = None,
+        settings: Optional[ExtractionSettings] = None,
+        refine_location: Optional[bool] = None
+        ) -> Tuple[int, Dict, int]:
+    """
+    Async counterpart of `get_job_details`. Also returns the number of tokens
+    (prompt + completion) used by the call, 0 when no LLM call was made.
+    """
+    if not check_description(description, raise_errors):
+        return index, empty_job_details(), 0
+
+    request = ExtractionRequest(description, decoder_model_name, pre_extraction, location, known_skills, settings, refine_location)
+    if cache is not None:
+        cached_details = await asyncio.to_thread(get_cached_details, cache, request.cache_key)
+        if cached_details is not None:
+            return index, request.result(cached_details), 0
+
+    try:
+        job_details, total_tokens = await agenerate_job_details(client, decoder_model_name, request.response_model, request.prompt, request.settings)
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error processing row {index}: {e}")
+
+        return index, empty_job_details(), 0
+
+    output_dict = job_details_to_dict(job_details)
+    if cache is not None:
+        await asyncio.to_thread(set_cached_details, cache, request.cache_key, output_dict)
+
+    return index, request.result(output_dict), total_tokens
@@ -1,4 +1,3 @@
-import instructor
 import pandas as pd
 
 from pydantic import BaseModel, Field
@@ -7,19 +6,32 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Tuple
 from openai import OpenAI
 
-from llm.ollama_setup import is_ollama_server_running
+from llm.ollama_setup import get_instructor_client, is_ollama_server_running
 
 
 class JobLocation(BaseModel):
-    city: str = Field(..., description='City of the job posting as a string. If the job is remote, try to find the city where the company is based.')
-    state: str = Field(..., description='The 2-letter state abbreviation of the job posting as a string. E.g. CA, NY If the job is remote, try to find the state where the company is based.')
+    city: str = Field(..., description="City of the job posting as a string. If the job is remote, try to find the city where the company is based. If no city is mentioned, return 'unknown'.")
+    state: str = Field(..., description="The 2-letter state abbreviation of the job posting as a string. E.g. CA, NY If the job is remote, try to find the state where the company is based. If no state is mentioned, return 'unknown'.")
+
+def format_refined_location(city: str, state: str) -> str:
+    city = city.lower()
+    state = state.lower()
+
+    if city == 'unknown' and state == 'unknown':
+        return 'other_us'
+    elif city != 'unknown' and state != 'unknown':
+        return f"{city}, {state}"
+    elif city == 'unknown':
+        return state
+    else:
+        return city
 
 def get_job_location(description: str, index: int, client: OpenAI, decoder_model_name: str) -> Tuple[int, Dict]:
     if not isinstance(description, str):
         return index, {'refined_location': 'unknown'}
 
     try:
-        instructor_client = instructor.from_openai(client, mode=instructor.Mode.JSON)
+        instructor_client = get_instructor_client(client)
         job_location = instructor_client.chat.completions.create(
             model=decoder_model_name,
             response_model=JobLocation,
@@ -29,18 +41,7 @@ def get_job_location(description: str, index: int, client: OpenAI, decoder_model
             max_retries=2,
         )
 
-        city = job_location.city.lower()
-        state = job_location.state.lower()
-
-        if city == 'unknown' and state == 'unknown':
-            return index, {'refined_location': 'other_us'}
-        elif city != 'unknown' and state != 'unknown':
-            refined_location = f"{city}, {state}"
-            return index, {'refined_location': refined_location}
-        elif city == 'unknown':
-            return index, {'refined_location': state}
-        elif state == 'unknown':
-            return index, {'refined_location': city}
+        return index, {'refined_location': format_refined_location(job_location.city, job_location.state)}
 
     except Exception as e:
         print(f"Error processing index {index}: {e}")
@@ -54,7 +55,7 @@ def refine_locations_concurrently(
     description_column: str = 'description',
     max_workers: int = 16
 ):
-    if not is_ollama_server_running():
+    if not is_ollama_server_running(client):
         return None
 
     df_to_process = df[(df[location_column] == 'other_us') | (df[location_column] == 'unknown')].copy()
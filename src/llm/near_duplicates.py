@@ -0,0 +1,214 @@
+import argparse
+import re
+import zlib
+import numpy as np
+import pandas as pd
+import yaml
+
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from dataset.storage import read_dataset, write_dataset
+from feature_cleaning.location import inconclusive_locations, location_normalizer
+from feature_extraction.description_rules import extract_confident_job_details
+from llm.description_preprocessing import strip_markup
+
+minhash_prime = np.uint64(4294967291)  # largest prime below 2**32
+# numbers are kept: postings that only differ in the years of experience they ask for are not duplicates
+word_pattern = re.compile(r"[a-z0-9]+")
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) splitting of the signature whose LSH threshold (1/b)^(1/r)
+    is closest to the requested similarity threshold.
+    """
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash / LSH index of job descriptions.
+
+    A description is reduced to the set of its word shingles and summarised by
+    a MinHash signature, whose agreement rate between two descriptions
+    estimates their Jaccard similarity. Signatures are split into bands and
+    hashed into buckets, so candidates are found without comparing against
+    every indexed description, then confirmed against `threshold`.
+    A single changed word, such as a requisition number, only changes a few
+    shingles, so it rarely splits a cluster of long descriptions.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5, seed: int = 42):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, int(minhash_prime), size=num_perm, dtype=np.uint64)
+        self.b = generator.integers(0, int(minhash_prime), size=num_perm, dtype=np.uint64)
+
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(self.bands)]
+
+    def signature(self, description: str) -> Optional[np.ndarray]:
+        words = word_pattern.findall(strip_markup(description).lower()) if isinstance(description, str) else []
+        if not words:
+            return None
+
+        size = min(self.shingle_size, len(words))
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+        # one universal hash per permutation, the signature keeps the minimum of each
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % minhash_prime
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _bands(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query_signature(self, signature: Optional[np.ndarray]) -> Optional[Hashable]:
+        """Key of the most similar indexed description above the threshold, if any."""
+        if signature is None:
+            return None
+
+        candidates = set()
+        for band, bucket_key in zip(self.buckets, self._bands(signature)):
+            candidates.update(band.get(bucket_key, ()))
+
+        best_key, best_similarity = None, self.threshold
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def query(self, description: str) -> Optional[Hashable]:
+        return self.query_signature(self.signature(description))
+
+    def add_signature(self, key: Hashable, signature: Optional[np.ndarray]):
+        if signature is None:
+            return
+        self.signatures[key] = signature
+        for band, bucket_key in zip(self.buckets, self._bands(signature)):
+            band[bucket_key].append(key)
+
+    def add(self, key: Hashable, description: str):
+        self.add_signature(key, self.signature(description))
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+def find_near_duplicates(descriptions: pd.Series, index: NearDuplicateIndex) -> pd.Series:
+    """
+    Maps every posting to the representative of its near-duplicate cluster:
+    the first posting, in order, that it is similar enough to. Representatives
+    map to themselves. Only representatives are added to `index`.
+    """
+    representatives = {}
+    for key, description in descriptions.items():
+        signature = index.signature(description)
+        representative = index.query_signature(signature)
+        if representative is None:
+            index.add_signature(key, signature)
+            representative = key
+        representatives[key] = representative
+
+    return pd.Series(representatives, name='representative_index').rename_axis(descriptions.index.name)
+
+
+def assign_representatives(descriptions: List[str], index: NearDuplicateIndex, first_key: int) -> List[Optional[Hashable]]:
+    """
+    Online counterpart of `find_near_duplicates` for a stream of postings keyed
+    by position. Returns, for every description, the key of the earlier
+    posting it duplicates, or None when it is new, in which case it is added
+    to `index` under `first_key + position`.
+    """
+    representatives = []
+    for position, description in enumerate(descriptions):
+        signature = index.signature(description)
+        representative = index.query_signature(signature)
+        if representative is None:
+            index.add_signature(first_key + position, signature)
+        representatives.append(representative)
+    return representatives
+
+
+def inconclusive_location_mask(locations: pd.Series) -> pd.Series:
+    return location_normalizer.normalize_series(locations).isin(inconclusive_locations)
+
+
+def representatives_needing_location(locations: pd.Series, representatives: pd.Series) -> pd.Series:
+    """
+    Whether the extraction of each representative must also request the city
+    and state: the location is a field of the posting, not of the description,
+    so a representative with a conclusive location can still have near
+    duplicates whose location is inconclusive.
+    """
+    inconclusive = inconclusive_location_mask(locations)
+    return inconclusive.groupby(representatives.reindex(locations.index).values).any()
+
+
+def duplicate_job_details(representative_details: Dict, description: str) -> Dict:
+    """
+    Job details of a near duplicate: the ones of its representative, with the
+    experience and education its own description states. Near-identical
+    descriptions can still ask for a different number of years.
+    """
+    return representative_details | extract_confident_job_details(description)
+
+
+def propagate_to_duplicates(df: pd.DataFrame, processed_representatives: pd.DataFrame, representatives: pd.Series) -> pd.DataFrame:
+    """
+    Joins the extraction results of the representatives onto every posting of
+    `df`, copying them to the near duplicates of each representative (see
+    `duplicate_job_details`). The 'refined_location' is not copied as is: a
+    posting only gets one when its own location is inconclusive.
+    """
+    result_columns = [col for col in processed_representatives.columns if col not in df.columns]
+    representative_keys = representatives.reindex(df.index)
+    results = processed_representatives[result_columns].reindex(representative_keys.values)
+    results.index = df.index
+    if 'refined_location' in results.columns:
+        results['refined_location'] = results['refined_location'].where(inconclusive_location_mask(df['location']), None)
+
+    duplicates = df.index[representative_keys.to_numpy() != df.index.to_numpy()]
+    own_details = df.loc[duplicates, 'description'].map(extract_confident_job_details)
+    for field in ('experience_years_required', 'education_level'):
+        if field in results.columns:
+            stated = own_details.map(lambda details: details.get(field)).dropna()
+            results[field] = stated.reindex(results.index).combine_first(results[field])
+
+    return df.join(results)
+
+
+def load_near_duplicates(path: str) -> pd.Series:
+    return read_dataset(path, columns=['representative_index'])['representative_index']
+
+
+if __name__ == '__main__':
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate postings so only one per cluster is sent to the LLM.")
+    parser.add_argument('--input-path', type=str, default='data/datasets/postings_cleaned.parquet')
+    parser.add_argument('--output-path', type=str, required=True)
+    args = parser.parse_args()
+
+    duplicate_params = params['near_duplicates']
+    df = read_dataset(args.input_path, columns=['description'])
+
+    index = NearDuplicateIndex(
+        threshold=duplicate_params['threshold'],
+        num_perm=duplicate_params['num_perm'],
+        shingle_size=duplicate_params['shingle_size']
+    )
+    representatives = find_near_duplicates(df['description'], index)
+    write_dataset(representatives.to_frame(), args.output_path)
+
+    n_duplicates = int((representatives != representatives.index).sum())
+    print(f"{n_duplicates} of {len(representatives)} postings ({n_duplicates / max(1, len(representatives)):.1%}) "
+          f"are near duplicates of {len(index)} representatives. Saved to '{args.output_path}'.")
@@ -1,12 +1,284 @@
-from openai import OpenAI, APIConnectionError
+import os
+import threading
+import time
+import httpx
+import instructor
+import yaml
 
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Union
+from openai import AsyncOpenAI, OpenAI, APIConnectionError, DEFAULT_MAX_RETRIES
 
-def get_client() -> OpenAI:
+ollama_host = 'http://localhost:11434'
+ollama_api_path = '/v1'
+ollama_base_url = ollama_host + ollama_api_path
+ollama_api_key = 'ollama'
+
+# Clients are shared process-wide, so connections are kept alive between
+# calls. LLM calls are slow, hence the long read timeout.
+http_limits = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=300)
+http_timeout = httpx.Timeout(600.0, connect=5.0)
+
+health_check_ttl_seconds = 30.0
+
+# A host that fails a request is taken out of the rotation for this long
+endpoint_ejection_seconds = 30.0
+# Responses that mean the host is overloaded or restarting, retried on another host
+retryable_status_codes = {502, 503, 504}
+# Errors meaning the request never reached the host, so it is safe to send it
+# to another one. Read timeouts are not among them: the host may still be generating.
+failover_errors = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class OllamaEndpoint:
+    def __init__(self, host: str):
+        self.url = httpx.URL(host)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+
+class OllamaEndpointPool:
+    """
+    Ollama hosts serving the same models. Every request goes to the host with
+    the fewest outstanding requests, so slow generations on one host do not
+    hold up the others. A host that fails a request is ejected for
+    `ejection_seconds`, then gets traffic again and is ejected anew if it
+    still fails. When every host is ejected, the least recently failed hosts
+    are still tried rather than failing outright.
+    """
+
+    def __init__(self, hosts: List[str], ejection_seconds: float = endpoint_ejection_seconds):
+        if not hosts:
+            raise ValueError("The Ollama endpoint pool needs at least one host.")
+        self.endpoints = [OllamaEndpoint(host.rstrip('/')) for host in hosts]
+        self.ejection_seconds = ejection_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        # requests are built against the first host, then routed by the transport
+        return str(self.endpoints[0].url) + ollama_api_path
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self, exclude: Set[int]) -> Optional[int]:
+        """Index of the endpoint to send the next request to, None when every endpoint was excluded."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [i for i in range(len(self.endpoints)) if i not in exclude]
+            if not candidates:
+                return None
+
+            available = [i for i in candidates if not self.endpoints[i].is_ejected(now)]
+            if available:
+                chosen = min(available, key=lambda i: (self.endpoints[i].outstanding, self.endpoints[i].requests))
+            else:
+                chosen = min(candidates, key=lambda i: self.endpoints[i].ejected_until)
+
+            endpoint = self.endpoints[chosen]
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return chosen
+
+    def release(self, index: int, failed: bool = False):
+        with self._lock:
+            endpoint = self.endpoints[index]
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.ejected_until = time.monotonic() + self.ejection_seconds
+            else:
+                endpoint.ejected_until = 0.0
+
+    def route(self, request: httpx.Request, index: int):
+        """Points `request` at the endpoint, keeping its path and query."""
+        url = self.endpoints[index].url
+        request.url = request.url.copy_with(scheme=url.scheme, host=url.host, port=url.port)
+        request.headers['Host'] = request.url.netloc.decode('ascii')
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'host': str(endpoint.url),
+                    'outstanding': endpoint.outstanding,
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures,
+                    'ejected': endpoint.is_ejected(now),
+                }
+                for endpoint in self.endpoints
+            ]
+
+
+class RoutedRequest:
+    """
+    One request going through `pool`: picks a host for each attempt and
+    decides from its outcome whether to try another host. Connection
+    failures and overloaded responses are retried on another host, each host
+    being tried at most once. Other errors, read timeouts included, are
+    raised as they are, since the host may still be generating.
+    """
+
+    def __init__(self, pool: OllamaEndpointPool, request: httpx.Request):
+        self.pool = pool
+        self.request = request
+        self.tried = set()
+        self.index = None
+
+    def start_attempt(self):
+        self.index = self.pool.acquire(self.tried)
+        self.tried.add(self.index)
+        self.pool.route(self.request, self.index)
+
+    def can_retry(self) -> bool:
+        return len(self.tried) < len(self.pool)
+
+    def retry_after_error(self, error: BaseException) -> bool:
+        """Releases the host after `error`, True when the request should go to another host."""
+        failed = isinstance(error, failover_errors)
+        self.pool.release(self.index, failed=failed)
+        return failed and self.can_retry()
+
+    def retry_after_response(self, response: httpx.Response) -> bool:
+        """Releases the host after `response`, True when the request should go to another host."""
+        failed = response.status_code in retryable_status_codes
+        self.pool.release(self.index, failed=failed)
+        return failed and self.can_retry()
+
+
+class LoadBalancingTransport(httpx.BaseTransport):
+    """
+    httpx transport sending each request through `pool`, so an OpenAI client
+    built on it spreads its calls over every Ollama host without its callers
+    knowing. See `RoutedRequest` for when a request moves to another host.
+
+    A non-streamed completion only returns its headers once the generation is
+    done, so a request stops counting as outstanding when the response comes back.
+    """
+
+    def __init__(self, pool: OllamaEndpointPool, transport: httpx.BaseTransport):
+        self.pool = pool
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        routed = RoutedRequest(self.pool, request)
+        while True:
+            routed.start_attempt()
+            try:
+                response = self.transport.handle_request(request)
+            except BaseException as error:
+                if routed.retry_after_error(error):
+                    continue
+                raise
+
+            if not routed.retry_after_response(response):
+                return response
+            response.close()
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncLoadBalancingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of `LoadBalancingTransport`."""
+
+    def __init__(self, pool: OllamaEndpointPool, transport: httpx.AsyncBaseTransport):
+        self.pool = pool
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        routed = RoutedRequest(self.pool, request)
+        while True:
+            routed.start_attempt()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException as error:
+                if routed.retry_after_error(error):
+                    continue
+                raise
+
+            if not routed.retry_after_response(response):
+                return response
+            await response.aclose()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def load_endpoint_pool(params: Dict) -> OllamaEndpointPool:
+    """Builds the endpoint pool from the `ollama` section of params.yaml, defaulting to the local server."""
+    ollama_params = params.get('ollama') or {}
+    return OllamaEndpointPool(
+        ollama_params.get('hosts') or [ollama_host],
+        ejection_seconds=ollama_params.get('ejection_seconds', endpoint_ejection_seconds)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_endpoint_pool() -> OllamaEndpointPool:
+    """Process-wide endpoint pool configured in params.yaml, loaded on first use."""
+    params = {}
+    if os.path.exists('params.yaml'):
+        with open('params.yaml', 'r') as f:
+            params = yaml.safe_load(f)
+    return load_endpoint_pool(params)
+
+
+def pool_limits(pool: OllamaEndpointPool) -> httpx.Limits:
+    # the connection limits apply per host
+    return httpx.Limits(
+        max_connections=http_limits.max_connections * len(pool),
+        max_keepalive_connections=http_limits.max_keepalive_connections * len(pool),
+        keepalive_expiry=http_limits.keepalive_expiry,
+    )
+
+
+def client_max_retries(pool: OllamaEndpointPool) -> int:
+    # with several hosts a failed call already moved to another one in the transport, retrying on
+    # top of it would multiply the attempts. A single host is retried by the client, with backoff.
+    return 0 if len(pool) > 1 else DEFAULT_MAX_RETRIES
+
+
+def build_client(pool: OllamaEndpointPool) -> OpenAI:
+    transport = LoadBalancingTransport(pool, httpx.HTTPTransport(limits=pool_limits(pool)))
     return OpenAI(
-        base_url='http://localhost:11434/v1',
-        api_key='ollama',
+        base_url=pool.base_url,
+        api_key=ollama_api_key,
+        max_retries=client_max_retries(pool),
+        http_client=httpx.Client(transport=transport, timeout=http_timeout),
     )
 
+def build_async_client(pool: OllamaEndpointPool) -> AsyncOpenAI:
+    transport = AsyncLoadBalancingTransport(pool, httpx.AsyncHTTPTransport(limits=pool_limits(pool)))
+    return AsyncOpenAI(
+        base_url=pool.base_url,
+        api_key=ollama_api_key,
+        max_retries=client_max_retries(pool),
+        http_client=httpx.AsyncClient(transport=transport, timeout=http_timeout),
+    )
+
+@lru_cache(maxsize=None)
+def get_client() -> OpenAI:
+    return build_client(get_endpoint_pool())
+
+@lru_cache(maxsize=None)
+def get_async_client() -> AsyncOpenAI:
+    # The underlying connection pool is bound to the event loop that first uses it,
+    # so the shared async client is meant for a single `asyncio.run` per process.
+    return build_async_client(get_endpoint_pool())
+
+@lru_cache(maxsize=None)
+def get_instructor_client(client: Union[OpenAI, AsyncOpenAI]) -> Union[instructor.Instructor, instructor.AsyncInstructor]:
+    """Instructor wrapper around `client`, built once per client instead of once per call."""
+    return instructor.from_openai(client, mode=instructor.Mode.JSON)
+
 def is_ollama_server_running(client) -> bool:
     try:
         client.models.list() # A lightweight request to check the connection
@@ -18,3 +290,65 @@ def is_ollama_server_running(client) -> bool:
     except Exception as e:
         print(f"\nAn unexpected error occurred while checking the Ollama server: {e}")
         return False
+
+async def is_async_ollama_server_running(client: AsyncOpenAI) -> bool:
+    try:
+        await client.models.list()
+        return True
+    except APIConnectionError:
+        print("\n❌ ERROR: Could not connect to the Ollama server.")
+        print("Please ensure the Ollama server is running.\n")
+        return False
+    except Exception as e:
+        print(f"\nAn unexpected error occurred while checking the Ollama server: {e}")
+        return False
+
+
+class OllamaHealthMonitor:
+    """
+    Keeps the health of the Ollama server up to date from a background thread,
+    so request handlers read a cached flag instead of calling `models.list()`.
+    A synchronous check only happens when the cached state is older than twice
+    the TTL, i.e. when the background thread has stalled.
+    """
+
+    def __init__(self, client: OpenAI, ttl_seconds: float = health_check_ttl_seconds):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.healthy = False
+        self.checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def check(self) -> bool:
+        healthy = is_ollama_server_running(self.client)
+        with self._lock:
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+        return healthy
+
+    def _run(self):
+        while True:
+            time.sleep(self.ttl_seconds)
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='ollama-health', daemon=True)
+            self._thread.start()
+
+    def is_healthy(self) -> bool:
+        with self._lock:
+            checked_at, healthy = self.checked_at, self.healthy
+        if checked_at is None or time.monotonic() - checked_at > 2 * self.ttl_seconds:
+            return self.check()
+        return healthy
+
+
+@lru_cache(maxsize=None)
+def get_health_monitor(client: OpenAI) -> OllamaHealthMonitor:
+    """Background health monitor for `client`, checked and started on first use."""
+    monitor = OllamaHealthMonitor(client)
+    monitor.check()
+    monitor.start()
+    return monitor
@@ -0,0 +1,90 @@
+import threading
+
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+# Wall times of the most recent calls, kept for the latency percentiles
+recent_call_window = 10000
+
+
+class ExtractionTelemetry:
+    """
+    Process-wide counters of the LLM extraction calls: attempts, retries,
+    validation errors, token usage and wall time. Retries are otherwise
+    invisible, they only show up as tail latency and extra tokens.
+    Thread-safe, so the thread pool processors and the service can share it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.failures = 0
+            self.attempts = 0
+            self.retries = 0
+            self.validation_errors = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.wall_time_seconds = 0.0
+            self.recent_wall_times = deque(maxlen=recent_call_window)
+
+    def record_call(
+            self,
+            attempts: int,
+            validation_errors: int,
+            prompt_tokens: int,
+            completion_tokens: int,
+            wall_time_seconds: float,
+            failed: bool = False
+            ):
+        """Records one extraction call, including all of its attempts."""
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            self.attempts += attempts
+            self.retries += max(0, attempts - 1)
+            self.validation_errors += validation_errors
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.wall_time_seconds += wall_time_seconds
+            self.recent_wall_times.append(wall_time_seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = self.calls
+            wall_times = np.fromiter(self.recent_wall_times, dtype=float, count=len(self.recent_wall_times))
+            snapshot = {
+                'calls': calls,
+                'failures': self.failures,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'validation_errors': self.validation_errors,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'wall_time_seconds': round(self.wall_time_seconds, 3),
+            }
+
+        snapshot['retry_rate'] = snapshot['retries'] / calls if calls else 0.0
+        snapshot['mean_call_seconds'] = snapshot['wall_time_seconds'] / calls if calls else 0.0
+        if len(wall_times):
+            snapshot['p50_call_seconds'] = float(np.percentile(wall_times, 50))
+            snapshot['p95_call_seconds'] = float(np.percentile(wall_times, 95))
+        return snapshot
+
+    def summary(self) -> str:
+        snapshot = self.snapshot()
+        return (
+            f"{snapshot['calls']} LLM calls, {snapshot['retries']} retries ({snapshot['retry_rate']:.1%}), "
+            f"{snapshot['validation_errors']} validation errors, {snapshot['failures']} failures, "
+            f"{snapshot['prompt_tokens']} prompt + {snapshot['completion_tokens']} completion tokens, "
+            f"{snapshot['mean_call_seconds']:.2f}s per call"
+            + (f" (p95 {snapshot['p95_call_seconds']:.2f}s)" if 'p95_call_seconds' in snapshot else "")
+        )
+
+
+extraction_telemetry = ExtractionTelemetry()
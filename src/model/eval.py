@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from typing import Dict
+from typing import Dict, List
 from catboost import CatBoostRegressor
 from sklearn.metrics import mean_squared_error
 
@@ -15,3 +15,24 @@ def eval_model(model: CatBoostRegressor, X_test: pd.DataFrame, y_test: pd.DataFr
 
     rmse = np.sqrt(mean_squared_error(y_test_actual, predictions_actual))
     return {'RMSE': rmse}
+
+
+def eval_multi_quantile_model(model: CatBoostRegressor, X_test: pd.DataFrame, y_test: pd.DataFrame, alphas: List[float]) -> Dict:
+    """
+    Evaluates a MultiQuantile model: pinball loss (on the log target) and
+    empirical coverage for every quantile, plus the RMSE of the median if it is predicted.
+    """
+    predictions_log = model.predict(X_test).reshape(len(X_test), len(alphas))
+    y_test_log = np.asarray(y_test)
+
+    metrics = {}
+    for i, alpha in enumerate(alphas):
+        errors = y_test_log - predictions_log[:, i]
+        metrics[f'Quantile:alpha={alpha}'] = np.mean(np.maximum(alpha * errors, (alpha - 1) * errors))
+        metrics[f'Coverage:alpha={alpha}'] = np.mean(y_test_log <= predictions_log[:, i])
+
+    if 0.5 in alphas:
+        median_actual = np.expm1(predictions_log[:, alphas.index(0.5)])
+        metrics['RMSE'] = np.sqrt(mean_squared_error(np.expm1(y_test_log), median_actual))
+
+    return metrics
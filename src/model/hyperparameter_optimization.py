@@ -1,4 +1,6 @@
+import argparse
 import pandas as pd
+import yaml
 
 from typing import Dict, List
 from catboost import CatBoostRegressor
@@ -7,9 +9,9 @@ from optuna import create_study
 from pprint import pp
 
 from sklearn.model_selection import train_test_split
-from model.eval import eval_model
+from model.eval import eval_model, eval_multi_quantile_model
 from model.save import save_model
-from model.train import load_final_dataset, split_dataset
+from model.train import load_final_dataset, split_dataset, quantile_loss_function
 from predictions.features import categorical_features, all_features, target_column
 
 
@@ -19,14 +21,14 @@ def objective(
         X_train: pd.DataFrame, 
         y_train: pd.DataFrame, 
         categorical_features: List[str],
-        alpha: float,
+        alphas: List[float],
         gpu: bool = False,
         seed: int = 42
         ):
     X_train_main, X_val, y_train_main, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=1)
 
-    loss_function_name = f'Quantile:alpha={alpha}'
-    eval_metric_name = f'Quantile:alpha={alpha}'
+    loss_function_name = quantile_loss_function(alphas)
+    eval_metric_name = quantile_loss_function(alphas)
 
     # define the hyperparameter search space
     params = {
@@ -64,17 +66,17 @@ def run_optuna_study(
         X_train: pd.DataFrame, 
         y_train: pd.DataFrame, 
         categorical_features: List[str],
-        alpha: float,
+        alphas: List[float],
         n_trials: int = 50,
         gpu: bool = False,
         seed: int = 42
     ) -> Dict:
     study = create_study(direction='minimize')
 
-    print(f"Starting hyperparameter tuning for Quantile alpha={alpha}...")
+    print(f"Starting hyperparameter tuning for Quantile alphas={alphas}...")
 
     study.optimize(
-        lambda trial: objective(trial, X_train, y_train, categorical_features, alpha, gpu, seed), 
+        lambda trial: objective(trial, X_train, y_train, categorical_features, alphas, gpu, seed), 
         n_trials=n_trials
     )
 
@@ -97,44 +99,70 @@ def run_optuna_study(
 
 
 if __name__ == '__main__':
-    path = 'data/datasets/postings_final.csv'
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--multi-quantile', action='store_true', help='Tune a single MultiQuantile model on the quantiles from params.yaml.')
+    args = parser.parse_args()
+
+    path = 'data/datasets/postings_final.parquet'
     df = load_final_dataset(path, all_features, target_column, categorical_features)
     X_train, X_test, y_train, y_test = split_dataset(df, all_features, target_column)
 
-    lower_bound_alpha = 0.25
-    upper_bound_alpha = 0.75
-
-    # Optimize lower bound model
-    lower_bound_best_params = run_optuna_study(X_train, y_train, categorical_features, alpha=lower_bound_alpha, n_trials=1)
-    print(f"\n\nBest params for model with alpha={lower_bound_alpha}:")
-    pp(lower_bound_best_params)
-
-    # Train and export lower bound model
-    print("\nTraining final lower model with best parameters...")
-    lower_model = CatBoostRegressor(
-        **lower_bound_best_params, 
-        loss_function=f'Quantile:alpha={lower_bound_alpha}',
-        task_type='CPU', 
-        cat_features=categorical_features)
-    lower_model.fit(X_train, y_train)
-    print(f"\n\nFinal metrics for model with alpha={lower_bound_alpha}:")
-    pp(eval_model(lower_model, X_test, y_test))
-    save_model(lower_model, name="lower_catboost")
-
-    # Optimize upper bound model
-    upper_bound_best_params = run_optuna_study(X_train, y_train, categorical_features, alpha=upper_bound_alpha, n_trials=1)
-    print(f"\n\nBest params for model with alpha={upper_bound_alpha}:")
-    pp(upper_bound_best_params)
-
-    # Train and export upper bound model
-    print("\nTraining final upper model with best parameters...")
-    upper_model = CatBoostRegressor(
-        **upper_bound_best_params, 
-        loss_function=f'Quantile:alpha={upper_bound_alpha}',
-        task_type='CPU', 
-        cat_features=categorical_features)
-    upper_model.fit(X_train, y_train)
-    print(f"\n\nFinal metrics for model with alpha={upper_bound_alpha}:")
-    pp(eval_model(upper_model, X_test, y_test))
-    save_model(upper_model, name="upper_catboost")
-    
\ No newline at end of file
+    if args.multi_quantile:
+        quantiles = params['training']['quantiles']
+
+        # Optimize a single model for every quantile
+        multi_quantile_best_params = run_optuna_study(X_train, y_train, categorical_features, alphas=quantiles, n_trials=1)
+        print(f"\n\nBest params for model with alphas={quantiles}:")
+        pp(multi_quantile_best_params)
+
+        # Train and export multi-quantile model
+        print("\nTraining final multi-quantile model with best parameters...")
+        multi_quantile_model = CatBoostRegressor(
+            **multi_quantile_best_params,
+            loss_function=quantile_loss_function(quantiles),
+            task_type='CPU',
+            cat_features=categorical_features)
+        multi_quantile_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alphas={quantiles}:")
+        pp(eval_multi_quantile_model(multi_quantile_model, X_test, y_test, quantiles))
+        save_model(multi_quantile_model, name="multi_quantile_catboost")
+    else:
+        lower_bound_alpha = 0.25
+        upper_bound_alpha = 0.75
+
+        # Optimize lower bound model
+        lower_bound_best_params = run_optuna_study(X_train, y_train, categorical_features, alphas=[lower_bound_alpha], n_trials=1)
+        print(f"\n\nBest params for model with alpha={lower_bound_alpha}:")
+        pp(lower_bound_best_params)
+
+        # Train and export lower bound model
+        print("\nTraining final lower model with best parameters...")
+        lower_model = CatBoostRegressor(
+            **lower_bound_best_params, 
+            loss_function=quantile_loss_function([lower_bound_alpha]),
+            task_type='CPU', 
+            cat_features=categorical_features)
+        lower_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alpha={lower_bound_alpha}:")
+        pp(eval_model(lower_model, X_test, y_test))
+        save_model(lower_model, name="lower_catboost")
+
+        # Optimize upper bound model
+        upper_bound_best_params = run_optuna_study(X_train, y_train, categorical_features, alphas=[upper_bound_alpha], n_trials=1)
+        print(f"\n\nBest params for model with alpha={upper_bound_alpha}:")
+        pp(upper_bound_best_params)
+
+        # Train and export upper bound model
+        print("\nTraining final upper model with best parameters...")
+        upper_model = CatBoostRegressor(
+            **upper_bound_best_params, 
+            loss_function=quantile_loss_function([upper_bound_alpha]),
+            task_type='CPU', 
+            cat_features=categorical_features)
+        upper_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alpha={upper_bound_alpha}:")
+        pp(eval_model(upper_model, X_test, y_test))
+        save_model(upper_model, name="upper_catboost")
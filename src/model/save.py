@@ -1,5 +1,6 @@
 from catboost import CatBoostRegressor
 from datetime import datetime
+from typing import List
 
 
 def save_model(model: CatBoostRegressor, name: str, folder: str = 'data/models/'):
@@ -12,3 +13,15 @@ def save_model(model: CatBoostRegressor, name: str, folder: str = 'data/models/'
 def load_model(path: str) -> CatBoostRegressor:
     loaded_model = CatBoostRegressor()
     return loaded_model.load_model(path)
+
+def get_model_quantiles(model: CatBoostRegressor) -> List[float]:
+    """
+    Reads the quantile(s) a model was trained for from its loss function,
+    e.g. 'Quantile:alpha=0.25' -> [0.25] and 'MultiQuantile:alpha=0.1,0.9' -> [0.1, 0.9].
+    """
+    loss_function = model.get_all_params()['loss_function']
+    if ':alpha=' not in loss_function:
+        raise ValueError(f"Model loss function '{loss_function}' is not a quantile loss.")
+
+    alphas = loss_function.split(':alpha=')[1].split(';')[0]
+    return [float(alpha) for alpha in alphas.split(',')]
@@ -1,10 +1,13 @@
+import argparse
 import pandas as pd
+import yaml
 
 from typing import Dict, List
 from pprint import pp
 from catboost import CatBoostRegressor
 from sklearn.model_selection import train_test_split
-from model.eval import eval_model
+from dataset.storage import read_dataset
+from model.eval import eval_model, eval_multi_quantile_model
 from model.save import save_model
 from predictions.features import categorical_features, all_features, target_column
 
@@ -25,6 +28,26 @@ upper_bound_best_params = {
     }
 
 
+multi_quantile_best_params = {
+        'iterations': 2000,
+        'depth': 7,
+        'learning_rate': 0.04467250853587068,
+        'l2_leaf_reg': 2.968200742527676,
+        'bagging_temperature': 0.4146706543683366,
+    }
+
+
+def quantile_loss_function(alphas: List[float]) -> str:
+    """
+    Builds the CatBoost quantile loss for the given percentiles. A single alpha
+    gives a regular 'Quantile' loss, several give one 'MultiQuantile' model
+    that predicts all of them at once.
+    """
+    if len(alphas) == 1:
+        return f'Quantile:alpha={alphas[0]}'
+    return f"MultiQuantile:alpha={','.join(str(alpha) for alpha in alphas)}"
+
+
 def train_model(
         X_train: pd.DataFrame,
         X_test: pd.DataFrame,
@@ -57,8 +80,8 @@ def train_model(
     return model
 
 def load_final_dataset(path: str, all_features: List[str], target_column: str, categorical_features: List[str]) -> pd.DataFrame:
-    print(f"Reading csv {path}...")
-    df = pd.read_csv(path, usecols=all_features + [target_column])
+    print(f"Reading parquet {path}...")
+    df = read_dataset(path, columns=all_features + [target_column], categorical_columns=categorical_features)
 
     for col in categorical_features:
         df[col] = df[col].astype('category')
@@ -80,34 +103,55 @@ def split_dataset(df: pd.DataFrame, all_features: List[str], target_column: str,
 
 
 if __name__ == '__main__':
-    path = 'data/datasets/postings_final.csv'
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--multi-quantile', action='store_true', help='Train a single MultiQuantile model on the quantiles from params.yaml.')
+    args = parser.parse_args()
+
+    path = 'data/datasets/postings_final.parquet'
     df = load_final_dataset(path, all_features, target_column, categorical_features)
     X_train, X_test, y_train, y_test = split_dataset(df, all_features, target_column)
 
-    lower_bound_alpha = 0.25
-    upper_bound_alpha = 0.75
-
-    # Train and export lower bound model
-    print("\nTraining lower model with best parameters...")
-    lower_model = CatBoostRegressor(
-        **lower_bound_best_params, 
-        loss_function=f'Quantile:alpha={lower_bound_alpha}',
-        task_type='CPU', 
-        cat_features=categorical_features)
-    lower_model.fit(X_train, y_train)
-    print(f"\n\nFinal metrics for model with alpha={lower_bound_alpha}:")
-    pp(eval_model(lower_model, X_test, y_test))
-    save_model(lower_model, name="lower_catboost")
-
-    # Train and export upper bound model
-    print("\nTraining  upper model with best parameters...")
-    upper_model = CatBoostRegressor(
-        **upper_bound_best_params, 
-        loss_function=f'Quantile:alpha={upper_bound_alpha}',
-        task_type='CPU', 
-        cat_features=categorical_features)
-    upper_model.fit(X_train, y_train)
-    print(f"\n\nFinal metrics for model with alpha={upper_bound_alpha}:")
-    pp(eval_model(upper_model, X_test, y_test))
-    save_model(upper_model, name="upper_catboost")
-    
\ No newline at end of file
+    if args.multi_quantile:
+        quantiles = params['training']['quantiles']
+
+        # Train and export a single model predicting every quantile
+        print(f"\nTraining multi-quantile model for alphas={quantiles}...")
+        multi_quantile_model = CatBoostRegressor(
+            **multi_quantile_best_params,
+            loss_function=quantile_loss_function(quantiles),
+            task_type='CPU',
+            cat_features=categorical_features)
+        multi_quantile_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alphas={quantiles}:")
+        pp(eval_multi_quantile_model(multi_quantile_model, X_test, y_test, quantiles))
+        save_model(multi_quantile_model, name="multi_quantile_catboost")
+    else:
+        lower_bound_alpha = 0.25
+        upper_bound_alpha = 0.75
+
+        # Train and export lower bound model
+        print("\nTraining lower model with best parameters...")
+        lower_model = CatBoostRegressor(
+            **lower_bound_best_params, 
+            loss_function=quantile_loss_function([lower_bound_alpha]),
+            task_type='CPU', 
+            cat_features=categorical_features)
+        lower_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alpha={lower_bound_alpha}:")
+        pp(eval_model(lower_model, X_test, y_test))
+        save_model(lower_model, name="lower_catboost")
+
+        # Train and export upper bound model
+        print("\nTraining  upper model with best parameters...")
+        upper_model = CatBoostRegressor(
+            **upper_bound_best_params, 
+            loss_function=quantile_loss_function([upper_bound_alpha]),
+            task_type='CPU', 
+            cat_features=categorical_features)
+        upper_model.fit(X_train, y_train)
+        print(f"\n\nFinal metrics for model with alpha={upper_bound_alpha}:")
+        pp(eval_model(upper_model, X_test, y_test))
+        save_model(upper_model, name="upper_catboost")
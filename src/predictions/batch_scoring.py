@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import yaml
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from catboost import CatBoostRegressor
+from openai import AsyncOpenAI
+
+from dataset.storage import DatasetWriter
+from embeddings.job_function import load_job_function_embedding_cache
+from embeddings.skills import load_skill_cache
+from feature_extraction.description_rules import extract_job_details_with_rules
+from feature_extraction.skill_matcher import get_skill_matcher
+from llm.async_batch_processor import AdaptiveConcurrencyLimiter
+from llm.extraction_cache import ExtractionCache, load_extraction_cache
+from llm.job_details import ExtractionSettings, aget_job_details, empty_job_details, is_valid_description, load_extraction_settings, needs_location_refinement
+from llm.near_duplicates import NearDuplicateIndex, assign_representatives, duplicate_job_details
+from llm.ollama_setup import get_async_client, is_async_ollama_server_running
+from model.save import get_model_quantiles, load_model
+from predictions.feature_layout import FeatureLayout, get_feature_layout
+from predictions.features import categorical_features, all_features
+from predictions.inference import build_posting_features, extraction_modes
+
+input_columns = ['title', 'company_name', 'location', 'description']
+
+
+def iter_postings(input_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if input_path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+async def extract_job_details_chunk(
+        descriptions: List[str],
+        client: AsyncOpenAI,
+        decoder_model_name: str,
+        limiter: AdaptiveConcurrencyLimiter,
+        cache: Optional[ExtractionCache] = None,
+        latency_budget_seconds: Optional[float] = None,
+        skill_cache: Optional[Dict] = None,
+        extraction_mode: str = 'llm',
+        locations: Optional[List[str]] = None,
+        extraction_settings: Optional[ExtractionSettings] = None
+        ) -> Tuple[List[Dict], List[bool]]:
+    """
+    Extracts the job details of every description concurrently. A posting whose
+    LLM call fails, or does not finish within `latency_budget_seconds` including
+    the wait for a free slot, is degraded: its details come from the rule-based
+    extraction when a `skill_cache` is given, and are empty otherwise.
+    The 'dictionary' and 'hybrid' extraction modes require a `skill_cache`.
+    Inconclusive raw `locations` are refined in the same LLM call.
+    Returns the details and the degraded flag of every posting.
+    """
+    if extraction_mode not in extraction_modes:
+        raise ValueError(f"Unknown extraction mode '{extraction_mode}', expected one of {extraction_modes}.")
+
+    skill_matcher = get_skill_matcher(skill_cache) if skill_cache is not None else None
+    if extraction_mode == 'dictionary':
+        return [extract_job_details_with_rules(description, skill_matcher) for description in descriptions], [False] * len(descriptions)
+
+    locations = locations if locations is not None else [None] * len(descriptions)
+
+    async def call_llm(index: int, description: str) -> Dict:
+        # dictionary pre-pass: the known skills are matched, so the LLM only extracts the others
+        known_skills = skill_matcher.match(description) if extraction_mode == 'hybrid' else None
+        await limiter.acquire()
+        call_start = time.perf_counter()
+        try:
+            _, job_details, _ = await aget_job_details(
+                description, index, client, decoder_model_name, cache, location=locations[index], raise_errors=True,
+                known_skills=known_skills, settings=extraction_settings
+            )
+        except BaseException:
+            # also reached when the latency budget cancels the call
+            await limiter.release(time.perf_counter() - call_start, error=True)
+            raise
+        await limiter.release(time.perf_counter() - call_start)
+        return job_details
+
+    async def extract(index: int, description: str) -> Tuple[Dict, bool]:
+        if not is_valid_description(description):
+            return empty_job_details(), False
+        try:
+            job_details = await asyncio.wait_for(call_llm(index, description), latency_budget_seconds)
+            return job_details, False
+        except Exception:
+            if skill_matcher is None:
+                return empty_job_details(), True
+            return extract_job_details_with_rules(description, skill_matcher), True
+
+    results = await asyncio.gather(*(extract(i, description) for i, description in enumerate(descriptions)))
+    return [job_details for job_details, _ in results], [degraded for _, degraded in results]
+
+
+def build_feature_batch(
+        chunk_df: pd.DataFrame,
+        job_details_list: List[Dict],
+        layout: FeatureLayout,
+        job_function_cache: Dict,
+        skill_cache: Dict
+        ) -> np.ndarray:
+    buffer = layout.new_buffer(len(chunk_df))
+    rows = zip(chunk_df['title'], chunk_df['company_name'], chunk_df['location'], job_details_list)
+    for row, (title, company_name, location, job_details) in enumerate(rows):
+        base_features, embeddings = build_posting_features(title, company_name, location, job_details, job_function_cache, skill_cache)
+        layout.write_row(buffer, row, base_features, embeddings)
+    return buffer
+
+
+def score_feature_batch(buffer: np.ndarray, layout: FeatureLayout, models: Dict[str, CatBoostRegressor]) -> Dict[str, np.ndarray]:
+    """One `predict` call per model for the whole chunk, predictions in dollars."""
+    pool = layout.to_pool(buffer)
+    predictions = {}
+    for name, model in models.items():
+        quantiles = get_model_quantiles(model)
+        prediction_log = np.asarray(model.predict(pool)).reshape(len(buffer), len(quantiles))
+        prediction_dollars = np.expm1(prediction_log)
+        if len(quantiles) == 1:
+            predictions[f"{name}_salary"] = prediction_dollars[:, 0]
+        else:
+            for i, quantile in enumerate(quantiles):
+                predictions[f"{name}_p{int(round(quantile * 100))}"] = prediction_dollars[:, i]
+    return predictions
+
+
+async def score_file(
+        input_path: str,
+        output_path: str,
+        models: Dict[str, CatBoostRegressor],
+        client: AsyncOpenAI,
+        decoder_model_name: str,
+        job_function_cache: Dict,
+        skill_cache: Dict,
+        chunk_size: int = 1000,
+        min_concurrency: int = 2,
+        max_concurrency: int = 32,
+        extraction_cache: Optional[ExtractionCache] = None,
+        extraction_mode: str = 'llm',
+        near_duplicate_index: Optional[NearDuplicateIndex] = None,
+        extraction_settings: Optional[ExtractionSettings] = None,
+        latency_budget_seconds: Optional[float] = None
+        ):
+    """
+    Streams postings from a CSV or Parquet file in chunks: LLM extraction runs
+    concurrently within a chunk, features are assembled into one batch buffer
+    and every model scores the chunk in a single call. Results are appended to
+    the output file chunk by chunk, indexed by row number in the input, and
+    only replace `output_path` once every chunk is scored. With a
+    `near_duplicate_index`, near duplicates of an earlier posting of the file
+    reuse its extraction. The 'degraded' column flags the rows scored from
+    the rule-based extraction, after an LLM call failed or did not finish
+    within `latency_budget_seconds`.
+    """
+    if extraction_mode != 'dictionary' and not await is_async_ollama_server_running(client):
+        return None
+
+    layout = get_feature_layout(all_features, categorical_features)
+    limiter = AdaptiveConcurrencyLimiter(min_concurrency=min_concurrency, max_concurrency=max_concurrency)
+    start_time = time.perf_counter()
+    # extraction of every near-duplicate representative and whether it is degraded, keyed by row number in the file
+    representative_details: Dict[int, Dict] = {}
+    representative_degraded: Dict[int, bool] = {}
+    n_reused = 0
+
+    with DatasetWriter(output_path) as writer:
+        for chunk_number, chunk_df in enumerate(iter_postings(input_path, chunk_size)):
+            missing_columns = [col for col in input_columns if col not in chunk_df.columns]
+            if missing_columns:
+                raise ValueError(f"Input file is missing columns: {missing_columns}")
+
+            chunk_df['company_name'] = chunk_df['company_name'].fillna('unknown')
+            descriptions = chunk_df['description'].tolist()
+            first_key = writer.rows_written
+
+            if near_duplicate_index is not None:
+                representatives = assign_representatives(descriptions, near_duplicate_index, first_key)
+            else:
+                representatives = [None] * len(descriptions)
+            to_extract = [i for i, representative in enumerate(representatives) if representative is None]
+
+            extracted_list, extracted_degraded = await extract_job_details_chunk(
+                [descriptions[i] for i in to_extract], client, decoder_model_name, limiter, extraction_cache,
+                latency_budget_seconds=latency_budget_seconds, skill_cache=skill_cache, extraction_mode=extraction_mode,
+                locations=[chunk_df['location'].iloc[i] for i in to_extract],
+                extraction_settings=extraction_settings
+            )
+
+            chunk_keys = [first_key + i for i in to_extract]
+            chunk_details = dict(zip(chunk_keys, extracted_list))
+            chunk_degraded = dict(zip(chunk_keys, extracted_degraded))
+            if near_duplicate_index is not None:
+                for key in chunk_keys:
+                    if key in near_duplicate_index.signatures:
+                        representative_details[key] = chunk_details[key]
+                        representative_degraded[key] = chunk_degraded[key]
+            job_details_list = [
+                chunk_details[first_key + i] if representative is None else duplicate_job_details(representative_details[representative], descriptions[i])
+                for i, representative in enumerate(representatives)
+            ]
+            degraded_list = [
+                chunk_degraded[first_key + i] if representative is None else representative_degraded[representative]
+                for i, representative in enumerate(representatives)
+            ]
+
+            # the location is a field of the posting, not of the description: a duplicate with an inconclusive
+            # location whose representative was extracted without the city and state is extracted itself
+            to_refine = [
+                i for i, representative in enumerate(representatives)
+                if representative is not None and extraction_mode != 'dictionary'
+                and 'refined_location' not in representative_details[representative]
+                and needs_location_refinement(chunk_df['location'].iloc[i])
+            ]
+            if to_refine:
+                refined_list, refined_degraded = await extract_job_details_chunk(
+                    [descriptions[i] for i in to_refine], client, decoder_model_name, limiter, extraction_cache,
+                    latency_budget_seconds=latency_budget_seconds, skill_cache=skill_cache, extraction_mode=extraction_mode,
+                    locations=[chunk_df['location'].iloc[i] for i in to_refine],
+                    extraction_settings=extraction_settings
+                )
+                for i, details, degraded in zip(to_refine, refined_list, refined_degraded):
+                    job_details_list[i] = details
+                    degraded_list[i] = degraded
+            n_reused += len(descriptions) - len(to_extract) - len(to_refine)
+
+            buffer = build_feature_batch(chunk_df, job_details_list, layout, job_function_cache, skill_cache)
+            predictions = score_feature_batch(buffer, layout, models)
+
+            output_df = chunk_df.drop(columns=['description']).assign(degraded=degraded_list, **predictions)
+            output_df.index = pd.RangeIndex(first_key, first_key + len(output_df), name='row_number')
+            writer.write(output_df)
+
+            elapsed = time.perf_counter() - start_time
+            print(f"Chunk {chunk_number + 1}: {writer.rows_written} rows scored "
+                  f"({writer.rows_written / elapsed:.2f} rows/s, concurrency {limiter.concurrency}, "
+                  f"{n_reused} near-duplicate extractions reused).")
+
+    print(f"Scoring complete. Predictions saved to '{output_path}'.")
+
+
+if __name__ == '__main__':
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of job postings.")
+    parser.add_argument('--input-path', type=str, required=True)
+    parser.add_argument('--output-path', type=str, required=True)
+    parser.add_argument('--model', type=str, action='append', required=True, help="Model to score with, as name=path. Can be repeated.")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--extraction-mode', type=str, choices=extraction_modes, default=params['serving']['extraction_mode'])
+    parser.add_argument('--no-dedup', action='store_true', help="Extract every posting, even near duplicates of an earlier one.")
+    parser.add_argument('--latency-budget-seconds', type=float, default=None,
+                        help="Time allowed for the LLM extraction of a posting before falling back to rules, unbounded by default.")
+    args = parser.parse_args()
+
+    models = {}
+    for model_arg in args.model:
+        name, path = model_arg.split('=', 1)
+        models[name] = load_model(path)
+
+    asyncio.run(score_file(
+        input_path=args.input_path,
+        output_path=args.output_path,
+        models=models,
+        client=get_async_client(),
+        decoder_model_name=params['models']['decoder_model_name'],
+        job_function_cache=load_job_function_embedding_cache(params['embedding_paths']['job_function_cache']),
+        skill_cache=load_skill_cache(params['embedding_paths']['skill_cache']),
+        chunk_size=args.chunk_size,
+        min_concurrency=params['llm_processing']['min_concurrency'],
+        max_concurrency=params['llm_processing']['max_concurrency'],
+        extraction_cache=load_extraction_cache(params),
+        extraction_mode=args.extraction_mode,
+        near_duplicate_index=None if args.no_dedup or not params['near_duplicates']['enabled'] else NearDuplicateIndex(
+            threshold=params['near_duplicates']['threshold'],
+            num_perm=params['near_duplicates']['num_perm'],
+            shingle_size=params['near_duplicates']['shingle_size']
+        ),
+        extraction_settings=load_extraction_settings(params),
+        latency_budget_seconds=args.latency_budget_seconds
+    ))
@@ -0,0 +1,86 @@
+import numpy as np
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from catboost import Pool
+
+from embeddings.skills import skill_pooling_prefixes
+from embeddings.job_function import job_function_emb_prefix
+
+# every embedding a model can be trained on, the layout only keeps the ones in its feature list
+embedding_prefixes = list(skill_pooling_prefixes.values()) + [job_function_emb_prefix]
+
+
+class FeatureLayout:
+    """
+    Precompiled mapping from features to their column in the model input.
+
+    Scalar features get a fixed position and every embedding gets a block of
+    columns plus the permutation from vector index to column (feature names
+    are sorted as strings, so `emb_10` comes before `emb_2`). Rows are written
+    straight into a preallocated object buffer and scored through a CatBoost
+    `Pool`, without building a dict of exploded names or a DataFrame.
+    """
+
+    def __init__(self, all_features: List[str], categorical_features: List[str]):
+        self.all_features = list(all_features)
+        positions = {name: i for i, name in enumerate(self.all_features)}
+
+        self.categorical_indices = [positions[name] for name in categorical_features if name in positions]
+        categorical_set = set(categorical_features)
+
+        self.embedding_blocks: Dict[str, Tuple[slice, np.ndarray]] = {}
+        embedding_names = set()
+        for prefix in embedding_prefixes:
+            columns = sorted(
+                (positions[name], int(name[len(prefix):]))
+                for name in self.all_features
+                if name.startswith(prefix) and name[len(prefix):].isdigit()
+            )
+            if not columns:
+                continue
+            start, stop = columns[0][0], columns[-1][0] + 1
+            if stop - start != len(columns):
+                raise ValueError(f"Embedding features with prefix '{prefix}' are not contiguous in the feature list.")
+            # vector index to write at each column of the block
+            order = np.array([vector_index for _, vector_index in columns], dtype=np.int64)
+            self.embedding_blocks[prefix] = (slice(start, stop), order)
+            embedding_names.update(self.all_features[start:stop])
+
+        self.scalar_positions = {
+            name: (position, name in categorical_set)
+            for name, position in positions.items()
+            if name not in embedding_names
+        }
+
+    def new_buffer(self, n_rows: int = 1) -> np.ndarray:
+        return np.empty((n_rows, len(self.all_features)), dtype=object)
+
+    def write_row(self, buffer: np.ndarray, row: int, scalar_features: Dict, embeddings: Dict[str, np.ndarray]):
+        for name, (position, is_categorical) in self.scalar_positions.items():
+            value = scalar_features[name]
+            if is_categorical:
+                buffer[row, position] = str(value)
+            else:
+                buffer[row, position] = np.nan if value is None else float(value)
+
+        for prefix, (block, order) in self.embedding_blocks.items():
+            buffer[row, block] = np.asarray(embeddings[prefix], dtype=np.float32)[order]
+
+    def build_row(self, scalar_features: Dict, embeddings: Dict[str, np.ndarray]) -> np.ndarray:
+        buffer = self.new_buffer(1)
+        self.write_row(buffer, 0, scalar_features, embeddings)
+        return buffer
+
+    def to_pool(self, buffer: np.ndarray) -> Pool:
+        return Pool(buffer, cat_features=self.categorical_indices)
+
+
+@lru_cache(maxsize=8)
+def _get_feature_layout(all_features: Tuple[str, ...], categorical_features: Tuple[str, ...]) -> FeatureLayout:
+    return FeatureLayout(list(all_features), list(categorical_features))
+
+
+def get_feature_layout(all_features: List[str], categorical_features: List[str]) -> FeatureLayout:
+    """Returns the compiled layout for a feature list, built once per process."""
+    return _get_feature_layout(tuple(all_features), tuple(categorical_features))
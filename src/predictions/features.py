@@ -1,11 +1,13 @@
-import yaml
+import json
+import os
 
-from embeddings.utils import get_embedding_dimension
-from embeddings.skills import mean_skill_emb_prefix, max_skill_emb_prefix
+from typing import Dict, Sequence
+
+from embeddings.skills import skill_pooling_prefixes, validate_skill_pooling_modes
 from embeddings.job_function import job_function_emb_prefix
 
-with open('params.yaml', 'r') as f:
-    params = yaml.safe_load(f)
+feature_schema_version = 2
+feature_schema_path = 'data/embedding_cache/feature_schema.json'
 
 
 categorical_features = [
@@ -24,12 +26,6 @@ categorical_features = [
 
 numerical_features = ['experience_years_required']
 
-mean_skill_embedding_features = [f"{mean_skill_emb_prefix}{i}" for i in range(get_embedding_dimension(params['models']['encoder_model_name']))]
-max_skill_embedding_features = [f"{max_skill_emb_prefix}{i}" for i in range(get_embedding_dimension(params['models']['encoder_model_name']))]
-job_function_embedding_features = [f"{job_function_emb_prefix}{i}" for i in range(get_embedding_dimension(params['models']['encoder_model_name']))]
-
-all_features = sorted(categorical_features + numerical_features + mean_skill_embedding_features + max_skill_embedding_features + job_function_embedding_features)
-
 target_column = 'target_salary'
 
 excluded_features = [
@@ -40,10 +36,88 @@ excluded_features = [
     'title',
     'description',
     'location',
-    'skills', 
-    'education_level', 
+    'skills',
+    'education_level',
     'normalized_salary',
-    'soft_skills', 
-    'domain_skills', 
+    'soft_skills',
+    'domain_skills',
     'technical_skills'
     ]
+
+
+def build_feature_schema(encoder_model_name: str, embedding_dimension: int, skill_pooling_modes: Sequence[str] = ('mean', 'max')) -> Dict:
+    """
+    Feature schema of the model: a block of skill embedding features per
+    skill pooling mode of `build_features`, and the job function embedding.
+    """
+    validate_skill_pooling_modes(skill_pooling_modes, check_idf=False)
+    skill_embedding_features = {
+        mode: [f"{skill_pooling_prefixes[mode]}{i}" for i in range(embedding_dimension)] for mode in skill_pooling_modes
+    }
+    job_function_embedding_features = [f"{job_function_emb_prefix}{i}" for i in range(embedding_dimension)]
+    embedding_features = [feature for features in skill_embedding_features.values() for feature in features] + job_function_embedding_features
+
+    return {
+        'version': feature_schema_version,
+        'encoder_model_name': encoder_model_name,
+        'embedding_dimension': embedding_dimension,
+        'categorical_features': categorical_features,
+        'numerical_features': numerical_features,
+        'skill_pooling_modes': list(skill_pooling_modes),
+        'skill_embedding_features': skill_embedding_features,
+        'job_function_embedding_features': job_function_embedding_features,
+        'all_features': sorted(categorical_features + numerical_features + embedding_features),
+    }
+
+
+def save_feature_schema(schema: Dict, path: str = feature_schema_path):
+    with open(path, 'w') as f:
+        json.dump(schema, f, indent=2)
+    print(f"Feature schema saved to '{path}'")
+
+
+def load_feature_schema(path: str = feature_schema_path) -> Dict:
+    """
+    Loads the feature schema written when the embedding caches were built.
+    Without a manifest, falls back to loading the encoder to read its dimension,
+    which is slow as it imports torch and the model weights.
+    """
+    if not os.path.exists(path):
+        import yaml
+        from embeddings.utils import get_embedding_dimension
+
+        print(f"Feature schema not found at '{path}', loading the encoder to infer it.")
+        with open('params.yaml', 'r') as f:
+            params = yaml.safe_load(f)
+        encoder_model_name = params['models']['encoder_model_name']
+        return build_feature_schema(encoder_model_name, get_embedding_dimension(encoder_model_name), params['build_features']['skill_pooling_modes'])
+
+    with open(path, 'r') as f:
+        schema = json.load(f)
+
+    if schema.get('version') != feature_schema_version:
+        raise ValueError(f"Feature schema at '{path}' has version {schema.get('version')}, expected {feature_schema_version}. Please rebuild the embedding caches.")
+    if schema['categorical_features'] != categorical_features or schema['numerical_features'] != numerical_features:
+        raise ValueError(f"Feature schema at '{path}' is out of date with the feature definitions. Please rebuild the embedding caches.")
+
+    return schema
+
+
+# Embedding-dependent feature lists are resolved on first access, so importing
+# this module does not read any file or load the encoder.
+_schema_attributes = {
+    'all_features',
+    'skill_pooling_modes',
+    'skill_embedding_features',
+    'job_function_embedding_features',
+}
+_feature_schema = None
+
+
+def __getattr__(name: str):
+    global _feature_schema
+    if name in _schema_attributes:
+        if _feature_schema is None:
+            _feature_schema = load_feature_schema()
+        return _feature_schema[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
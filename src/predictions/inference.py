@@ -1,85 +1,260 @@
+import threading
+import time
 import numpy as np
 import pandas as pd
 
-from typing import Dict, List
-from catboost import CatBoostRegressor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Sequence, Tuple
+from catboost import CatBoostRegressor, Pool
 from openai import OpenAI
 
 from embeddings.job_function import compute_job_function_embedding
-from embeddings.skills import compute_aggregated_skill_embeddings
+from embeddings.skills import compute_aggregated_skill_embeddings, get_skill_idf, skill_pooling_prefixes
 from feature_cleaning.education_level import clean_and_categorize_education
-from feature_cleaning.location import clean_and_standardize_location
+from feature_cleaning.location import clean_and_standardize_location, location_normalizer
 from feature_cleaning.skills import clean_skill_list
+from feature_extraction.description_rules import extract_job_details_with_rules
+from feature_extraction.interactions import build_interaction_features
 from feature_extraction.job_function import extract_job_function_from_title
 from feature_extraction.seniority import extract_seniority_from_title
-from llm.job_details import get_job_details
-from embeddings.skills import mean_skill_emb_prefix, max_skill_emb_prefix
+from feature_extraction.skill_matcher import get_skill_matcher
+from llm.extraction_cache import ExtractionCache
+from llm.job_details import ExtractionSettings, get_job_details
 from embeddings.job_function import job_function_emb_prefix
-from llm.ollama_setup import is_ollama_server_running
-from predictions.features import all_features
+from llm.ollama_setup import get_health_monitor
+from model.save import get_model_quantiles
+from predictions import features
+from predictions.feature_layout import get_feature_layout
 
+# LLM calls that overrun the latency budget keep running here, so their result
+# still lands in the extraction cache for the next request with the same posting.
+# Calls still queued when their budget runs out are cancelled, and at most
+# `llm_max_pending` calls wait for a worker: past that, requests degrade at once
+# rather than queueing behind calls that would overrun their budget anyway.
+llm_max_workers = 8
+llm_max_pending = 16
+llm_executor = ThreadPoolExecutor(max_workers=llm_max_workers, thread_name_prefix='llm-extraction')
+llm_slots = threading.BoundedSemaphore(llm_max_workers + llm_max_pending)
 
+# 'llm' extracts the job details with the LLM, 'dictionary' with the rule-based
+# extraction only, and 'hybrid' matches the known skills first and only asks
+# the LLM for the other ones
+extraction_modes = ['llm', 'dictionary', 'hybrid']
 
-def compute_features(
+
+def build_posting_features(
         title: str,
         company_name: str,
         location: str,
-        description: str,
-        client: OpenAI,
-        decoder_model_name: str,
+        job_details: Dict,
         job_function_cache: Dict,
         skill_cache: Dict,
-        ) -> Dict:
-    if not is_ollama_server_running(client):
-        raise Exception("LLM client is not running.")
-
-    cleaned_location = clean_and_standardize_location(location)
+        skill_pooling_modes: Optional[Sequence[str]] = None,
+        ) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Computes the scalar features of a posting from its already extracted job
+    details, and its embedding vectors keyed by embedding feature prefix.
+    The skill embeddings are pooled with `skill_pooling_modes`, by default
+    the ones of the feature schema the model was trained with.
+    """
+    # an inconclusive location is replaced by the one the LLM found in the description, if any
+    cleaned_location = location_normalizer.refine(clean_and_standardize_location(location), job_details.get('refined_location'))
     seniority = extract_seniority_from_title(title)
     job_function = extract_job_function_from_title(title)
 
-    _, job_details = get_job_details(description, 0, client, decoder_model_name)
-
     categorized_education_level = clean_and_categorize_education(job_details['education_level'])
     experience_years_required = job_details['experience_years_required']
     cleaned_skills = clean_skill_list(job_details['technical_skills'] + job_details['soft_skills'] + job_details['domain_skills'])
 
     # embeddings
-    mean_skill_emb, max_skill_emb = compute_aggregated_skill_embeddings(cleaned_skills, skill_cache)
+    if skill_pooling_modes is None:
+        skill_pooling_modes = features.skill_pooling_modes
+    skill_embeddings = compute_aggregated_skill_embeddings(cleaned_skills, skill_cache, skill_pooling_modes, get_skill_idf(skill_cache))
     job_function_embedding = compute_job_function_embedding(job_function, job_function_cache)
 
-    # explode embeddings
-    mean_skill_emb_exploded = {f"{mean_skill_emb_prefix}{k}": v for k, v in enumerate(mean_skill_emb)}
-    max_skill_emb_exploded = {f"{max_skill_emb_prefix}{k}": v for k, v in enumerate(max_skill_emb)}
-    job_function_embedding_exploded = {f"{job_function_emb_prefix}{k}": v for k, v in enumerate(job_function_embedding)}
-
-    # interaction features
-    seniority_job_function = f"{seniority}_{job_function}"
-    location_job_function = f"{cleaned_location}_{job_function}"
-    seniority_function_location = f"{seniority}_{cleaned_location}"
-    company_experience = f"{company_name}_{experience_years_required}"
-    job_function_experience = f"{job_function}_{experience_years_required}"
-    seniority_function_experience = f"{seniority}_{job_function}_{experience_years_required}"
-
-    base_features =  {
+    base_features = {
         'categorized_education_level': categorized_education_level,
         'seniority': seniority,
         'job_function': job_function,
         'cleaned_location': cleaned_location,
         'company_name': company_name,
-        'seniority_job_function': seniority_job_function,
-        'location_job_function': location_job_function,
-        'seniority_function_location': seniority_function_location,
-        'company_experience': company_experience,
-        'job_function_experience': job_function_experience,
-        'seniority_function_experience': seniority_function_experience,
         'experience_years_required': experience_years_required,
     }
+    # interaction features, from the same spec as the training set
+    base_features.update(build_interaction_features(base_features))
+
+    embeddings = {skill_pooling_prefixes[mode]: embedding for mode, embedding in skill_embeddings.items()}
+    embeddings[job_function_emb_prefix] = job_function_embedding
+
+    return base_features, embeddings
+
+
+def extract_job_details_within_budget(
+        description: str,
+        client: OpenAI,
+        decoder_model_name: str,
+        skill_cache: Dict,
+        latency_budget_seconds: float,
+        extraction_cache: Optional[ExtractionCache] = None,
+        location: Optional[str] = None,
+        known_skills: Optional[List[str]] = None,
+        extraction_settings: Optional[ExtractionSettings] = None,
+        ) -> Tuple[Dict, bool]:
+    """
+    Extracts the job details with the LLM, and falls back to the rule-based
+    extraction when the server is down, the call fails or it does not answer
+    within `latency_budget_seconds`, and right away when `llm_max_pending`
+    calls already wait for a worker. Also returns whether the fallback was used.
+    """
+    start_time = time.perf_counter()
+
+    healthy = get_health_monitor(client).is_healthy()
+    if healthy and not llm_slots.acquire(blocking=False):
+        print("LLM extraction queue is full, using rule-based extraction.")
+    elif healthy:
+        try:
+            future = llm_executor.submit(
+                get_job_details, description, 0, client, decoder_model_name, extraction_cache,
+                location=location, raise_errors=True, known_skills=known_skills, settings=extraction_settings
+            )
+        except BaseException:
+            llm_slots.release()
+            raise
+        # the slot is freed when the call finishes or is cancelled
+        future.add_done_callback(lambda _: llm_slots.release())
+
+        remaining_seconds = max(0.0, latency_budget_seconds - (time.perf_counter() - start_time))
+        try:
+            _, job_details = future.result(timeout=remaining_seconds)
+            return job_details, False
+        except FutureTimeoutError:
+            # only drops the call if no worker picked it up yet
+            future.cancel()
+            print(f"LLM extraction exceeded the {latency_budget_seconds}s latency budget, using rule-based extraction.")
+        except Exception as e:
+            print(f"LLM extraction failed ({e}), using rule-based extraction.")
+
+    return extract_job_details_with_rules(description, get_skill_matcher(skill_cache)), True
+
+
+def compute_raw_features(
+        title: str,
+        company_name: str,
+        location: str,
+        description: str,
+        client: OpenAI,
+        decoder_model_name: str,
+        job_function_cache: Dict,
+        skill_cache: Dict,
+        extraction_cache: Optional[ExtractionCache] = None,
+        latency_budget_seconds: Optional[float] = None,
+        extraction_mode: str = 'llm',
+        extraction_settings: Optional[ExtractionSettings] = None,
+        ) -> Tuple[Dict, Dict[str, np.ndarray], bool]:
+    """
+    Computes the scalar features of a posting and its embedding vectors,
+    keyed by embedding feature prefix, without exploding them into columns.
+
+    With a `latency_budget_seconds`, the LLM-derived fields come from the
+    rule-based extraction when the LLM cannot answer in time, and the returned
+    flag tells whether the features are degraded. See `extraction_modes` for
+    the available `extraction_mode`s.
+    """
+    if extraction_mode not in extraction_modes:
+        raise ValueError(f"Unknown extraction mode '{extraction_mode}', expected one of {extraction_modes}.")
+
+    degraded = False
+    # dictionary pre-pass: the known skills are matched, so the LLM only extracts the others
+    known_skills = get_skill_matcher(skill_cache).match(description) if extraction_mode == 'hybrid' else None
+    if extraction_mode == 'dictionary':
+        job_details = extract_job_details_with_rules(description, get_skill_matcher(skill_cache))
+    elif latency_budget_seconds is None:
+        if not get_health_monitor(client).is_healthy():
+            raise Exception("LLM client is not running.")
+        _, job_details = get_job_details(
+            description, 0, client, decoder_model_name, extraction_cache, location=location, known_skills=known_skills, settings=extraction_settings
+        )
+    else:
+        job_details, degraded = extract_job_details_within_budget(
+            description, client, decoder_model_name, skill_cache, latency_budget_seconds, extraction_cache, location, known_skills, extraction_settings
+        )
+
+    base_features, embeddings = build_posting_features(title, company_name, location, job_details, job_function_cache, skill_cache)
+    return base_features, embeddings, degraded
+
+
+def compute_features(
+        title: str,
+        company_name: str,
+        location: str,
+        description: str,
+        client: OpenAI,
+        decoder_model_name: str,
+        job_function_cache: Dict,
+        skill_cache: Dict,
+        extraction_cache: Optional[ExtractionCache] = None,
+        extraction_mode: str = 'llm',
+        extraction_settings: Optional[ExtractionSettings] = None,
+        ) -> Dict:
+    base_features, embeddings, _ = compute_raw_features(
+        title, company_name, location, description, client, decoder_model_name, job_function_cache, skill_cache, extraction_cache,
+        extraction_mode=extraction_mode, extraction_settings=extraction_settings
+    )
 
-    merged_features = base_features | mean_skill_emb_exploded | max_skill_emb_exploded | job_function_embedding_exploded
+    # explode embeddings
+    embeddings_exploded = {f"{prefix}{k}": v for prefix, embedding in embeddings.items() for k, v in enumerate(embedding)}
+
+    merged_features = base_features | embeddings_exploded
 
-    assert sorted(merged_features.keys()) == sorted(all_features)
+    assert sorted(merged_features.keys()) == sorted(features.all_features)
     return dict(sorted(merged_features.items()))
 
+
+def compute_feature_pool(
+        title: str,
+        company_name: str,
+        location: str,
+        description: str,
+        client: OpenAI,
+        decoder_model_name: str,
+        all_features: List[str],
+        categorical_features: List[str],
+        job_function_cache: Dict,
+        skill_cache: Dict,
+        extraction_cache: Optional[ExtractionCache] = None,
+        latency_budget_seconds: Optional[float] = None,
+        extraction_mode: str = 'llm',
+        extraction_settings: Optional[ExtractionSettings] = None,
+        ) -> Tuple[Pool, bool]:
+    """
+    Computes the features of a posting and writes them straight into a
+    model-ready CatBoost Pool through the precompiled feature layout.
+    Also returns whether the features are degraded (see `compute_raw_features`).
+    """
+    base_features, embeddings, degraded = compute_raw_features(
+        title, company_name, location, description, client, decoder_model_name, job_function_cache, skill_cache, extraction_cache,
+        latency_budget_seconds, extraction_mode, extraction_settings
+    )
+
+    layout = get_feature_layout(all_features, categorical_features)
+    return layout.to_pool(layout.build_row(base_features, embeddings)), degraded
+
+def build_inference_df(
+    feature_dict: Dict,
+    all_features: List[str],
+    categorical_features: List[str]
+) -> pd.DataFrame:
+    inference_df = pd.DataFrame([feature_dict])
+
+    inference_df = inference_df.reindex(columns=all_features)
+
+    for col in categorical_features:
+        if col in inference_df.columns:
+            inference_df[col] = inference_df[col].astype('category')
+
+    return inference_df
+
+
 def predict_salary(
     title: str, company_name: str, location: str, description: str,
     model: CatBoostRegressor,
@@ -88,18 +263,80 @@ def predict_salary(
     all_features: List[str],
     categorical_features: List[str],
     job_function_cache: Dict,
-    skill_cache: Dict
+    skill_cache: Dict,
+    extraction_cache: Optional[ExtractionCache] = None,
+    extraction_settings: Optional[ExtractionSettings] = None
 ) -> float:
-    feature_dict = compute_features(title, company_name, location, description, client, decoder_model_name, job_function_cache, skill_cache)
-    inference_df = pd.DataFrame([feature_dict])
+    inference_pool, _ = compute_feature_pool(
+        title, company_name, location, description, client, decoder_model_name, all_features, categorical_features, job_function_cache, skill_cache,
+        extraction_cache, extraction_settings=extraction_settings
+    )
 
-    inference_df = inference_df.reindex(columns=all_features)
+    prediction_log = model.predict(inference_pool)
+    prediction_dollars = np.expm1(prediction_log)
 
-    for col in categorical_features:
-        if col in inference_df.columns:
-            inference_df[col] = inference_df[col].astype('category')
+    return prediction_dollars[0]
+
+
+def predict_salary_range(
+    title: str, company_name: str, location: str, description: str,
+    models: Dict[str, CatBoostRegressor],
+    client: OpenAI,
+    decoder_model_name: str,
+    all_features: List[str],
+    categorical_features: List[str],
+    job_function_cache: Dict,
+    skill_cache: Dict,
+    extraction_cache: Optional[ExtractionCache] = None,
+    latency_budget_seconds: Optional[float] = None,
+    extraction_mode: str = 'llm',
+    extraction_settings: Optional[ExtractionSettings] = None
+) -> Tuple[Dict[str, float], bool]:
+    """
+    Computes the features of a posting once and scores them with every model.
+    `models` maps a bound name (e.g. 'lower', 'upper') to its quantile model,
+    and the predictions are returned in dollars under the same names, along
+    with whether they were made from degraded features.
+    """
+    inference_pool, degraded = compute_feature_pool(
+        title, company_name, location, description, client, decoder_model_name, all_features, categorical_features, job_function_cache, skill_cache,
+        extraction_cache, latency_budget_seconds, extraction_mode, extraction_settings
+    )
 
-    prediction_log = model.predict(inference_df)
+    predictions = {}
+    for name, model in models.items():
+        prediction_log = model.predict(inference_pool)
+        predictions[name] = np.expm1(prediction_log)[0]
+
+    return predictions, degraded
+
+
+def predict_salary_quantiles(
+    title: str, company_name: str, location: str, description: str,
+    model: CatBoostRegressor,
+    client: OpenAI,
+    decoder_model_name: str,
+    all_features: List[str],
+    categorical_features: List[str],
+    job_function_cache: Dict,
+    skill_cache: Dict,
+    extraction_cache: Optional[ExtractionCache] = None,
+    latency_budget_seconds: Optional[float] = None,
+    extraction_mode: str = 'llm',
+    extraction_settings: Optional[ExtractionSettings] = None
+) -> Tuple[Dict[float, float], bool]:
+    """
+    Scores a posting with a single (Multi)Quantile model and returns the
+    predicted salary in dollars for every quantile the model was trained on,
+    along with whether it was made from degraded features.
+    """
+    inference_pool, degraded = compute_feature_pool(
+        title, company_name, location, description, client, decoder_model_name, all_features, categorical_features, job_function_cache, skill_cache,
+        extraction_cache, latency_budget_seconds, extraction_mode, extraction_settings
+    )
+
+    quantiles = get_model_quantiles(model)
+    prediction_log = np.asarray(model.predict(inference_pool)).reshape(-1, len(quantiles))[0]
     prediction_dollars = np.expm1(prediction_log)
 
-    return prediction_dollars[0]
+    return dict(zip(quantiles, prediction_dollars)), degraded
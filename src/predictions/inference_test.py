@@ -4,7 +4,7 @@ from embeddings.skills import load_skill_cache
 
 from model.save import load_model
 from llm.ollama_setup import get_client
-from predictions.inference import predict_salary
+from predictions.inference import predict_salary_range
 from predictions.features import categorical_features, all_features
 
 
@@ -28,10 +28,10 @@ new_job = {
 
 print(f"Predicting salary for: {new_job['title']}")
 
-# Predict the lower bound
-lower_salary = predict_salary(
+# Predict both bounds from a single feature extraction
+salary_range, _ = predict_salary_range(
     **new_job,
-    model=final_lower_model,
+    models={'lower': final_lower_model, 'upper': final_upper_model},
     client=get_client(),
     decoder_model_name='phi3:mini', 
     all_features=all_features,
@@ -39,18 +39,7 @@ lower_salary = predict_salary(
     job_function_cache=job_function_cache,
     skill_cache=skill_cache
 )
-
-# Predict the upper bound
-upper_salary = predict_salary(
-    **new_job,
-    model=final_upper_model,
-    client=get_client(),
-    decoder_model_name='phi3:mini',
-    all_features=all_features,
-    categorical_features=categorical_features,
-    job_function_cache=job_function_cache,
-    skill_cache=skill_cache
-)
+lower_salary, upper_salary = salary_range['lower'], salary_range['upper']
 
 print("\n--- PREDICTION RESULT ---")
 print(f"Predicted Salary Range: ${lower_salary:,.0f} - ${upper_salary:,.0f}")
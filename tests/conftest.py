@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the pipeline modules import each other from src, e.g. `from llm.job_details import ...`
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
@@ -0,0 +1,35 @@
+from llm.description_preprocessing import DescriptionPreprocessor, learn_boilerplate_segments, segment_fingerprint
+
+requirements = "Requirements: Bachelor degree in Computer Science and 5+ years of experience with Python and SQL."
+benefits = "Acme offers a generous package with health insurance, a pension plan and free lunches every day."
+
+
+def acme_posting(i: int) -> str:
+    return f"Acme is hiring a data engineer for its team number {i}.\n{requirements}\n{benefits}"
+
+
+def test_shared_requirements_are_not_learned_as_boilerplate():
+    postings = [acme_posting(i) for i in range(25)]
+
+    fingerprints = learn_boilerplate_segments(postings, min_document_frequency=20, min_segment_chars=60)
+
+    assert segment_fingerprint(benefits) in fingerprints
+    assert segment_fingerprint(requirements) not in fingerprints
+
+    text, tokens_saved = DescriptionPreprocessor(set(fingerprints)).preprocess(postings[0])
+    assert text == f"Acme is hiring a data engineer for its team number 0.\n{requirements}"
+    assert tokens_saved > 0
+
+
+def test_requirements_are_kept_with_an_older_boilerplate_file():
+    preprocessor = DescriptionPreprocessor({segment_fingerprint(requirements), segment_fingerprint(benefits)})
+
+    text, _ = preprocessor.preprocess(acme_posting(0))
+
+    assert requirements in text
+    assert benefits not in text
+
+
+def test_segments_repeated_within_a_description_are_dropped():
+    text, _ = DescriptionPreprocessor(set()).preprocess(f"{requirements}\n{requirements.upper()}")
+    assert text == requirements
@@ -0,0 +1,49 @@
+import pytest
+
+from feature_extraction.description_rules import extract_confident_job_details, extract_experience_years, find_experience_years
+
+
+@pytest.mark.parametrize('description, years', [
+    ("5+ years of experience", 5),
+    ("3-5 years of relevant professional experience", 3),
+    ("3 to 5 years of experience", 3),
+    ("two years' experience", 2),
+    ("5 yrs exp", 5),
+    ("Minimum of 5 years experience in data engineering.", 5),
+    ("5 years of hands-on software engineering experience", 5),
+    ("Requires 10+ years of progressive leadership experience", 10),
+    ("Experience: 5+ years", 5),
+    ("Experience required: 2 years", 2),
+    ("experience of at least 3 years", 3),
+    ("We are looking for someone with 4 years of experience in Python.", 4),
+])
+def test_requirement_phrasing(description, years):
+    assert find_experience_years(description) == [years]
+
+
+@pytest.mark.parametrize('description', [
+    # ages are not experience, and no pattern reads across a sentence or line break
+    "Applicants must be 18 years of age. Experience with Excel preferred.",
+    "Experience with Excel, must be 21 years old",
+    "At least 7 years in marketing.\nExperience with SEO",
+    "5 years\nexperience with sales",
+    "Founded 20 years ago. Experience with sales a plus.",
+    # the experience of the company, not a requirement
+    "We have 25 years of industry experience serving clients.",
+    "Our team brings 30 years of combined experience to every project.",
+])
+def test_false_positives_are_not_parsed(description):
+    assert find_experience_years(description) == []
+    assert extract_experience_years(description) == -1
+    assert 'experience_years_required' not in extract_confident_job_details(description)
+
+
+def test_company_statement_next_to_a_requirement():
+    description = "Our team has 30 years of experience. You need 3+ years of experience with SQL."
+    assert extract_confident_job_details(description) == {'experience_years_required': 3}
+
+
+def test_conflicting_mentions_are_left_to_the_llm():
+    description = "2+ years of experience with Python. 5 years of experience in finance preferred."
+    assert extract_experience_years(description) == 5
+    assert 'experience_years_required' not in extract_confident_job_details(description)
@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import sqlite3
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from llm import extraction_cache
+from llm.extraction_cache import ExtractionCache, load_extraction_cache
+from llm.job_details import ExtractionSettings, JobDetails, aget_job_details, get_job_details, get_response_model, job_details_schema_version
+from tests.test_structured_output import stub_handler, valid_reply
+
+description = "Data engineer building batch pipelines in Python and SQL for the analytics team."
+settings = ExtractionSettings(structured_output='format')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / 'cache.sqlite'), max_entries=2, eviction_interval=1)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing access times, so the least recently used entry is never a tie."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(extraction_cache.time, 'time', lambda: float(next(ticks)))
+
+
+def test_hits_and_misses_are_counted(cache):
+    key = ExtractionCache.make_key(description, 'stub-model', job_details_schema_version())
+    assert cache.get(key) is None
+
+    cache.set(key, valid_reply)
+
+    assert cache.get(key) == valid_reply
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_keys_change_with_the_model_and_schema():
+    keys = {
+        ExtractionCache.make_key(description, 'stub-model', job_details_schema_version(JobDetails)),
+        ExtractionCache.make_key(description, 'other-model', job_details_schema_version(JobDetails)),
+        ExtractionCache.make_key(description, 'stub-model', job_details_schema_version(get_response_model(frozenset(), True))),
+        ExtractionCache.make_key(description + " Remote.", 'stub-model', job_details_schema_version(JobDetails)),
+    }
+    assert len(keys) == 4
+
+
+def test_entries_of_another_schema_version_are_missed(cache):
+    cache.set(ExtractionCache.make_key(description, 'stub-model', job_details_schema_version(JobDetails)), valid_reply)
+
+    location_model = get_response_model(frozenset(), True)
+    assert cache.get(ExtractionCache.make_key(description, 'stub-model', job_details_schema_version(location_model))) is None
+
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    cache.set('a', {'value': 'a'})
+    cache.set('b', {'value': 'b'})
+    # reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == {'value': 'a'}
+
+    cache.set('c', {'value': 'c'})
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 'a'}
+    assert cache.get('c') == {'value': 'c'}
+
+
+def test_eviction_is_checked_every_interval(tmp_path, clock):
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite'), max_entries=2, eviction_interval=3)
+    for key in 'abcd':
+        cache.set(key, {'value': key})
+    # the bound was only enforced on the third insert
+    assert len(cache) == 3
+
+    for key in 'ef':
+        cache.set(key, {'value': key})
+    assert len(cache) == 2
+    assert cache.get('f') == {'value': 'f'}
+
+
+def test_cache_is_disabled_by_default(tmp_path):
+    assert load_extraction_cache({}) is None
+
+    cache = load_extraction_cache({'llm_cache': {'enabled': True, 'path': str(tmp_path / 'cache.sqlite'), 'max_entries': 10}})
+    assert cache.max_entries == 10
+
+
+class LockedCache(ExtractionCache):
+    """Cache whose database stays locked, as when another writer holds it past the timeout."""
+
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    def set(self, key, value):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def extract(cache, use_async: bool):
+    handler, requests = stub_handler([valid_reply])
+    if use_async:
+        async def run():
+            client = AsyncOpenAI(base_url='http://stub/v1', api_key='stub', max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            return await aget_job_details(description, 7, client, 'stub-model', cache, pre_extraction=False, settings=settings, refine_location=False)
+        return asyncio.run(run())[:2], requests
+
+    client = OpenAI(base_url='http://stub/v1', api_key='stub', max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    return get_job_details(description, 7, client, 'stub-model', cache, pre_extraction=False, settings=settings, refine_location=False), requests
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_extractions_are_served_from_the_cache(cache, use_async):
+    (_, first), requests = extract(cache, use_async)
+    assert len(requests) == 1
+
+    (_, second), requests = extract(cache, use_async)
+    assert requests == []
+    assert second == first
+    assert second['technical_skills'] == ['Python', 'SQL']
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_a_failing_cache_does_not_fail_the_extraction(tmp_path, use_async):
+    cache = LockedCache(str(tmp_path / 'cache.sqlite'))
+
+    (index, job_details), requests = extract(cache, use_async)
+
+    assert index == 7
+    assert len(requests) == 1
+    assert job_details['technical_skills'] == ['Python', 'SQL']
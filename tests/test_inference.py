@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from llm import job_details as job_details_module
+from llm.job_details import get_job_details
+from predictions import inference
+
+description = "We need a data engineer with Python and SQL. Bachelor's degree required. 3+ years of experience in data engineering."
+skill_cache = {'python': np.ones(4, dtype=np.float32), 'sql': np.ones(4, dtype=np.float32)}
+llm_details = {
+    'technical_skills': ['Airflow'],
+    'soft_skills': [],
+    'domain_skills': [],
+    'skills': ['Airflow'],
+    'experience_years_required': 3,
+    # a successful extraction can still find no education level
+    'education_level': None,
+}
+
+
+class StubHealthMonitor:
+    def __init__(self, healthy: bool):
+        self.healthy = healthy
+
+    def is_healthy(self) -> bool:
+        return self.healthy
+
+
+@pytest.fixture
+def healthy_llm(monkeypatch):
+    monkeypatch.setattr(inference, 'get_health_monitor', lambda client: StubHealthMonitor(True))
+
+
+def extract(latency_budget_seconds: float = 1.0):
+    return inference.extract_job_details_within_budget(description, None, 'stub-model', skill_cache, latency_budget_seconds)
+
+
+def test_successful_extraction_without_education_is_not_degraded(healthy_llm, monkeypatch):
+    monkeypatch.setattr(inference, 'get_job_details', lambda *args, **kwargs: (0, dict(llm_details)))
+
+    job_details, degraded = extract()
+
+    assert not degraded
+    assert job_details == llm_details
+
+
+def test_failed_extraction_falls_back_to_rules(healthy_llm, monkeypatch):
+    def failing_get_job_details(*args, **kwargs):
+        assert kwargs['raise_errors']
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(inference, 'get_job_details', failing_get_job_details)
+
+    job_details, degraded = extract()
+
+    assert degraded
+    assert sorted(job_details['skills']) == ['python', 'sql']
+    assert job_details['experience_years_required'] == 3
+
+
+def test_extraction_over_budget_falls_back_to_rules(healthy_llm, monkeypatch):
+    release = threading.Event()
+
+    def slow_get_job_details(*args, **kwargs):
+        release.wait(5)
+        return 0, dict(llm_details)
+
+    monkeypatch.setattr(inference, 'get_job_details', slow_get_job_details)
+    try:
+        job_details, degraded = extract(latency_budget_seconds=0.05)
+    finally:
+        release.set()
+
+    assert degraded
+    assert sorted(job_details['skills']) == ['python', 'sql']
+
+
+def test_full_queue_falls_back_without_calling_the_llm(healthy_llm, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(inference, 'llm_slots', slots)
+    monkeypatch.setattr(inference, 'get_job_details', lambda *args, **kwargs: pytest.fail("the LLM must not be called"))
+
+    _, degraded = extract()
+
+    assert degraded
+
+
+def test_queued_extraction_over_budget_is_cancelled(healthy_llm, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_get_job_details(*args, **kwargs):
+        calls.append(args[0])
+        release.wait(5)
+        return 0, dict(llm_details)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    slots = threading.BoundedSemaphore(2)
+    monkeypatch.setattr(inference, 'llm_executor', executor)
+    monkeypatch.setattr(inference, 'llm_slots', slots)
+    monkeypatch.setattr(inference, 'get_job_details', slow_get_job_details)
+    try:
+        # the first call holds the only worker, the second one waits behind it
+        assert extract(latency_budget_seconds=0.05)[1]
+        assert extract(latency_budget_seconds=0.05)[1]
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+    assert calls == [description]
+    # both slots were given back, by the finished call and the cancelled one
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+
+
+def test_unhealthy_server_falls_back_without_calling_the_llm(monkeypatch):
+    monkeypatch.setattr(inference, 'get_health_monitor', lambda client: StubHealthMonitor(False))
+    monkeypatch.setattr(inference, 'get_job_details', lambda *args, **kwargs: pytest.fail("the LLM must not be called"))
+
+    _, degraded = extract()
+
+    assert degraded
+
+
+def test_get_job_details_reports_failures(monkeypatch):
+    def failing_generate_job_details(*args, **kwargs):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(job_details_module, 'generate_job_details', failing_generate_job_details)
+
+    _, empty_details = get_job_details(description, 0, None, 'stub-model', pre_extraction=False)
+    assert empty_details == job_details_module.empty_job_details()
+
+    with pytest.raises(ConnectionError):
+        get_job_details(description, 0, None, 'stub-model', pre_extraction=False, raise_errors=True)
+    with pytest.raises(ValueError):
+        get_job_details("too short", 0, None, 'stub-model', raise_errors=True)
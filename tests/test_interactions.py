@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_extraction.interactions import (
+    build_interaction_columns,
+    build_interaction_features,
+    interaction_source_columns,
+    interaction_token,
+    missing_interaction_token,
+)
+
+
+@pytest.mark.parametrize('value', [None, float('nan'), np.nan, np.float32('nan'), np.float64('nan'), pd.NA, pd.NaT])
+def test_missing_values_give_the_missing_token(value):
+    assert interaction_token(value) == missing_interaction_token
+
+
+@pytest.mark.parametrize('value, token', [(5, '5'), (5.0, '5'), (np.float32(5.0), '5'), (np.int64(5), '5'), (2.5, '2.5'), ('senior', 'senior')])
+def test_tokens(value, token):
+    assert interaction_token(value) == token
+
+
+def test_serving_and_training_features_agree():
+    rows = [
+        {'seniority': 'senior', 'job_function': 'data', 'cleaned_location': 'Paris', 'company_name': 'Acme', 'experience_years_required': 5.0},
+        {'seniority': None, 'job_function': 'data', 'cleaned_location': 'Paris', 'company_name': 'Acme', 'experience_years_required': np.float32('nan')},
+        {'seniority': 'junior', 'job_function': None, 'cleaned_location': np.nan, 'company_name': 'Acme', 'experience_years_required': np.float32(2.0)},
+    ]
+    df = pd.DataFrame(rows, columns=interaction_source_columns)
+    df['experience_years_required'] = df['experience_years_required'].astype(np.float32)
+
+    columnar = build_interaction_columns(df).to_dict('records')
+    scalar = [build_interaction_features(row) for row in rows]
+
+    assert columnar == scalar
+    assert scalar[1]['company_experience'] == 'Acme_unknown'
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from llm import job_details as job_details_module
+from llm.description_preprocessing import DescriptionPreprocessor
+from llm.job_details import ExtractionSettings, JobDetails, aget_job_details, get_job_details, load_extraction_settings
+
+description = "We need a data engineer with Python, SQL and Airflow. Strong communication skills are a plus."
+
+
+def stub_generate_job_details(prompts):
+    def generate_job_details(client, decoder_model_name, response_model, prompt, *args, **kwargs):
+        prompts.append(prompt)
+        job_details = JobDetails(
+            technical_skills=['Airflow', 'python'],
+            soft_skills=['Communication'],
+            domain_skills=[],
+            experience_years_required=-1,
+            education_level='Unspecified',
+        )
+        return job_details, 0
+    return generate_job_details
+
+
+def extract(use_async: bool, description: str, **kwargs):
+    if use_async:
+        index, details, _ = asyncio.run(aget_job_details(description, 0, None, 'stub-model', pre_extraction=False, **kwargs))
+        return index, details
+    return get_job_details(description, 0, None, 'stub-model', pre_extraction=False, **kwargs)
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_sync_and_async_extractions_handle_errors_alike(monkeypatch, use_async):
+    async def failing_agenerate_job_details(*args, **kwargs):
+        raise ConnectionError("connection refused")
+
+    def failing_generate_job_details(*args, **kwargs):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(job_details_module, 'generate_job_details', failing_generate_job_details)
+    monkeypatch.setattr(job_details_module, 'agenerate_job_details', failing_agenerate_job_details)
+
+    assert extract(use_async, description)[1] == job_details_module.empty_job_details()
+    assert extract(use_async, "too short")[1] == job_details_module.empty_job_details()
+    with pytest.raises(ConnectionError):
+        extract(use_async, description, raise_errors=True)
+    with pytest.raises(ValueError):
+        extract(use_async, "too short", raise_errors=True)
+
+
+def test_hybrid_pre_pass_leaves_known_skills_out_of_the_request(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(job_details_module, 'generate_job_details', stub_generate_job_details(prompts))
+
+    _, details = get_job_details(description, 0, None, 'stub-model', pre_extraction=False, known_skills=['python', 'sql'])
+
+    assert "do not list them again, only extract the other skills: python, sql" in prompts[0]
+    # known skills are added once, next to the skills the LLM found
+    assert details['technical_skills'] == ['Airflow', 'python', 'sql']
+    assert sorted(details['skills']) == ['Airflow', 'Communication', 'python', 'sql']
+
+
+def test_without_known_skills_the_prompt_is_unchanged(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(job_details_module, 'generate_job_details', stub_generate_job_details(prompts))
+
+    _, details = get_job_details(description, 0, None, 'stub-model', pre_extraction=False)
+
+    assert "already found" not in prompts[0]
+    assert details['technical_skills'] == ['Airflow', 'python']
+
+
+def test_description_is_preprocessed_with_the_given_settings(monkeypatch):
+    prompts = []
+    monkeypatch.setattr(job_details_module, 'generate_job_details', stub_generate_job_details(prompts))
+    markup_description = "<p><b>Data engineer</b></p><ul><li>Python, SQL and Airflow</li></ul>"
+    settings = ExtractionSettings(preprocessor=DescriptionPreprocessor(set()))
+
+    _, details = get_job_details(markup_description, 0, None, 'stub-model', pre_extraction=False, settings=settings)
+    _, raw_details = get_job_details(markup_description, 0, None, 'stub-model', pre_extraction=False)
+
+    assert "<b>" not in prompts[0] and "Python, SQL and Airflow" in prompts[0]
+    assert details['description_tokens_saved'] > 0
+    # without settings the description is sent as is, whatever the working directory holds
+    assert markup_description in prompts[1]
+    assert raw_details['description_tokens_saved'] == 0
+
+
+def test_load_extraction_settings_reads_the_given_params():
+    assert load_extraction_settings({'description_preprocessing': {'enabled': False}}).preprocessor is None
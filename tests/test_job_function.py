@@ -0,0 +1,122 @@
+import itertools
+import random
+
+import pandas as pd
+
+from feature_extraction.job_function import extract_job_function_from_title, extract_job_functions, job_function_rules
+from feature_extraction.keyword_matcher import KeywordRuleMatcher
+from tests.legacy_job_function import legacy_extract_job_function_from_title
+
+sample_titles = [
+    "Senior Data Scientist",
+    "Chief Technology Officer",
+    "Chief Product Officer",
+    "Chief Innovation Officer",
+    "Executive Chef",
+    "Registered Nurse (RN) - ICU",
+    "Travel RN",
+    "Physician Assistant - Cardiology",
+    "Paralegal, Litigation",
+    "Legal Assistant",
+    "Lab Technician",
+    "Surgical Tech",
+    "HVAC Technician",
+    "Forklift Operator - 2nd Shift",
+    "Software Engineer II",
+    "Front End Developer (React)",
+    "SAP FICO Consultant",
+    "Sales Associate",
+    "Retail Store Manager",
+    "Assistant Store Manager",
+    "Account Executive",
+    "Head of Product",
+    "VP, Operations",
+    "Product Manager",
+    "Project Coordinator",
+    "Business Analyst",
+    "Security Officer",
+    "Police Officer",
+    "Quality Control Inspector",
+    "QA Analyst",
+    "Tax Accountant",
+    "Payroll Specialist",
+    "Bookkeeper",
+    "Claims Adjuster",
+    "Insurance Agent",
+    "Warehouse Associate",
+    "Delivery Driver",
+    "Barista",
+    "Line Cook",
+    "Housekeeping Attendant",
+    "Customer Service Representative",
+    "Receptionist / Front Desk",
+    "High School Math Teacher",
+    "Case Manager",
+    "Airline Pilot",
+    "Spanish Interpreter",
+    "Graphic Designer",
+    "Photographer",
+    "Librarian",
+    "Land Surveyor",
+    "Strategy Director",
+    "EHS Coordinator",
+    "Bioinformatics Specialist",
+    "Specialist",
+    "Associate",
+    "Intern",
+    "",
+    "ÉLECTRICIEN / Electrician",
+]
+
+
+def keyword_titles():
+    """Every keyword of the rule table, alone and inside a longer title."""
+    keywords = [keyword for _, rule_keywords in job_function_rules for keyword in rule_keywords]
+    titles = []
+    for keyword in keywords:
+        titles.extend([keyword, keyword.title(), f"Senior {keyword.title()} II", f"{keyword}-{keyword}"])
+    return keywords, titles
+
+
+def test_keyword_matcher_matches_rules_in_order():
+    rules = [("short", ["it"]), ("long", ["unit"]), ("first", ["unit test", "xyz"])]
+    matcher = KeywordRuleMatcher(rules)
+
+    assert matcher.labels[matcher.match("unit test lead")] == "short"
+    assert matcher.labels[matcher.match("uni xyz")] == "first"
+    # "unit" always contains "it", the earlier rule
+    assert matcher.labels[matcher.match("unit")] == "short"
+    assert matcher.match("nothing here") == matcher.no_match
+    assert matcher.match("") == matcher.no_match
+
+
+def test_matches_legacy_chain_on_sample_titles():
+    for title in sample_titles:
+        assert extract_job_function_from_title(title) == legacy_extract_job_function_from_title(title), title
+
+
+def test_matches_legacy_chain_on_every_keyword():
+    _, titles = keyword_titles()
+    for title in titles:
+        assert extract_job_function_from_title(title) == legacy_extract_job_function_from_title(title), title
+
+
+def test_matches_legacy_chain_on_keyword_combinations():
+    # titles holding keywords of two different rules exercise the rule order
+    keywords, _ = keyword_titles()
+    generator = random.Random(0)
+    pairs = itertools.islice(itertools.permutations(keywords, 2), 0, None, 7)
+    for first, second in pairs:
+        title = f"{first} {second}" if generator.random() < 0.5 else f"{first}{second}"
+        assert extract_job_function_from_title(title) == legacy_extract_job_function_from_title(title), title
+
+
+def test_non_string_titles_are_unknown():
+    assert extract_job_function_from_title(None) == legacy_extract_job_function_from_title(None) == "unknown"
+    assert extract_job_function_from_title(float('nan')) == "unknown"
+
+
+def test_extract_job_functions_matches_scalar_version():
+    titles = pd.Series(sample_titles + [None] + sample_titles[:5])
+    expected = [extract_job_function_from_title(title) for title in titles]
+    assert extract_job_functions(titles).tolist() == expected
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from llm.job_details import needs_location_refinement
+from llm.near_duplicates import NearDuplicateIndex, find_near_duplicates, propagate_to_duplicates, representatives_needing_location
+
+description = (
+    "We are hiring a senior data engineer to build batch and streaming pipelines in Python and SQL, "
+    "maintain our Airflow deployment and work with analysts on data quality. You will own the ingestion "
+    "of product events, design the warehouse models used by the finance and marketing teams, and help "
+    "us move our nightly jobs to an event driven architecture. You have 5+ years of experience in data engineering. "
+    "We offer a hybrid schedule, a yearly training budget and a friendly team that values clear "
+    "documentation, code review and pairing. Requisition 1234."
+)
+
+
+def test_near_duplicates_map_to_the_first_posting():
+    descriptions = pd.Series([description, description.replace("1234", "98765"), "A completely different job about baking bread every morning."])
+    representatives = find_near_duplicates(descriptions, NearDuplicateIndex())
+    assert representatives.tolist() == [0, 0, 2]
+
+
+def test_short_postings_asking_for_other_years_are_not_duplicates():
+    posting = "Data analyst working on dashboards in Tableau with the sales team, {} years of experience required."
+    representatives = find_near_duplicates(pd.Series([posting.format(2), posting.format(10)]), NearDuplicateIndex())
+    assert representatives.tolist() == [0, 1]
+
+
+def test_duplicates_keep_the_experience_their_own_description_states():
+    postings = pd.DataFrame({
+        'description': [description, description.replace("5+ years", "10+ years"), description.replace("1234", "4321")],
+        'location': ["Austin, TX"] * 3,
+    })
+    # clustered together, as happens for descriptions long enough that one changed number hardly matters
+    representatives = pd.Series([0, 0, 0])
+    processed_representatives = pd.DataFrame({'experience_years_required': [5], 'education_level': ["Bachelor's"]}, index=[0])
+
+    propagated = propagate_to_duplicates(postings, processed_representatives, representatives)
+
+    assert propagated['experience_years_required'].tolist() == [5, 10, 5]
+    assert propagated['education_level'].tolist() == ["Bachelor's"] * 3
+
+
+def test_missing_location_needs_refinement():
+    assert needs_location_refinement(None)
+    assert needs_location_refinement("United States")
+    assert not needs_location_refinement("Austin, TX")
+
+
+def test_representative_requests_the_location_for_its_duplicates():
+    locations = pd.Series(["Austin, TX", "United States", "New York, NY", "Boston, MA"])
+    representatives = pd.Series([0, 0, 2, 2])
+
+    needs_location = representatives_needing_location(locations, representatives)
+
+    assert needs_location.to_dict() == {0: True, 2: False}
+
+
+def test_refined_location_only_goes_to_postings_with_an_inconclusive_location():
+    postings = pd.DataFrame({'location': ["Austin, TX", "United States", None, "New York, NY"], 'description': [description] * 4})
+    representatives = pd.Series([0, 0, 0, 3])
+    processed_representatives = pd.DataFrame(
+        {'education_level': ["Master's", "PhD"], 'refined_location': ["Austin, TX", None]},
+        index=[0, 3]
+    )
+
+    propagated = propagate_to_duplicates(postings, processed_representatives, representatives)
+
+    assert propagated['education_level'].tolist() == ["Master's"] * 3 + ["PhD"]
+    refined_locations = propagated['refined_location']
+    assert refined_locations.isna().tolist() == [True, False, False, True]
+    assert refined_locations.dropna().tolist() == ["Austin, TX", "Austin, TX"]
@@ -0,0 +1,197 @@
+import asyncio
+
+import httpx
+import pytest
+
+from openai import DEFAULT_MAX_RETRIES, AsyncOpenAI, OpenAI
+from openai import _base_client as openai_base_client
+
+from llm.ollama_setup import AsyncLoadBalancingTransport, LoadBalancingTransport, OllamaEndpointPool, build_async_client, build_client, client_max_retries
+
+hosts = ['http://host-a:11434', 'http://host-b:11434', 'http://host-c:11434']
+
+
+def stub_handler(outcomes):
+    """
+    Answers each request according to `outcomes`, keyed by host name: a status
+    code, or an exception class raised as if the host could not be reached.
+    Hosts not in `outcomes` answer 200.
+    """
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.host)
+        outcome = outcomes.get(request.url.host, 200)
+        if isinstance(outcome, type):
+            raise outcome("stub failure", request=request)
+        return httpx.Response(outcome, json={'host': request.url.host})
+
+    return handler, seen
+
+
+def send(pool: OllamaEndpointPool, handler, use_async: bool) -> httpx.Response:
+    if use_async:
+        async def run():
+            async with httpx.AsyncClient(transport=AsyncLoadBalancingTransport(pool, httpx.MockTransport(handler))) as client:
+                return await client.get(pool.base_url + '/models')
+        return asyncio.run(run())
+
+    with httpx.Client(transport=LoadBalancingTransport(pool, httpx.MockTransport(handler))) as client:
+        return client.get(pool.base_url + '/models')
+
+
+def test_pool_needs_a_host():
+    with pytest.raises(ValueError):
+        OllamaEndpointPool([])
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_requests_go_to_the_least_outstanding_host(use_async):
+    pool = OllamaEndpointPool(hosts)
+    # host-a and host-b are busy with a generation each
+    busy = [pool.acquire(set()), pool.acquire(set())]
+    handler, seen = stub_handler({})
+
+    response = send(pool, handler, use_async)
+
+    assert response.status_code == 200
+    assert seen == ['host-c']
+    assert [endpoint['outstanding'] for endpoint in pool.stats()] == [1, 1, 0]
+
+    for index in busy:
+        pool.release(index)
+    send(pool, handler, use_async)
+    # every host is idle, the one that served the fewest requests is picked
+    assert seen == ['host-c', 'host-a']
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_connection_errors_are_retried_on_another_host(use_async):
+    pool = OllamaEndpointPool(hosts)
+    handler, seen = stub_handler({'host-a': httpx.ConnectError})
+
+    response = send(pool, handler, use_async)
+
+    assert response.status_code == 200
+    assert response.json() == {'host': 'host-b'}
+    assert seen == ['host-a', 'host-b']
+    stats = pool.stats()
+    assert [endpoint['ejected'] for endpoint in stats] == [True, False, False]
+    assert [endpoint['outstanding'] for endpoint in stats] == [0, 0, 0]
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+@pytest.mark.parametrize('status_code', [502, 503, 504])
+def test_overloaded_responses_are_retried_on_another_host(use_async, status_code):
+    pool = OllamaEndpointPool(hosts)
+    handler, seen = stub_handler({'host-a': status_code, 'host-b': httpx.ConnectTimeout})
+
+    response = send(pool, handler, use_async)
+
+    assert response.json() == {'host': 'host-c'}
+    assert seen == ['host-a', 'host-b', 'host-c']
+    assert [endpoint['failures'] for endpoint in pool.stats()] == [1, 1, 0]
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_ejected_hosts_are_skipped(use_async):
+    pool = OllamaEndpointPool(hosts, ejection_seconds=60)
+    handler, seen = stub_handler({'host-a': httpx.ConnectError})
+
+    send(pool, handler, use_async)
+    send(pool, handler, use_async)
+    send(pool, handler, use_async)
+
+    # host-a is only tried by the first request, then left out of the rotation
+    assert seen == ['host-a', 'host-b', 'host-c', 'host-b']
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_ejected_hosts_come_back_after_the_ejection(use_async):
+    pool = OllamaEndpointPool(hosts[:2], ejection_seconds=0)
+    handler, seen = stub_handler({'host-a': httpx.ConnectError})
+    send(pool, handler, use_async)
+
+    handler, seen = stub_handler({})
+    send(pool, handler, use_async)
+
+    assert seen == ['host-a']
+    assert not pool.stats()[0]['ejected']
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_read_timeouts_are_not_retried(use_async):
+    pool = OllamaEndpointPool(hosts)
+    handler, seen = stub_handler({'host-a': httpx.ReadTimeout})
+
+    with pytest.raises(httpx.ReadTimeout):
+        send(pool, handler, use_async)
+
+    assert seen == ['host-a']
+    stats = pool.stats()
+    assert not stats[0]['ejected']
+    assert stats[0]['outstanding'] == 0
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_other_error_statuses_are_not_retried(use_async):
+    pool = OllamaEndpointPool(hosts)
+    handler, seen = stub_handler({'host-a': 500})
+
+    response = send(pool, handler, use_async)
+
+    assert response.status_code == 500
+    assert seen == ['host-a']
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_every_host_is_tried_once(use_async):
+    pool = OllamaEndpointPool(hosts)
+    handler, seen = stub_handler({'host-a': 503, 'host-b': 503, 'host-c': 503})
+    assert send(pool, handler, use_async).status_code == 503
+    assert seen == ['host-a', 'host-b', 'host-c']
+
+    handler, seen = stub_handler({'host-a': httpx.ConnectError, 'host-b': httpx.ConnectError, 'host-c': httpx.ConnectError})
+    with pytest.raises(httpx.ConnectError):
+        send(pool, handler, use_async)
+    # every host is ejected, they are still tried, least recently failed first
+    assert sorted(seen) == ['host-a', 'host-b', 'host-c']
+    assert [endpoint['outstanding'] for endpoint in pool.stats()] == [0, 0, 0]
+
+
+def test_clients_leave_retries_to_the_transport():
+    pool = OllamaEndpointPool(hosts)
+    assert build_client(pool).max_retries == 0
+    assert build_async_client(pool).max_retries == 0
+
+
+def test_single_host_clients_keep_their_retries():
+    pool = OllamaEndpointPool(hosts[:1])
+    assert build_client(pool).max_retries == DEFAULT_MAX_RETRIES
+    assert build_async_client(pool).max_retries == DEFAULT_MAX_RETRIES
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_single_host_clients_retry_overloaded_responses(use_async, monkeypatch):
+    pool = OllamaEndpointPool(hosts[:1])
+    statuses = iter([503, 200])
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.host)
+        return httpx.Response(next(statuses), json={'object': 'list', 'data': []})
+
+    # no backoff wait in the test
+    monkeypatch.setattr(openai_base_client.BaseClient, '_calculate_retry_timeout', lambda *args, **kwargs: 0)
+    if use_async:
+        async def run():
+            client = AsyncOpenAI(base_url=pool.base_url, api_key='stub', max_retries=client_max_retries(pool),
+                                 http_client=httpx.AsyncClient(transport=AsyncLoadBalancingTransport(pool, httpx.MockTransport(handler))))
+            return await client.models.list()
+        asyncio.run(run())
+    else:
+        client = OpenAI(base_url=pool.base_url, api_key='stub', max_retries=client_max_retries(pool),
+                        http_client=httpx.Client(transport=LoadBalancingTransport(pool, httpx.MockTransport(handler))))
+        client.models.list()
+
+    assert seen == ['host-a', 'host-a']
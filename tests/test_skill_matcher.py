@@ -0,0 +1,36 @@
+import pickle
+
+import numpy as np
+
+from embeddings.skills import load_skill_cache
+from embeddings.store import EmbeddingStore
+from feature_extraction.skill_matcher import get_skill_matcher
+
+embeddings = {skill: np.ones(4, dtype=np.float32) for skill in ['python', 'sql', 'machine learning']}
+
+
+def test_matcher_is_compiled_once_per_store():
+    store = EmbeddingStore.from_dict(embeddings)
+
+    matcher = get_skill_matcher(store)
+
+    assert get_skill_matcher(store) is matcher
+    assert get_skill_matcher(EmbeddingStore.from_dict(embeddings)) is not matcher
+    assert matcher.match("Python, SQL and machine learning for the pricing team.") == ['python', 'sql', 'machine learning']
+
+
+def test_plain_mappings_get_a_new_matcher():
+    assert get_skill_matcher(embeddings) is not get_skill_matcher(embeddings)
+    assert get_skill_matcher(embeddings).match("We use SQL daily.") == ['sql']
+
+
+def test_pickled_caches_are_loaded_as_stores(tmp_path):
+    path = tmp_path / 'skills.pkl'
+    with open(path, 'wb') as f:
+        pickle.dump(embeddings, f)
+
+    store = load_skill_cache(str(path))
+
+    assert isinstance(store, EmbeddingStore)
+    assert sorted(store) == sorted(embeddings)
+    np.testing.assert_array_equal(store['sql'], embeddings['sql'])
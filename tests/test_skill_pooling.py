@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from embeddings.skills import (
+    compute_aggregated_skill_embeddings,
+    get_skill_idf,
+    load_skill_cache,
+    pool_skill_embeddings,
+    save_skill_idf,
+    skill_pooling_prefixes,
+)
+from embeddings.store import EmbeddingStore, save_embedding_store
+from predictions.feature_layout import FeatureLayout
+from predictions.features import build_feature_schema, categorical_features
+from predictions.inference import build_posting_features
+
+dim = 4
+skills = ['python', 'sql', 'communication']
+rng = np.random.default_rng(0)
+matrix = rng.normal(size=(len(skills), dim)).astype(np.float32)
+idf = np.array([1.5, 1.0, 2.0], dtype=np.float32)
+store = EmbeddingStore(matrix, {skill: i for i, skill in enumerate(skills)})
+all_modes = list(skill_pooling_prefixes)
+
+
+@pytest.mark.parametrize('modes, idf_weights', [(['median'], None), (['tfidf_mean'], None), ([], None), (['mean', 'mean'], None)])
+def test_invalid_modes_fail_even_without_known_skills(modes, idf_weights):
+    with pytest.raises(ValueError):
+        pool_skill_embeddings([['unknown skill'], None], store, modes, idf_weights)
+
+
+def test_postings_without_known_skills_get_zero_vectors():
+    pooled = pool_skill_embeddings([['unknown skill'], None], store, all_modes, idf)
+    for mode in all_modes:
+        assert pooled[mode].shape == (2, dim)
+        assert not pooled[mode].any()
+
+
+@pytest.mark.parametrize('skill_list', [['python', 'sql', 'python'], ['communication', 'unknown skill'], ['unknown skill'], [], None])
+def test_single_posting_pooling_matches_the_batch(skill_list):
+    batch = pool_skill_embeddings([skill_list, ['sql']], store, all_modes, idf)
+    single = compute_aggregated_skill_embeddings(skill_list, store, all_modes, idf)
+
+    for mode in all_modes:
+        np.testing.assert_allclose(single[mode], batch[mode][0], rtol=1e-6)
+
+
+def test_tfidf_mean_weights_each_occurrence():
+    pooled = compute_aggregated_skill_embeddings(['python', 'sql', 'python'], store, ['tfidf_mean'], idf)
+
+    expected = (2 * idf[0] * matrix[0] + idf[1] * matrix[1]) / (2 * idf[0] + idf[1])
+    np.testing.assert_allclose(pooled['tfidf_mean'], expected, rtol=1e-6)
+
+
+def test_idf_is_loaded_with_the_store(tmp_path):
+    store_dir = str(tmp_path / 'skills')
+    save_embedding_store(skills, matrix, store_dir)
+    save_skill_idf(idf, store_dir)
+
+    skill_cache = load_skill_cache(store_dir)
+
+    np.testing.assert_array_equal(get_skill_idf(skill_cache), idf)
+    assert get_skill_idf(store) is None
+    assert get_skill_idf(dict(store)) is None
+
+
+def test_store_keys_follow_the_matrix_rows():
+    shuffled = EmbeddingStore(matrix[::-1], {skill: len(skills) - 1 - i for i, skill in enumerate(skills)})
+
+    assert list(shuffled.vocabulary_index) == skills[::-1]
+    pooled = pool_skill_embeddings([['python'], ['sql', 'communication']], shuffled, ['mean'])
+    np.testing.assert_allclose(pooled['mean'][0], matrix[0], rtol=1e-6)
+    np.testing.assert_allclose(pooled['mean'][1], (matrix[1] + matrix[2]) / 2, rtol=1e-6)
+
+
+@pytest.mark.parametrize('modes', [['mean'], ['max'], ['tfidf_mean'], ['mean', 'tfidf_mean'], ['mean', 'max', 'tfidf_mean']])
+def test_schema_follows_the_pooling_modes(modes):
+    schema = build_feature_schema('stub-encoder', dim, modes)
+
+    assert schema['skill_pooling_modes'] == modes
+    for mode, prefix in skill_pooling_prefixes.items():
+        in_schema = [feature for feature in schema['all_features'] if feature.startswith(prefix)]
+        assert len(in_schema) == (dim if mode in modes else 0)
+
+
+@pytest.mark.parametrize('modes', [[], ['median']])
+def test_schema_rejects_unsupported_modes(modes):
+    with pytest.raises(ValueError):
+        build_feature_schema('stub-encoder', dim, modes)
+
+
+@pytest.mark.parametrize('modes', [['mean'], ['max', 'tfidf_mean'], ['mean', 'max', 'tfidf_mean']])
+def test_serving_features_fill_the_schema(monkeypatch, modes, tmp_path):
+    store_dir = str(tmp_path / 'skills')
+    save_embedding_store(skills, matrix, store_dir)
+    save_skill_idf(idf, store_dir)
+    skill_cache = load_skill_cache(store_dir)
+    job_function_cache = {'data': np.ones(dim, dtype=np.float32)}
+    job_details = {
+        'technical_skills': ['Python', 'SQL'],
+        'soft_skills': ['Communication'],
+        'domain_skills': [],
+        'experience_years_required': 3,
+        'education_level': "Bachelor's",
+    }
+
+    schema = build_feature_schema('stub-encoder', dim, modes)
+    base_features, embeddings = build_posting_features(
+        'Senior Data Scientist', 'Acme', 'Paris', job_details, job_function_cache, skill_cache, skill_pooling_modes=modes
+    )
+    layout = FeatureLayout(schema['all_features'], categorical_features)
+    row = layout.build_row(base_features, embeddings)
+
+    expected = compute_aggregated_skill_embeddings(['python', 'sql', 'communication'], skill_cache, modes, idf)
+    positions = {name: i for i, name in enumerate(schema['all_features'])}
+    for mode in modes:
+        prefix = skill_pooling_prefixes[mode]
+        written = [row[0, positions[f"{prefix}{i}"]] for i in range(dim)]
+        np.testing.assert_allclose(written, expected[mode], rtol=1e-6)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset.storage import DatasetWriter, read_dataset, temporary_path, write_dataset
+
+
+def batch(start: int, size: int) -> pd.DataFrame:
+    index = pd.RangeIndex(start, start + size)
+    return pd.DataFrame({'title': [f"job {i}" for i in index], 'mean_skill_emb_0': np.arange(size, dtype=np.float64)}, index=index)
+
+
+def test_batches_are_written_on_close(tmp_path):
+    path = str(tmp_path / 'features.parquet')
+
+    with DatasetWriter(path) as writer:
+        writer.write(batch(0, 3))
+        writer.write(batch(3, 2))
+        # nothing is visible at the output path until the dataset is complete
+        assert not os.path.exists(path)
+
+    df = read_dataset(path)
+    assert list(df.index) == [0, 1, 2, 3, 4]
+    assert df['mean_skill_emb_0'].dtype == np.float32
+    assert not os.path.exists(temporary_path(path))
+
+
+def test_failed_run_leaves_the_previous_dataset(tmp_path):
+    path = str(tmp_path / 'features.parquet')
+    write_dataset(batch(0, 4), path)
+
+    with pytest.raises(RuntimeError):
+        with DatasetWriter(path) as writer:
+            writer.write(batch(0, 2))
+            raise RuntimeError("featurization crashed")
+
+    assert len(read_dataset(path)) == 4
+    assert not os.path.exists(temporary_path(path))
+
+
+def test_closing_without_batches_fails(tmp_path):
+    path = str(tmp_path / 'features.parquet')
+    write_dataset(batch(0, 4), path)
+
+    with pytest.raises(ValueError):
+        with DatasetWriter(path):
+            pass
+
+    assert len(read_dataset(path)) == 4
+
+
+def test_columns_empty_in_the_first_batch_take_later_values(tmp_path):
+    path = str(tmp_path / 'scored.parquet')
+
+    with DatasetWriter(path) as writer:
+        writer.write(pd.DataFrame({'location': [None, None], 'degraded': [False, True]}))
+        writer.write(pd.DataFrame({'location': ['Paris', None], 'degraded': [False, False]}, index=[2, 3]))
+
+    df = read_dataset(path)
+    assert df['location'].tolist()[2] == 'Paris'
+    assert df['degraded'].tolist() == [False, True, False, False]
+
+
+def test_csv_batches_are_appended_with_a_single_header(tmp_path):
+    path = str(tmp_path / 'scored.csv')
+
+    with DatasetWriter(path) as writer:
+        writer.write(batch(0, 2).rename_axis('row_number'))
+        writer.write(batch(2, 3).rename_axis('row_number'))
+
+    df = pd.read_csv(path, index_col='row_number')
+    assert list(df.index) == [0, 1, 2, 3, 4]
+    assert df['title'].tolist()[-1] == 'job 4'
+    assert not os.path.exists(temporary_path(path))
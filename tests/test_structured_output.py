@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from llm.job_details import ExtractionSettings, JobDetails, agenerate_job_details, generate_job_details, load_extraction_settings
+from llm.telemetry import extraction_telemetry
+
+valid_reply = {
+    'technical_skills': ['Python', 'SQL'],
+    'soft_skills': ['Communication'],
+    'domain_skills': [],
+    'experience_years_required': 3,
+    'education_level': "Bachelor's",
+}
+# misses every field but the technical skills
+invalid_reply = {'technical_skills': ['Python']}
+
+
+def stub_handler(replies):
+    """Serves the chat completions in `replies` in turn, with a usage of 10 prompt and 5 completion tokens each."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        content = json.dumps(replies[min(len(requests), len(replies)) - 1])
+        return httpx.Response(200, json={
+            'id': f"chatcmpl-{len(requests)}",
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'stub-model',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+        })
+
+    return handler, requests
+
+
+def generate(mode: str, replies, use_async: bool):
+    handler, requests = stub_handler(replies)
+    settings = ExtractionSettings(structured_output=mode, max_attempts=3)
+    if use_async:
+        async def run():
+            client = AsyncOpenAI(base_url='http://stub/v1', api_key='stub', max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            return await agenerate_job_details(client, 'stub-model', JobDetails, "Extract the job details.", settings)
+        return asyncio.run(run()), requests
+
+    client = OpenAI(base_url='http://stub/v1', api_key='stub', max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+    return generate_job_details(client, 'stub-model', JobDetails, "Extract the job details.", settings), requests
+
+
+@pytest.fixture(autouse=True)
+def reset_telemetry():
+    extraction_telemetry.reset()
+    yield
+    extraction_telemetry.reset()
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+@pytest.mark.parametrize('mode', ['format', 'instructor'])
+def test_one_invalid_reply_is_retried_and_counted(mode, use_async):
+    (job_details, total_tokens), requests = generate(mode, [invalid_reply, valid_reply], use_async)
+
+    assert job_details.model_dump() == valid_reply
+    assert len(requests) == 2
+    assert total_tokens == 30
+
+    snapshot = extraction_telemetry.snapshot()
+    assert snapshot['calls'] == 1
+    assert snapshot['failures'] == 0
+    assert snapshot['attempts'] == 2
+    assert snapshot['retries'] == 1
+    assert snapshot['validation_errors'] == 1
+    assert snapshot['prompt_tokens'] == 20
+    assert snapshot['completion_tokens'] == 10
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+@pytest.mark.parametrize('mode', ['format', 'instructor'])
+def test_failure_after_the_last_attempt_is_counted(mode, use_async):
+    with pytest.raises(Exception):
+        generate(mode, [invalid_reply], use_async)
+
+    snapshot = extraction_telemetry.snapshot()
+    assert snapshot['calls'] == 1
+    assert snapshot['failures'] == 1
+    assert snapshot['attempts'] == 3
+    assert snapshot['validation_errors'] == 3
+    assert snapshot['prompt_tokens'] == 30
+
+
+def test_format_mode_sends_the_response_schema():
+    _, requests = generate('format', [valid_reply], use_async=False)
+    assert requests[0]['response_format']['json_schema']['schema'] == JobDetails.model_json_schema()
+
+
+def test_settings_come_from_the_given_params():
+    settings = load_extraction_settings({'llm_processing': {'structured_output': 'format', 'max_attempts': 5}})
+    assert (settings.structured_output, settings.max_attempts) == ('format', 5)
+
+    with pytest.raises(ValueError):
+        load_extraction_settings({'llm_processing': {'structured_output': 'grammar'}})